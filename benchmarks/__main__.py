@@ -0,0 +1,91 @@
+"""Runs the benchmark suite: `python -m benchmarks [-b "readers/*"] [--docs 2000] [-o results.json] [--compare old.json]`"""
+
+import argparse
+import json
+import sys
+
+from loguru import logger
+
+from . import bench_dedup, bench_io, bench_processing, bench_tokens  # noqa: F401 (registers the benchmarks)
+from .corpus import CorpusConfig
+from .harness import BenchmarkContext, compare_results, run_benchmark, select_benchmarks
+
+
+def parse_languages(value: str) -> dict[str, float]:
+    languages = {}
+    for item in value.split(","):
+        language, _, weight = item.partition("=")
+        languages[language.strip()] = float(weight) if weight else 1.0
+    return languages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the throughput (docs/s and MB/s) of datatrove's blocks.")
+    parser.add_argument(
+        "-b", "--benchmark", action="append", help="glob pattern of the benchmarks to run (repeatable)"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--docs", type=int, default=2000, help="number of documents of the synthetic corpus")
+    parser.add_argument("--mean-words", type=int, default=300, help="median number of words per document")
+    parser.add_argument("--length-sigma", type=float, default=0.8, help="sigma of the log-normal document length")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="fraction of exact duplicates")
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.05, help="fraction of near duplicates")
+    parser.add_argument("--languages", type=parse_languages, default={"en": 1.0}, help='e.g. "en=0.8,fr=0.2"')
+    parser.add_argument("--html-rate", type=float, default=0.0, help="fraction of html documents")
+    parser.add_argument("--noise-rate", type=float, default=0.05, help="fraction of boilerplate/noise lines")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per benchmark (the fastest is kept)")
+    parser.add_argument("--tmp-dir", help="folder for the corpus files and outputs (a temporary folder by default)")
+    parser.add_argument("-o", "--output", help="save the results to this json file")
+    parser.add_argument("--compare", help="json results of a previous run: exit with an error on regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="docs/s decrease considered a regression")
+    args = parser.parse_args()
+
+    names = select_benchmarks(args.benchmark)
+    if args.list:
+        print("\n".join(names))
+        return
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    corpus_config = CorpusConfig(
+        n_docs=args.docs,
+        seed=args.seed,
+        mean_words=args.mean_words,
+        length_sigma=args.length_sigma,
+        duplicate_rate=args.duplicate_rate,
+        near_duplicate_rate=args.near_duplicate_rate,
+        languages=args.languages,
+        html_rate=args.html_rate,
+        noise_rate=args.noise_rate,
+    )
+    context = BenchmarkContext(corpus_config, tmp_dir=args.tmp_dir)
+    results = []
+    print(f"{'benchmark':<40} {'docs/s':>12} {'MB/s':>10}")
+    try:
+        for name in names:
+            result = run_benchmark(name, context, repeats=args.repeats)
+            results.append(result.to_dict())
+            if result.error:
+                print(f"{name:<40} {'skipped':>12}  ({result.error})", flush=True)
+            else:
+                print(f"{name:<40} {result.docs_per_second:>12,.0f} {result.mb_per_second:>10.2f}", flush=True)
+    finally:
+        if not args.tmp_dir:
+            context.close()
+
+    if args.output:
+        with open(args.output, "wt") as f:
+            json.dump({"corpus": corpus_config.__dict__, "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(results, baseline, args.threshold)
+        for name, change in regressions:
+            print(f"REGRESSION {name}: {change:+.1%} docs/s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
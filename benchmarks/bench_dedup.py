@@ -0,0 +1,269 @@
+"""Deduplication (each stage of minhash, sentence and url dedup, bloom filter) and decontamination. Stages are timed
+separately: the outputs of the previous stages are computed once per session. MB/s are measured on the text of the
+documents for stages that read documents, and on the size of their input files for the other stages."""
+
+import os
+from collections import deque
+
+import numpy as np
+
+from datatrove.io import get_datafolder
+from datatrove.pipeline.decont import NGramsDecontConfig, NGramsDecontFilter
+from datatrove.pipeline.dedup import (
+    MinhashBuildIndex,
+    MinhashConfig,
+    MinhashDedupBuckets,
+    MinhashDedupCluster,
+    MinhashDedupFilter,
+    MinhashDedupSignature,
+    SentDedupConfig,
+    SentenceDedupFilter,
+    SentenceDedupSignature,
+    SentenceFindDedups,
+    SingleBloomFilter,
+    UrlDedupConfig,
+    UrlDedupFilter,
+    UrlDedupSignature,
+    UrlFindDedups,
+)
+from datatrove.pipeline.dedup.bloom_filter import BloomFilterConfig
+from datatrove.utils.hashing import create_hash_func
+from datatrove.utils.text import ngrams, simplify_text
+from datatrove.utils.typeshelper import Languages
+from datatrove.utils.word_tokenizers import load_word_tokenizer
+
+from .corpus import CorpusConfig, SyntheticCorpus
+from .harness import BenchmarkContext, Throughput, benchmark, folder_size, step_benchmark
+
+
+MINHASH_CONFIG = MinhashConfig()
+SENTENCE_DEDUP_CONFIG = SentDedupConfig()
+URL_DEDUP_CONFIG = UrlDedupConfig()
+
+
+def run_on_documents(context: BenchmarkContext, step) -> str:
+    """
+    Runs a step writing its outputs to `step.output_folder` on the documents of the corpus
+    """
+    deque(step(context.documents()) or [], maxlen=0)
+    return step.output_folder.path
+
+
+def run_per_bucket(step, num_buckets: int):
+    for bucket in range(num_buckets):
+        deque(step(None, rank=bucket, world_size=num_buckets) or [], maxlen=0)
+
+
+# minhash
+def minhash_signatures(context: BenchmarkContext) -> str:
+    return context.cached(
+        "minhash_signatures",
+        lambda: run_on_documents(
+            context, MinhashDedupSignature(context.new_folder("minhash_signatures"), config=MINHASH_CONFIG)
+        ),
+    )
+
+
+def minhash_buckets(context: BenchmarkContext) -> str:
+    def compute():
+        step = MinhashDedupBuckets(
+            minhash_signatures(context), context.new_folder("minhash_buckets"), config=MINHASH_CONFIG
+        )
+        run_per_bucket(step, MINHASH_CONFIG.num_buckets)
+        return step.output_folder.path
+
+    return context.cached("minhash_buckets", compute)
+
+
+def minhash_clusters(context: BenchmarkContext) -> str:
+    def compute():
+        step = MinhashDedupCluster(
+            minhash_buckets(context), context.new_folder("minhash_clusters"), config=MINHASH_CONFIG
+        )
+        step()
+        return step.output_folder.path
+
+    return context.cached("minhash_clusters", compute)
+
+
+step_benchmark(
+    "dedup/MinhashSignature",
+    lambda context: MinhashDedupSignature(context.new_folder("minhash_signatures"), config=MINHASH_CONFIG),
+)
+
+
+@benchmark("dedup/MinhashBuckets")
+def minhash_buckets_benchmark(context):
+    signatures = minhash_signatures(context)
+    step = MinhashDedupBuckets(signatures, context.new_folder("minhash_buckets"), config=MINHASH_CONFIG)
+
+    def run():
+        run_per_bucket(step, MINHASH_CONFIG.num_buckets)
+        return Throughput(len(context.documents()), folder_size(signatures))
+
+    return run
+
+
+@benchmark("dedup/MinhashCluster")
+def minhash_cluster_benchmark(context):
+    buckets = minhash_buckets(context)
+    step = MinhashDedupCluster(buckets, context.new_folder("minhash_clusters"), config=MINHASH_CONFIG)
+
+    def run():
+        step()
+        return Throughput(len(context.documents()), folder_size(buckets))
+
+    return run
+
+
+step_benchmark("dedup/MinhashFilter", lambda context: MinhashDedupFilter(minhash_clusters(context)))
+
+
+@benchmark("dedup/MinhashBuildIndex")
+def minhash_build_index_benchmark(context):
+    signatures = minhash_signatures(context)
+    # unlike the other stages, it does not accept paths
+    step = MinhashBuildIndex(
+        get_datafolder(signatures),
+        get_datafolder(context.new_folder("minhash_index")),
+        "benchmark",
+        config=MINHASH_CONFIG,
+    )
+
+    def run():
+        run_per_bucket(step, MINHASH_CONFIG.num_buckets)
+        return Throughput(len(context.documents()), folder_size(signatures))
+
+    return run
+
+
+# sentence dedup
+def sentence_signatures(context: BenchmarkContext) -> str:
+    return context.cached(
+        "sentence_signatures",
+        lambda: run_on_documents(
+            context, SentenceDedupSignature(context.new_folder("sentence_signatures"), config=SENTENCE_DEDUP_CONFIG)
+        ),
+    )
+
+
+def sentence_duplicates(context: BenchmarkContext) -> str:
+    def compute():
+        step = SentenceFindDedups(
+            sentence_signatures(context), context.new_folder("sentence_duplicates"), config=SENTENCE_DEDUP_CONFIG
+        )
+        step()
+        return step.output_folder.path
+
+    return context.cached("sentence_duplicates", compute)
+
+
+step_benchmark(
+    "dedup/SentenceSignature",
+    lambda context: SentenceDedupSignature(context.new_folder("sentence_signatures"), config=SENTENCE_DEDUP_CONFIG),
+)
+
+
+@benchmark("dedup/SentenceFindDedups")
+def sentence_find_dedups_benchmark(context):
+    signatures = sentence_signatures(context)
+    step = SentenceFindDedups(signatures, context.new_folder("sentence_duplicates"), config=SENTENCE_DEDUP_CONFIG)
+
+    def run():
+        step()
+        return Throughput(len(context.documents()), folder_size(signatures))
+
+    return run
+
+
+step_benchmark(
+    "dedup/SentenceFilter",
+    lambda context: SentenceDedupFilter(sentence_duplicates(context), config=SENTENCE_DEDUP_CONFIG),
+)
+
+
+# url dedup
+def url_signatures(context: BenchmarkContext) -> str:
+    return context.cached(
+        "url_signatures",
+        lambda: run_on_documents(
+            context, UrlDedupSignature(context.new_folder("url_signatures"), config=URL_DEDUP_CONFIG)
+        ),
+    )
+
+
+def url_duplicates(context: BenchmarkContext) -> str:
+    def compute():
+        step = UrlFindDedups(url_signatures(context), context.new_folder("url_duplicates"), config=URL_DEDUP_CONFIG)
+        step()
+        return step.output_folder.path
+
+    return context.cached("url_duplicates", compute)
+
+
+step_benchmark(
+    "dedup/UrlSignature",
+    lambda context: UrlDedupSignature(context.new_folder("url_signatures"), config=URL_DEDUP_CONFIG),
+)
+
+
+@benchmark("dedup/UrlFindDedups")
+def url_find_dedups_benchmark(context):
+    signatures = url_signatures(context)
+    step = UrlFindDedups(signatures, context.new_folder("url_duplicates"), config=URL_DEDUP_CONFIG)
+
+    def run():
+        step()
+        return Throughput(len(context.documents()), folder_size(signatures))
+
+    return run
+
+
+step_benchmark("dedup/UrlFilter", lambda context: UrlDedupFilter(url_duplicates(context), config=URL_DEDUP_CONFIG))
+
+
+# bloom filter
+step_benchmark(
+    "dedup/BloomFilter",
+    lambda context: SingleBloomFilter(
+        context.new_folder("bloom_filter"),
+        # m_bytes is used as a bit mask. k is fixed, the optimal one would make the filter too slow on a small corpus
+        config=BloomFilterConfig(m_bytes=2**24 - 1, k=7, expected_elements=context.text_bytes() // 5),
+    ),
+)
+
+
+# decontamination
+def decont_index(context: BenchmarkContext) -> str:
+    """
+    Builds a decontamination index (as `NGramsDecontIndexer` would) from a synthetic "evaluation task", and from a few
+    documents of the corpus so that some of them are found to be contaminated
+    """
+    config = NGramsDecontConfig()
+    tokenizer = load_word_tokenizer(Languages.english)
+    hash_func = create_hash_func(config.hash_config)
+    task = SyntheticCorpus(CorpusConfig(n_docs=500, seed=context.corpus_config.seed + 1, mean_words=50))
+    contaminated = context.documents()[:: max(1, len(context.documents()) // 20)]
+    hashes = set()
+    for document in [*task.documents(), *contaminated]:
+        tokens = tokenizer.word_tokenize(simplify_text(document.text, config.norm_config))
+        hashes.update(hash_func(" ".join(n_gram)) for n_gram in ngrams(tokens, config.n_grams))
+    folder = context.new_folder("decont_index")
+    np.array(list(hashes), dtype=config.hash_config.np_descr).tofile(
+        os.path.join(folder, "synthetic:benchmark.index.hashes")
+    )
+    return folder
+
+
+@benchmark("decont/NGramsDecontFilter")
+def decont_filter_benchmark(context):
+    step = NGramsDecontFilter(context.cached("decont_index", lambda: decont_index(context)))
+    # loading the index is not timed
+    step.load_index_hashes()
+    documents = context.documents()
+
+    def run():
+        deque(step(documents), maxlen=0)
+        return Throughput(len(documents), context.text_bytes())
+
+    return run
@@ -0,0 +1,70 @@
+"""Readers, writers and decompression backends. MB/s are measured on the (compressed) size of the files read or
+written."""
+
+from collections import deque
+
+from datatrove.io import DataFolder
+from datatrove.pipeline.readers import CSVReader, IpcReader, JsonlReader, ParquetReader, WarcReader
+from datatrove.pipeline.writers import JsonlWriter, ParquetWriter
+
+from .harness import Throughput, benchmark, count_documents, folder_size
+
+
+def reader_benchmark(name: str, file_format: str, make_reader, html: bool = False):
+    @benchmark(f"readers/{name}")
+    def setup(context):
+        folder = context.corpus_files(file_format, html)
+        reader = make_reader(folder)
+        return lambda: Throughput(count_documents(reader()), folder_size(folder))
+
+
+reader_benchmark("Jsonl", "jsonl", JsonlReader)
+reader_benchmark("Parquet", "parquet", ParquetReader)
+reader_benchmark("Parquet[batched]", "parquet", lambda folder: ParquetReader(folder, batched=True))
+reader_benchmark("Ipc", "ipc", IpcReader)
+reader_benchmark("Ipc[batched]", "ipc", lambda folder: IpcReader(folder, batched=True))
+reader_benchmark("Csv", "csv", CSVReader)
+reader_benchmark("Warc", "warc", WarcReader, html=True)
+
+
+def writer_benchmark(name: str, make_writer):
+    @benchmark(f"writers/{name}")
+    def setup(context):
+        output_folder = context.new_folder("writer")
+        writer = make_writer(output_folder)
+        documents = context.documents()
+
+        def run():
+            deque(writer(documents), maxlen=0)
+            return Throughput(len(documents), folder_size(output_folder))
+
+        return run
+
+
+writer_benchmark("Jsonl", JsonlWriter)
+writer_benchmark("Jsonl[uncompressed]", lambda folder: JsonlWriter(folder, compression=None))
+writer_benchmark("Parquet", ParquetWriter)
+
+
+def decompression_benchmark(file_format: str, backend: str, threads: int = 1, html: bool = False):
+    @benchmark(f"decompression/{file_format}[{backend}{f' x{threads}' if threads > 1 else ''}]")
+    def setup(context):
+        folder = context.corpus_files(file_format, html)
+        data_folder = DataFolder(folder, decompression_backend=backend, decompression_threads=threads)
+        files = data_folder.list_files()
+
+        def run():
+            for path in files:
+                with data_folder.open(path, "rb", compression="infer") as f:
+                    while f.read(2**20):
+                        pass
+            return Throughput(context.corpus_config.n_docs, folder_size(folder))
+
+        return run
+
+
+# jsonl files are a single gzip member, warc files one member per record
+for backend in ("python", "isal", "zlib-ng"):
+    decompression_benchmark("jsonl", backend)
+    decompression_benchmark("warc", backend, html=True)
+decompression_benchmark("warc", "parallel", threads=4, html=True)
@@ -0,0 +1,68 @@
+"""Filters, extractors and formatters. MB/s are measured on the text of the input documents."""
+
+import os
+
+from datatrove.pipeline.extractors import ReadabilityInscriptis, Trafilatura
+from datatrove.pipeline.filters import (
+    C4BadWordsFilter,
+    C4ParagraphFilter,
+    C4QualityFilter,
+    FastTextClassifierFilter,
+    FineWebQualityFilter,
+    GopherQualityFilter,
+    GopherRepetitionFilter,
+    LambdaFilter,
+    LanguageFilter,
+    RegexFilter,
+    SamplerFilter,
+    UnigramLogProbFilter,
+    URLFilter,
+)
+from datatrove.pipeline.formatters import FTFYFormatter, PIIFormatter, SymbolLinesFormatter
+
+from .harness import BenchmarkContext, step_benchmark
+
+
+def train_fasttext_model(context: BenchmarkContext) -> str:
+    """
+    Trains a small fastText classifier on the corpus, so that the benchmark does not need to download a model
+    """
+    import fasttext
+
+    folder = context.new_folder("fasttext")
+    with open(os.path.join(folder, "train.txt"), "wt") as f:
+        for document in context.documents():
+            label = "short" if len(document.text) < 1000 else "long"
+            f.write(f"__label__{label} {document.text.replace(chr(10), ' ')}\n")
+    model = fasttext.train_supervised(
+        os.path.join(folder, "train.txt"), epoch=1, dim=32, minCount=1, thread=1, verbose=0
+    )
+    model.save_model(os.path.join(folder, "model.bin"))
+    return os.path.join(folder, "model.bin")
+
+
+step_benchmark("filters/C4Quality", lambda context: C4QualityFilter())
+step_benchmark("filters/C4Paragraph", lambda context: C4ParagraphFilter())
+step_benchmark("filters/C4BadWords", lambda context: C4BadWordsFilter())
+step_benchmark(
+    "filters/FastTextClassifier",
+    lambda context: FastTextClassifierFilter(
+        context.cached("fasttext_model", lambda: train_fasttext_model(context)), keep_labels=("long", 0.5)
+    ),
+)
+step_benchmark("filters/FineWebQuality", lambda context: FineWebQualityFilter())
+step_benchmark("filters/GopherQuality", lambda context: GopherQualityFilter())
+step_benchmark("filters/GopherRepetition", lambda context: GopherRepetitionFilter())
+step_benchmark("filters/Lambda", lambda context: LambdaFilter(lambda doc: len(doc.text) > 500))
+step_benchmark("filters/Language", lambda context: LanguageFilter())
+step_benchmark("filters/Regex", lambda context: RegexFilter(r"(?i)lorem ipsum|\bjavascript\b|\d+\.\d+\.\d+\.\d+"))
+step_benchmark("filters/Sampler", lambda context: SamplerFilter(rate=0.5, seed=0))
+step_benchmark("filters/UnigramLogProb", lambda context: UnigramLogProbFilter())
+step_benchmark("filters/URL", lambda context: URLFilter())
+
+step_benchmark("extractors/Trafilatura", lambda context: Trafilatura(timeout=1), html=True)
+step_benchmark("extractors/ReadabilityInscriptis", lambda context: ReadabilityInscriptis(timeout=1), html=True)
+
+step_benchmark("formatters/FTFY", lambda context: FTFYFormatter())
+step_benchmark("formatters/PII", lambda context: PIIFormatter())
+step_benchmark("formatters/SymbolLines", lambda context: SymbolLinesFormatter())
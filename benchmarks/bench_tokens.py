@@ -0,0 +1,61 @@
+"""Tokenization and merging of the tokenized files. MB/s are measured on the text of the documents for the tokenizer,
+and on the size of the tokenized files for the merger."""
+
+import os
+
+from datatrove.pipeline.tokens import DocumentTokenizer, DocumentTokenizerMerger
+
+from .harness import BenchmarkContext, Throughput, benchmark, step_benchmark
+
+
+def train_tokenizer(context: BenchmarkContext) -> str:
+    """
+    Trains a small BPE tokenizer on the corpus, so that the benchmark does not need to download one
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    trainer = trainers.BpeTrainer(vocab_size=8192, special_tokens=["<|endoftext|>"], show_progress=False)
+    tokenizer.train_from_iterator((document.text for document in context.documents()), trainer=trainer)
+    path = os.path.join(context.new_folder("tokenizer"), "tokenizer.json")
+    tokenizer.save(path)
+    return path
+
+
+def tokenizer_path(context: BenchmarkContext) -> str:
+    return context.cached("tokenizer", lambda: train_tokenizer(context))
+
+
+def tokenized_files(context: BenchmarkContext) -> str:
+    def compute():
+        step = DocumentTokenizer(context.new_folder("tokenized"), tokenizer_name_or_path=tokenizer_path(context))
+        step(context.documents())
+        return step.output_folder.path
+
+    return context.cached("tokenized", compute)
+
+
+step_benchmark(
+    "tokens/DocumentTokenizer",
+    lambda context: DocumentTokenizer(context.new_folder("tokenized"), tokenizer_name_or_path=tokenizer_path(context)),
+)
+
+
+@benchmark("tokens/DocumentTokenizerMerger")
+def merger_benchmark(context):
+    input_folder = tokenized_files(context)
+    step = DocumentTokenizerMerger(input_folder, context.new_folder("merged"), save_filename="merged", progress=False)
+
+    def run():
+        step()
+        return Throughput(
+            len(context.documents()),
+            sum(
+                os.path.getsize(os.path.join(input_folder, filename))
+                for filename in os.listdir(input_folder)
+                if filename.endswith(".ds")
+            ),
+        )
+
+    return run
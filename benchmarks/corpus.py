@@ -0,0 +1,305 @@
+import csv
+import io
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from datatrove.data import Document
+
+
+# (small) vocabularies, most frequent words first. Words are drawn following a zipf distribution
+VOCABULARIES = {
+    "en": (
+        "the of and to a in is that for it was on with as be by at this have from or an are not but which "
+        "you all were we his one they their has been had more can there will would about time new first also "
+        "other some people when what year into only two over most could after its world then these city "
+        "state many may work school life government system part between through during company under group "
+        "water history number university family because same north south game music house best book found "
+        "where well around public market small place country early series national until although support "
+        "local against without development research science program member season service human several "
+        "information children report energy language building summer winter student education"
+    ).split(),
+    "fr": (
+        "de la le et les des en un du une est que pour dans qui par sur au pas plus avec il ne ce sont elle se "
+        "nous vous mais ou comme tout aussi bien faire fait peut leur ans deux entre sans notre temps ville "
+        "pays histoire monde gouvernement travail école famille musique maison livre eau nombre groupe société"
+    ).split(),
+    "de": (
+        "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus "
+        "er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder aber "
+        "Stadt Land Geschichte Welt Regierung Arbeit Schule Familie Musik Haus Buch Wasser Zahl Gruppe Jahr"
+    ).split(),
+    "es": (
+        "de la que el en y a los del se las por un para con no una su al es lo como más pero sus le ya o este "
+        "ciudad país historia mundo gobierno trabajo escuela familia música casa libro agua número grupo año"
+    ).split(),
+}
+# languages without a vocabulary get pseudo-words made of characters of their script
+ALPHABETS = {
+    "ru": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+    "el": "αβγδεζηθικλμνξοπρστυφχψω",
+    "ar": "ابتثجحخدذرزسشصضطظعغفقكلمنهوي",
+    "zh": "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年得就那要下以生会自着去之过家学对可她里后小么",
+}
+# languages written without spaces between words
+NO_SPACE_LANGUAGES = {"zh"}
+TLDS = ("com", "org", "net", "co.uk", "de", "fr", "io", "info")
+BULLETS = ("• ", "- ", "* ")
+
+
+@dataclass
+class CorpusConfig:
+    """Parameters of a synthetic corpus. The same config always generates the same documents.
+
+    Args:
+        n_docs: number of documents
+        seed: random seed
+        mean_words: median number of words per document (lengths follow a lognormal distribution)
+        length_sigma: sigma of the lognormal distribution of lengths. 0 for documents of (almost) the same length
+        min_words: minimum number of words per document
+        max_words: maximum number of words per document
+        duplicate_rate: fraction of documents that are exact copies (text and url) of a previous document
+        near_duplicate_rate: fraction of documents that are copies of a previous document with a few changed words
+        languages: mapping of language code to its share of the documents. Languages without a vocabulary (ru, el,
+            ar, zh) use pseudo-words made of characters of their script
+        html_rate: fraction of documents that are html pages (with navigation, boilerplate, etc) instead of text
+        noise_rate: fraction of lines with noise (bullets, symbols, emails, ips, mojibake, short menu lines)
+        n_domains: number of different domains in the urls
+    """
+
+    n_docs: int = 2000
+    seed: int = 42
+    mean_words: int = 300
+    length_sigma: float = 0.8
+    min_words: int = 10
+    max_words: int = 20000
+    duplicate_rate: float = 0.05
+    near_duplicate_rate: float = 0.05
+    languages: dict[str, float] = field(default_factory=lambda: {"en": 1.0})
+    html_rate: float = 0.0
+    noise_rate: float = 0.05
+    n_domains: int = 500
+
+
+class SyntheticCorpus:
+    """Deterministic generator of synthetic web documents, used to benchmark pipeline steps without downloading data.
+        Documents have paragraphs of sentences of zipf-distributed words, `url`, `language` and `dump` metadata, and
+        can be saved in every format supported by the readers (see `save`).
+
+    Args:
+        config: the corpus parameters
+    """
+
+    def __init__(self, config: CorpusConfig | None = None):
+        self.config = config or CorpusConfig()
+        rng = random.Random(self.config.seed)
+        self._vocabularies = {}
+        for language in self.config.languages:
+            if language in VOCABULARIES:
+                words = VOCABULARIES[language]
+            elif language in ALPHABETS:
+                alphabet = ALPHABETS[language]
+                length = (1, 3) if language in NO_SPACE_LANGUAGES else (2, 9)
+                words = ["".join(rng.choices(alphabet, k=rng.randint(*length))) for _ in range(500)]
+            else:
+                raise ValueError(f"No vocabulary or alphabet for {language=}")
+            self._vocabularies[language] = (words, [1 / (rank + 1) for rank in range(len(words))])
+        self._domains = [
+            f"www.{self._random_word(rng)}{rng.randint(0, 999)}.{rng.choice(TLDS)}"
+            for _ in range(self.config.n_domains)
+        ]
+
+    def _random_word(self, rng: random.Random, language: str | None = None) -> str:
+        """A word of `language`, or an (ascii) english word for urls, emails, etc"""
+        if language is None:
+            return rng.choice(VOCABULARIES["en"])
+        words, weights = self._vocabularies[language]
+        return rng.choices(words, weights)[0]
+
+    def _sentence(self, rng: random.Random, language: str, n_words: int) -> str:
+        words, weights = self._vocabularies[language]
+        sentence = rng.choices(words, weights, k=n_words)
+        if language in NO_SPACE_LANGUAGES:
+            return "".join(sentence) + "。"
+        sentence[0] = sentence[0].capitalize()
+        if n_words > 6 and rng.random() < 0.2:
+            sentence[rng.randrange(1, n_words - 1)] += ","
+        return " ".join(sentence) + rng.choices((".", "?", "!"), (0.9, 0.05, 0.05))[0]
+
+    def _noise_line(self, rng: random.Random, language: str) -> str:
+        kind = rng.randrange(6)
+        if kind == 0:
+            return rng.choice(BULLETS) + self._sentence(rng, language, rng.randint(3, 10))
+        if kind == 1:
+            return rng.choice(("#", "*", "=", "~")) * rng.randint(3, 40)
+        if kind == 2:
+            return f"Contact: {self._random_word(rng)}.{rng.randint(1, 99)}@{rng.choice(self._domains)[4:]}"
+        if kind == 3:
+            return f"Server {'.'.join(str(rng.randint(1, 254)) for _ in range(4))} is up."
+        if kind == 4:
+            # mojibake, for ftfy
+            return "The cafÃ© was Ã  la mode â€” donâ€™t miss it."
+        return " | ".join(self._random_word(rng, language).capitalize() for _ in range(rng.randint(2, 6)))
+
+    def _text(self, rng: random.Random, language: str, n_words: int) -> list[list[str]]:
+        """Paragraphs of lines"""
+        paragraphs = []
+        while n_words > 0:
+            lines = []
+            for _ in range(rng.randint(1, 6)):
+                if rng.random() < self.config.noise_rate:
+                    lines.append(self._noise_line(rng, language))
+                    continue
+                length = min(n_words, max(3, int(rng.gauss(18, 8))))
+                lines.append(self._sentence(rng, language, length))
+                n_words -= length
+                if n_words <= 0:
+                    break
+            paragraphs.append(lines)
+        return paragraphs
+
+    def _html(self, rng: random.Random, paragraphs: list[list[str]], language: str) -> str:
+        title = self._sentence(rng, language, rng.randint(3, 8))
+        menu = "".join(
+            f'<li><a href="/{self._random_word(rng)}">{self._random_word(rng, language)}</a></li>'
+            for _ in range(rng.randint(3, 10))
+        )
+        body = "\n".join(
+            f"<h2>{lines[0]}</h2>" if len(lines) == 1 else "<p>" + "<br>\n".join(lines) + "</p>"
+            for lines in paragraphs
+        )
+        return (
+            f'<!DOCTYPE html>\n<html lang="{language}"><head><meta charset="utf-8"><title>{title}</title>'
+            "<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>"
+            "<style>body { font-family: sans-serif; }</style></head>\n"
+            f'<body><header><nav><ul class="menu">{menu}</ul></nav></header>\n'
+            f"<main><article><h1>{title}</h1>\n{body}\n</article></main>\n"
+            f"<footer><p>© {rng.randint(1998, 2024)} {self._random_word(rng, language)}. All rights reserved.</p>"
+            '<a href="/privacy">Privacy policy</a></footer></body></html>'
+        )
+
+    def documents(self) -> Iterator[Document]:
+        """
+        Generates the documents of the corpus
+        """
+        config = self.config
+        rng = random.Random(config.seed)
+        languages, language_weights = list(config.languages), list(config.languages.values())
+        previous = []
+        for i in range(config.n_docs):
+            r = rng.random()
+            if previous and r < config.duplicate_rate:
+                text, url, language, html = rng.choice(previous)
+            elif previous and r < config.duplicate_rate + config.near_duplicate_rate:
+                text, _, language, html = rng.choice(previous)
+                words = text.split(" ")
+                for _ in range(max(1, len(words) // 50)):
+                    words[rng.randrange(len(words))] = self._random_word(rng, language)
+                text = " ".join(words)
+                url = f"https://{rng.choice(self._domains)}/{i}"
+            else:
+                language = rng.choices(languages, language_weights)[0]
+                n_words = int(rng.lognormvariate(0, config.length_sigma) * config.mean_words)
+                paragraphs = self._text(rng, language, min(max(n_words, config.min_words), config.max_words))
+                html = rng.random() < config.html_rate
+                if html:
+                    text = self._html(rng, paragraphs, language)
+                else:
+                    text = "\n\n".join("\n".join(lines) for lines in paragraphs)
+                path = "/".join(self._random_word(rng).lower() for _ in range(rng.randint(1, 3)))
+                url = f"https://{rng.choice(self._domains)}/{path}/{i}"
+            previous.append((text, url, language, html))
+            yield Document(
+                text=text,
+                id=f"synthetic-{config.seed}-{i}",
+                metadata={"url": url, "language": language, "dump": "synthetic"},
+            )
+
+    def save(self, output_folder: str, file_format: str = "jsonl", n_files: int = 4) -> list[str]:
+        """
+            Saves the corpus to `n_files` files of a given format, readable by the corresponding reader
+        Args:
+            output_folder: local folder to save the files to
+            file_format: one of "jsonl" (gzip compressed), "parquet", "ipc", "csv" or "warc" (gzip compressed, with
+                an http response record per document)
+            n_files: number of files to split the documents into
+
+        Returns: the paths of the saved files
+
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        shards = [[] for _ in range(n_files)]
+        for i, document in enumerate(self.documents()):
+            shards[i % n_files].append(document)
+        extension = {"jsonl": "jsonl.gz", "parquet": "parquet", "ipc": "arrow", "csv": "csv", "warc": "warc.gz"}
+        if file_format not in extension:
+            raise ValueError(f"Unknown {file_format=}")
+        paths = []
+        for shard_i, documents in enumerate(shards):
+            path = os.path.join(output_folder, f"{shard_i:05d}.{extension[file_format]}")
+            getattr(self, f"_save_{file_format}")(documents, path)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def _save_jsonl(documents: list[Document], path: str):
+        import gzip
+
+        with gzip.open(path, "wt") as f:
+            for document in documents:
+                f.write(json.dumps({"text": document.text, "id": document.id, "metadata": document.metadata}) + "\n")
+
+    @staticmethod
+    def _table(documents: list[Document]):
+        import pyarrow as pa
+
+        return pa.Table.from_pydict(
+            {
+                "text": [document.text for document in documents],
+                "id": [document.id for document in documents],
+                **{key: [document.metadata[key] for document in documents] for key in documents[0].metadata},
+            }
+        )
+
+    def _save_parquet(self, documents: list[Document], path: str):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self._table(documents), path)
+
+    def _save_ipc(self, documents: list[Document], path: str):
+        import pyarrow as pa
+
+        table = self._table(documents)
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1000)
+
+    @staticmethod
+    def _save_csv(documents: list[Document], path: str):
+        with open(path, "wt", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["text", "id", *documents[0].metadata])
+            writer.writeheader()
+            for document in documents:
+                writer.writerow({"text": document.text, "id": document.id, **document.metadata})
+
+    @staticmethod
+    def _save_warc(documents: list[Document], path: str):
+        from warcio.statusandheaders import StatusAndHeaders
+        from warcio.warcwriter import WARCWriter
+
+        with open(path, "wb") as f:
+            writer = WARCWriter(f, gzip=True)
+            for document in documents:
+                payload = document.text.encode("utf-8")
+                http_headers = StatusAndHeaders(
+                    "200 OK", [("Content-Type", "text/html; charset=utf-8")], protocol="HTTP/1.1"
+                )
+                record = writer.create_warc_record(
+                    document.metadata["url"],
+                    "response",
+                    payload=io.BytesIO(payload),
+                    http_headers=http_headers,
+                    warc_headers_dict={"WARC-Identified-Payload-Type": "text/html"},
+                )
+                writer.write_record(record)
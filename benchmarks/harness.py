@@ -0,0 +1,228 @@
+import copy
+import fnmatch
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from collections import deque
+from dataclasses import asdict, dataclass, replace
+from typing import Callable
+
+from datatrove.data import Document, DocumentBatch
+from datatrove.pipeline.base import PipelineStep
+
+from .corpus import CorpusConfig, SyntheticCorpus
+
+
+@dataclass
+class Throughput:
+    """What a benchmark processed in one run
+
+    Args:
+        docs: number of documents
+        bytes: number of bytes (of text for processing steps, of files for readers and writers)
+    """
+
+    docs: int
+    bytes: int
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    docs: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / self.seconds / 1e6 if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"docs_per_second": self.docs_per_second, "mb_per_second": self.mb_per_second}
+
+
+# a benchmark prepares everything that should not be timed and returns the function to time
+BenchmarkSetup = Callable[["BenchmarkContext"], Callable[[], Throughput]]
+BENCHMARKS: dict[str, BenchmarkSetup] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark as "group/name". The decorated function is called before each timed run
+    """
+
+    def register(setup: BenchmarkSetup) -> BenchmarkSetup:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} is already registered")
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class BenchmarkContext:
+    """Shared state of a benchmark session: the synthetic corpus (as documents and saved in each file format) and a
+        temporary folder, deleted on `close`.
+
+    Args:
+        corpus_config: config of the text corpus. Extractors use an html version of it
+        tmp_dir: where to save the corpus files and the outputs of each run. A temporary folder by default
+    """
+
+    def __init__(self, corpus_config: CorpusConfig, tmp_dir: str | None = None):
+        self.corpus_config = corpus_config
+        self.tmp_dir = tmp_dir or tempfile.mkdtemp(prefix="datatrove-benchmarks-")
+        self._cache = {}
+
+    def cached(self, key: str, compute: Callable):
+        """
+        Result of `compute()`, computed once per session (e.g. the outputs of a previous stage of a pipeline)
+        """
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _documents(self, html: bool) -> list[Document]:
+        config = replace(self.corpus_config, html_rate=1.0) if html else self.corpus_config
+        return self.cached(f"documents-{html}", lambda: list(SyntheticCorpus(config).documents()))
+
+    def documents(self, html: bool = False) -> list[Document]:
+        """
+        A fresh copy of the documents of the corpus (steps can modify them)
+        """
+        return copy.deepcopy(self._documents(html))
+
+    def text_bytes(self, html: bool = False) -> int:
+        return self.cached(
+            f"text_bytes-{html}", lambda: sum(len(document.text.encode()) for document in self._documents(html))
+        )
+
+    def corpus_files(self, file_format: str, html: bool = False) -> str:
+        """
+        Folder with the corpus saved in a given format (see `SyntheticCorpus.save`)
+        """
+        config = replace(self.corpus_config, html_rate=1.0) if html else self.corpus_config
+
+        def save():
+            folder = os.path.join(self.tmp_dir, f"corpus_{'html_' if html else ''}{file_format}")
+            SyntheticCorpus(config).save(folder, file_format)
+            return folder
+
+        return self.cached(f"corpus_files-{file_format}-{html}", save)
+
+    def new_folder(self, prefix: str) -> str:
+        """
+        A new empty folder, for the outputs of a run
+        """
+        return tempfile.mkdtemp(prefix=f"{prefix}-", dir=self.tmp_dir)
+
+    def close(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def folder_size(folder: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(folder)
+        for filename in filenames
+    )
+
+
+def count_documents(data) -> int:
+    """
+    Consumes the output of a pipeline step, which can be a stream of documents or of DocumentBatch
+    """
+    return sum(len(item) if isinstance(item, DocumentBatch) else 1 for item in data)
+
+
+def step_benchmark(name: str, make_step: Callable[[BenchmarkContext], PipelineStep], html: bool = False):
+    """
+        Registers a benchmark of a step processing the documents of the corpus
+    Args:
+        name: "group/name" of the benchmark
+        make_step: creates the step to benchmark (not timed)
+        html: use the html version of the corpus (for extractors)
+
+    Returns:
+
+    """
+
+    @benchmark(name)
+    def setup(context: BenchmarkContext) -> Callable[[], Throughput]:
+        step = make_step(context)
+        documents = context.documents(html)
+
+        def run():
+            # steps that only write files (e.g. the tokenizer) return nothing
+            deque(step(documents) or [], maxlen=0)
+            return Throughput(len(documents), context.text_bytes(html))
+
+        return run
+
+
+def select_benchmarks(patterns: list[str] | None = None) -> list[str]:
+    """
+    Names of the registered benchmarks matching any of the (glob) patterns, e.g. "dedup/*" or "*Parquet*"
+    """
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+
+def run_benchmark(name: str, context: BenchmarkContext, repeats: int = 3) -> BenchmarkResult:
+    """
+        Runs a benchmark `repeats` times and keeps the fastest run. Benchmarks that can not run (missing optional
+        dependency or resource) are returned with an `error`
+    Args:
+        name: name of the registered benchmark
+        context: the benchmark session
+        repeats: number of timed runs
+
+    Returns: the result of the fastest run
+
+    """
+    result = BenchmarkResult(name)
+    try:
+        for _ in range(repeats):
+            run = BENCHMARKS[name](context)
+            start = time.perf_counter()
+            throughput = run()
+            seconds = time.perf_counter() - start
+            if not result.seconds or seconds < result.seconds:
+                result.docs, result.bytes, result.seconds = throughput.docs, throughput.bytes, seconds
+    except Exception as e:
+        # first informative line of the message (nltk's are framed by lines of "*")
+        message = next((line.strip() for line in str(e).splitlines() if any(c.isalnum() for c in line)), "")
+        result.error = f"{type(e).__name__}: {message}"
+        if os.environ.get("DATATROVE_BENCHMARK_TRACEBACKS") == "1":
+            traceback.print_exc()
+    return result
+
+
+def compare_results(results: list[dict], baseline: list[dict], threshold: float = 0.1) -> list[tuple[str, float]]:
+    """
+        Finds the benchmarks that got slower than a previous run
+    Args:
+        results: current results (`BenchmarkResult.to_dict`)
+        baseline: results of a previous run
+        threshold: relative decrease of docs/s above which a benchmark is considered a regression
+
+    Returns: list of (name, relative change of docs/s) of each regression
+
+    """
+    previous = {result["name"]: result for result in baseline if not result.get("error")}
+    regressions = []
+    for result in results:
+        if result.get("error") or result["name"] not in previous or not previous[result["name"]]["docs_per_second"]:
+            continue
+        change = result["docs_per_second"] / previous[result["name"]]["docs_per_second"] - 1
+        if change < -threshold:
+            regressions.append((result["name"], change))
+    return regressions
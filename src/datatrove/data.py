@@ -1,7 +1,12 @@
 """Data classes for the datatrove package."""
 
-from dataclasses import dataclass, field
-from typing import Generator, NewType
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, Iterator, NewType
+
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pyarrow as pa
 
 
 class MediaType:
@@ -28,9 +33,52 @@ class Media:
     local_path: str | None = None
 
 
-@dataclass
+class _MediaField:
+    """Stores the media of a `Document`. The (empty) list of documents created without media is only allocated the
+    first time it is accessed.
+    """
+
+    def __get__(self, document: "Document | None", owner=None):
+        if document is None:
+            # default value for the dataclass field
+            return None
+        media = document._media
+        if media is None:
+            document._media = media = []
+        return media
+
+    def __set__(self, document: "Document", value):
+        document._media = value
+
+
+class _MetadataField:
+    """Stores the metadata of a `Document`. Readers can store the raw data of a sample together with a loader function
+    that turns it into the metadata dictionary (see `Document.with_metadata_loader`). The loader is only called the
+    first time the metadata is accessed.
+    """
+
+    def __get__(self, document: "Document | None", owner=None):
+        if document is None:
+            # default value for the dataclass field
+            return None
+        metadata = document._metadata
+        if (loader := document._metadata_loader) is not None:
+            document._metadata = metadata = loader(metadata)
+            document._metadata_loader = None
+        elif metadata is None:
+            document._metadata = metadata = {}
+        return metadata
+
+    def __set__(self, document: "Document", value):
+        document._metadata = value
+        document._metadata_loader = None
+
+
+@dataclass(init=False)
 class Document:
     """Main Document dataclass going through the processing pipeline
+        Documents are slotted and their media list is only created when accessed. Readers can also defer building
+        the metadata dictionary until a step accesses it (see `with_metadata_loader`).
 
     Args:
         text: str
@@ -43,10 +91,272 @@ class Document:
             a dictionary where any additional info may be stored
     """
 
+    __slots__ = ("text", "id", "_media", "_metadata", "_metadata_loader")
+
     text: str
     id: str
-    media: list[Media] = field(default_factory=list)
-    metadata: dict[str, str | int | float | bool] = field(default_factory=dict)
+    media: list[Media] = _MediaField()
+    metadata: dict[str, str | int | float | bool] = _MetadataField()
+
+    def __init__(
+        self,
+        text: str,
+        id: str,
+        media: list[Media] | None = None,
+        metadata: dict[str, str | int | float | bool] = None,
+    ):
+        # slots are set directly: documents are created for every single sample
+        self.text = text
+        self.id = id
+        self._media = media
+        self._metadata = metadata
+        self._metadata_loader = None
+
+    @classmethod
+    def with_metadata_loader(
+        cls, text: str, id: str, raw_metadata: dict, metadata_loader: Callable[[dict], dict], media=None
+    ) -> "Document":
+        """
+            Creates a document whose metadata is only built (by calling `metadata_loader(raw_metadata)`) when first
+            accessed. The same loader can be shared by many documents
+        Args:
+            text: the text content of the document
+            id: the document id
+            raw_metadata: the raw data to build the metadata from
+            metadata_loader: function returning the metadata dictionary from `raw_metadata`
+            media: the media associated with the document
+
+        Returns: a Document
+
+        """
+        document = cls(text, id, media, raw_metadata)
+        document._metadata_loader = metadata_loader
+        return document
+
+    def copy(self) -> "Document":
+        """
+            Shallow copy of this document, whose metadata and media can be modified without affecting the original.
+            Metadata that was not loaded yet (see `with_metadata_loader`) is only loaded when accessed
+        Returns: a Document
+
+        """
+        document = Document(self.text, self.id, list(self._media) if self._media is not None else None)
+        # loaders can modify the raw data they are given: it is also copied
+        document._metadata = dict(self._metadata) if self._metadata is not None else None
+        document._metadata_loader = self._metadata_loader
+        return document
+
+    def __getstate__(self):
+        return self.text, self.id, self.media, self.metadata
+
+    def __setstate__(self, state):
+        self.text, self.id, self.media, self.metadata = state
+
+
+# placeholder for metadata keys that a given document in a DocumentBatch does not have
+_MISSING = type("_Missing", (), {"__repr__": lambda self: "<missing>"})()
+
+
+def _object_array(values: Iterable) -> "np.ndarray":
+    import numpy as np
+
+    values = list(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class DocumentBatch:
+    """Columnar representation of a batch of documents.
+        Text, ids, media and each metadata key are stored as separate numpy (object) arrays, so that steps that
+        support batches (see `PipelineStep.run_batch`) can process and filter documents without creating a `Document`
+        object for each sample.
+
+    Args:
+        text: the text content of each sample
+        id: the id of each sample
+        media: the media associated with each sample. None if no sample has media
+        metadata: a dictionary of metadata columns. Samples without a given metadata key have the `_MISSING`
+            placeholder in the respective column
+    """
+
+    __slots__ = ("text", "id", "media", "metadata")
+
+    def __init__(
+        self,
+        text: Iterable[str],
+        id: Iterable[str],
+        media: Iterable[list[Media]] | None = None,
+        metadata: dict[str, Iterable] | None = None,
+    ):
+        # numpy is only imported once batches are used
+        import numpy as np
+
+        self.text: np.ndarray = text if isinstance(text, np.ndarray) else _object_array(text)
+        self.id: np.ndarray = id if isinstance(id, np.ndarray) else _object_array(id)
+        self.media: np.ndarray | None = (
+            media if media is None or isinstance(media, np.ndarray) else _object_array(media)
+        )
+        self.metadata: dict[str, np.ndarray] = {
+            key: column if isinstance(column, np.ndarray) else _object_array(column)
+            for key, column in (metadata or {}).items()
+        }
+
+    def __len__(self):
+        return len(self.text)
+
+    def __repr__(self):
+        return f"DocumentBatch({len(self)} documents, metadata={list(self.metadata)})"
+
+    def __getitem__(self, item) -> "DocumentBatch":
+        """
+            Select a subset of the documents in this batch
+        Args:
+            item: a slice, a boolean mask or an array of indices
+
+        Returns: a new DocumentBatch
+
+        """
+        return DocumentBatch(
+            self.text[item],
+            self.id[item],
+            self.media[item] if self.media is not None else None,
+            {key: column[item] for key, column in self.metadata.items()},
+        )
+
+    def filter(self, mask: "np.ndarray | list[bool]") -> "DocumentBatch":
+        """
+            Keep only the documents for which `mask` is True
+        Args:
+            mask: a boolean value for each document in the batch
+
+        Returns: a new DocumentBatch with the kept documents
+
+        """
+        import numpy as np
+
+        mask = np.asarray(mask, dtype=bool)
+        return self if mask.all() else self[mask]
+
+    def get_document(self, index: int) -> Document:
+        """
+        Creates a `Document` object for the sample at position `index`
+        """
+        return Document(
+            text=self.text[index],
+            id=self.id[index],
+            media=self.media[index] if self.media is not None else None,
+            metadata={key: value for key, column in self.metadata.items() if (value := column[index]) is not _MISSING},
+        )
+
+    def to_documents(self) -> Iterator[Document]:
+        for index in range(len(self)):
+            yield self.get_document(index)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "DocumentBatch":
+        """
+        Creates a batch from a list of `Document`
+        """
+        import numpy as np
+
+        documents = list(documents)
+        metadata = {}
+        for di, document in enumerate(documents):
+            for key, value in document.metadata.items():
+                if key not in metadata:
+                    metadata[key] = np.full(len(documents), _MISSING, dtype=object)
+                metadata[key][di] = value
+        return cls(
+            [document.text for document in documents],
+            [document.id for document in documents],
+            [document.media for document in documents] if any(document.media for document in documents) else None,
+            metadata,
+        )
+
+    @classmethod
+    def from_arrow(cls, batch: "pa.RecordBatch", text_key: str = "text", id_key: str = "id") -> "DocumentBatch":
+        """
+            Creates a batch from an arrow RecordBatch. Follows the same conventions as `BaseReader._default_adapter`:
+            fields of a `metadata` struct column and any column other than text, id and media become metadata columns.
+            If the batch has no `id_key` column, the ids are set to None and should be filled by the caller.
+        Args:
+            batch: arrow RecordBatch
+            text_key: name of the text column
+            id_key: name of the id column
+
+        Returns: DocumentBatch
+
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        def to_numpy(array: pa.Array) -> np.ndarray:
+            # numpy conversion is only lossless for non nested types without nulls (ints with nulls become floats)
+            if array.null_count or not (
+                pa.types.is_integer(array.type)
+                or pa.types.is_floating(array.type)
+                or pa.types.is_boolean(array.type)
+                or pa.types.is_string(array.type)
+                or pa.types.is_large_string(array.type)
+            ):
+                return _object_array(array.to_pylist())
+            return array.to_numpy(zero_copy_only=False).astype(object, copy=False)
+
+        columns = dict(zip(batch.schema.names, batch.columns))
+        text = to_numpy(columns.pop(text_key)) if text_key in columns else np.full(len(batch), "", dtype=object)
+        ids = to_numpy(columns.pop(id_key)) if id_key in columns else np.full(len(batch), None, dtype=object)
+        media = columns.pop("media").to_pylist() if "media" in columns else None
+        metadata = {}
+        if isinstance(metadata_column := columns.pop("metadata", None), pa.StructArray):
+            for field, child in zip(metadata_column.type, metadata_column.flatten()):
+                metadata[field.name] = to_numpy(child)
+        metadata |= {key: to_numpy(column) for key, column in columns.items()}
+        return cls(text, ids, media, metadata)
+
+    def to_arrow(self, expand_metadata: bool = False) -> "pa.RecordBatch":
+        """
+        Converts this batch into an arrow RecordBatch, with the same columns that `DiskWriter._default_adapter`
+        would produce: text, id, media (only if any document has media) and metadata (a struct column, or one
+        column per key if `expand_metadata` is True).
+        """
+        import pyarrow as pa
+
+        def to_arrow_array(column: "np.ndarray") -> pa.Array:
+            return pa.array([None if value is _MISSING else value for value in column])
+
+        data = {"text": pa.array(self.text.tolist(), pa.string()), "id": pa.array(self.id.tolist(), pa.string())}
+        if self.media is not None and any(self.media):
+            data["media"] = pa.array(self.media.tolist())
+        metadata = {key: to_arrow_array(column) for key, column in self.metadata.items()}
+        if expand_metadata:
+            data |= metadata
+        elif metadata:
+            data["metadata"] = pa.StructArray.from_arrays(list(metadata.values()), names=list(metadata.keys()))
+        return pa.RecordBatch.from_pydict(data)
 
 
 DocumentsPipeline = NewType("DocumentsPipeline", Generator[Document, None, None] | None)
+
+
+class BatchedDocumentsPipeline:
+    """Wraps a stream of `DocumentBatch`, so that the next pipeline steps know that they are receiving batches.
+        Steps that support batches will process them directly while other steps will receive the individual
+        `Document` objects (see `PipelineStep.__call__`).
+
+    Args:
+        batches: iterable of DocumentBatch
+    """
+
+    def __init__(self, batches: Iterable[DocumentBatch]):
+        self.batches = batches
+
+    def __iter__(self) -> Iterator[DocumentBatch]:
+        return iter(self.batches)
+
+    def to_documents(self) -> DocumentsPipeline:
+        """
+        Flattens the stream of batches into a stream of `Document`
+        """
+        for batch in self.batches:
+            yield from batch.to_documents()
@@ -1,2 +1,17 @@
-from .local import LocalPipelineExecutor
-from .slurm import SlurmPipelineExecutor
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .local import LocalPipelineExecutor
+    from .slurm import SlurmPipelineExecutor
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "local": ["LocalPipelineExecutor"],
+        "slurm": ["SlurmPipelineExecutor"],
+    },
+)
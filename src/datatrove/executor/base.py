@@ -1,12 +1,20 @@
 import dataclasses
 import json
+import math
 from abc import ABC, abstractmethod
 from collections import deque
 from collections.abc import Sequence
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
-from datatrove.io import DataFolderLike, get_datafolder
+from datatrove.data import BatchedDocumentsPipeline
+from datatrove.io import DataFolder, DataFolderLike, get_datafolder
 from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.extractors.base import BaseExtractor
+from datatrove.pipeline.filters.base_filter import BaseFilter
+from datatrove.pipeline.readers.base import BaseDiskReader, BaseReader
+from datatrove.pipeline.writers.disk_base import DiskWriter
+from datatrove.utils.checkpointing import CheckpointTracker
+from datatrove.utils.completions import CompletionStore
 from datatrove.utils.logging import (
     add_task_logger,
     close_task_logger,
@@ -15,7 +23,17 @@ from datatrove.utils.logging import (
     log_pipeline,
     logger,
 )
-from datatrove.utils.stats import PipelineStats
+from datatrove.utils.profiling import SamplingProfiler, merge_profiles
+from datatrove.utils.progress import ProgressReporter
+from datatrove.utils.speculation import SpeculativeAttempt
+from datatrove.utils.stats import PipelineStats, ResourceStats, get_pipeline_stats, measure_startup
+
+
+if TYPE_CHECKING:
+    from datatrove.utils.planning import PipelinePlan
+
+# steps that yield (or drop) each document before receiving the next one, see `checkpoints`
+CHECKPOINT_SAFE_STEPS = (BaseReader, BaseFilter, BaseExtractor, DiskWriter)
 
 
 class PipelineExecutor(ABC):
@@ -27,6 +45,28 @@ class PipelineExecutor(ABC):
         logging_dir: where to save logs, stats, etc. Should be parsable into a datatrove.io.DataFolder
         skip_completed: whether to skip tasks that were completed in
                 previous runs. default: True
+        file_manifest: list the files of the input folders of each step (readers, dedup stages reading the outputs of
+            the previous stage) only once and save the result (path, size and etag of each file) to
+            `logging_dir/listings`. Every task will then load this manifest instead of listing files again. Input folders
+            should not be modified while the job (or its relaunches) runs
+        checkpoints: save the progress of each task after each input file, so that an incomplete task (crashed,
+            preempted, etc) resumes from its last completed input file when it is relaunched. Writers (DiskWriter) save
+            the documents of each input file to their own output file (prefixed with `part_XXXXX_`), which is only
+            moved to the output folder once the input file is completed. Only readers, filters, extractors and writers
+            are supported: an input file is committed once the reader moves on to the next one, which is only safe if
+            every step yields each document (or drops it) before receiving the next one
+        profile_fraction: fraction of the tasks (evenly spread, starting with rank 0) to run with a sampling profiler.
+            The collapsed stacks of each profiled task (attributed to the pipeline step being run) are saved to
+            `logging_dir/profiles` and merged into `logging_dir/profile.collapsed`. Sampling every 10ms has a
+            negligible overhead
+        progress_interval: every `progress_interval` seconds, each task saves the current totals of its stats to
+            `logging_dir/progress/{rank}.json`. The `jobs_status` command uses them to show the throughput, the
+            time spent in each step and the estimated time left of running jobs. None to disable
+        prometheus_dir: also save the last progress snapshot of each task to `{prometheus_dir}/datatrove_{rank}.prom`,
+            in the prometheus text format (e.g. for the textfile collector of a node exporter). Must be a local folder
+        fast_stats: lower the overhead of collecting stats for steps that are very cheap per document: stat updates
+            are accumulated and applied in bulk, and only 1 in 16 documents is timed (the time and cpu time of the
+            others are extrapolated). Totals are unchanged, but the time per document and its variance are estimates
     """
 
     @abstractmethod
@@ -35,10 +75,23 @@ class PipelineExecutor(ABC):
         pipeline: list[PipelineStep | Callable],
         logging_dir: DataFolderLike = None,
         skip_completed: bool = True,
+        file_manifest: bool = False,
+        checkpoints: bool = False,
+        profile_fraction: float = 0.0,
+        progress_interval: float | None = None,
+        prometheus_dir: str | None = None,
+        fast_stats: bool = False,
     ):
         self.pipeline: list[PipelineStep | Callable] = pipeline
         self.logging_dir = get_datafolder(logging_dir if logging_dir else f"logs/{get_timestamp()}_{get_random_str()}")
         self.skip_completed = skip_completed
+        self.file_manifest = file_manifest
+        self.checkpoints = checkpoints
+        self.profile_fraction = profile_fraction
+        self.progress_interval = progress_interval
+        self.prometheus_dir = prometheus_dir
+        self.fast_stats = fast_stats
+        self.completion_store = CompletionStore(self.logging_dir)
 
     @abstractmethod
     def run(self):
@@ -57,7 +110,38 @@ class PipelineExecutor(ABC):
         """
         return 0
 
-    def _run_for_rank(self, rank: int, local_rank: int = 0) -> PipelineStats:
+    def plan(
+        self,
+        sample_files: int = 5,
+        sample_tasks: int = 2,
+        target_task_hours: float = 2.0,
+        memory_headroom: float = 1.25,
+        seed: int = 0,
+        tmp_dir: str | None = None,
+    ) -> "PipelinePlan":
+        """
+            Dry run: runs the pipeline on a random sample of its input files (outputs are written to a temporary
+            folder) and extrapolates the time, cpu-hours, bytes read/written and peak memory of each step to the whole
+            input. Recommends `tasks`, `workers` and `mem_per_cpu_gb`. See `datatrove.utils.planning.plan_pipeline`
+        Args:
+            sample_files: number of input files to run the pipeline on
+            sample_tasks: number of tasks to run instead, for pipelines without a reader
+            target_task_hours: maximum duration of a task for the recommended number of tasks
+            memory_headroom: multiplier applied to the projected peak memory for the recommended memory
+            seed: seed used to sample the files or tasks
+            tmp_dir: where to save the outputs and logs of the sample runs. By default, a temporary folder that is
+                deleted at the end
+
+        Returns: the plan (printing it shows a summary)
+
+        """
+        from datatrove.utils.planning import plan_pipeline
+
+        return plan_pipeline(self, sample_files, sample_tasks, target_task_hours, memory_headroom, seed, tmp_dir)
+
+    def _run_for_rank(
+        self, rank: int, local_rank: int = 0, attempt: SpeculativeAttempt | None = None
+    ) -> PipelineStats:
         """
             Main executor's method. Sets up logging, pipes data from each pipeline step to the next, saves statistics
             and marks tasks as completed.
@@ -65,19 +149,44 @@ class PipelineExecutor(ABC):
             rank: the rank that we want to run the pipeline for
             local_rank: at the moment this is only used for logging.
             Any task with local_rank != 0 will not print logs to console.
+            attempt: with speculative execution, the attempt of this task being run. Its outputs are only committed
+            (and the task marked as completed) if no other attempt finished first
 
         Returns: the stats for this task
 
         """
+        # measured before anything else: only the first task of each process has a startup cost
+        startup = measure_startup()
         if self.is_rank_completed(rank):
             logger.info(f"Skipping {rank=} as it has already been completed.")
             return PipelineStats()
         logfile = add_task_logger(self.logging_dir, rank, local_rank)
         log_pipeline(self.pipeline)
+        self.set_listings_folder(self.pipeline)
+        self.reset_io_stats(self.pipeline)
+        if self.fast_stats:
+            for stats in get_pipeline_stats(self.pipeline):
+                stats.enable_fast_mode()
+        profiler = SamplingProfiler(pipeline=self.pipeline) if self.is_rank_profiled(rank) else None
+        progress = (
+            ProgressReporter(self.pipeline, self.logging_dir, rank, self.progress_interval, self.prometheus_dir)
+            if self.progress_interval
+            else None
+        )
         try:
+            checkpoint_tracker = self.setup_checkpoints(rank) if self.checkpoints else None
+            if attempt:
+                attempt.start(self.pipeline)
+            if profiler:
+                profiler.start()
+            if progress:
+                progress.start()
             # pipe data from one step to the next
             pipelined_data = None
             for pipeline_step in self.pipeline:
+                if isinstance(pipelined_data, BatchedDocumentsPipeline) and not hasattr(pipeline_step, "run_batch"):
+                    # custom functions always receive individual documents
+                    pipelined_data = pipelined_data.to_documents()
                 if callable(pipeline_step):
                     pipelined_data = pipeline_step(pipelined_data, rank, self.world_size)
                 elif isinstance(pipeline_step, Sequence) and not isinstance(pipeline_step, str):
@@ -86,23 +195,197 @@ class PipelineExecutor(ABC):
                     raise ValueError
             if pipelined_data:
                 deque(pipelined_data, maxlen=0)
+            for stats in get_pipeline_stats(self.pipeline):
+                stats.flush()
+            if profiler:
+                profiler.stop()
+            if progress:
+                progress.stop(done=True)
+            if attempt and not attempt.commit():
+                logger.info(f"Another attempt of {rank=} finished first, discarding the outputs of this one.")
+                return PipelineStats()
 
             logger.success(f"Processing done for {rank=}")
 
             # stats
-            stats = PipelineStats(self.pipeline)
+            self.add_io_stats(self.pipeline)
+            stats = PipelineStats(self.pipeline, startup)
             with self.logging_dir.open(f"stats/{rank:05d}.json", "w") as f:
                 stats.save_to_disk(f)
             logger.info(stats.get_repr(f"Task {rank}"))
             # completed
             self.mark_rank_as_completed(rank)
+            if checkpoint_tracker:
+                checkpoint_tracker.clear()
         except Exception as e:
             logger.exception(e)
             raise e
         finally:
+            if profiler:
+                # failed tasks also save their profile
+                self.save_profile(rank, profiler)
+            if progress:
+                progress.stop()
             close_task_logger(logfile)
         return stats
 
+    def is_rank_profiled(self, rank: int) -> bool:
+        """
+            Whether a given task should run with the sampling profiler, based on `profile_fraction`
+        Args:
+            rank: the rank of the task
+
+        Returns:
+
+        """
+        return math.floor(rank * self.profile_fraction) != math.floor((rank - 1) * self.profile_fraction)
+
+    def save_profile(self, rank: int, profiler: SamplingProfiler):
+        """
+            Stops the profiler of a task and saves its collapsed stacks to `logging_dir/profiles`
+        Args:
+            rank: the rank of the task
+            profiler: the profiler of this task
+
+        Returns:
+
+        """
+        profiler.stop()
+        with self.logging_dir.open(f"profiles/{rank:05d}.collapsed", "wt") as f:
+            profiler.save(f)
+
+    def merge_profiles(self):
+        """
+        Merges the profiles of all tasks into `logging_dir/profile.collapsed`
+        """
+        with self.logging_dir.open("profile.collapsed", "wt") as f:
+            merge_profiles(get_datafolder((self.logging_dir.resolve_paths("profiles"), self.logging_dir.fs)), f)
+
+    def set_listings_folder(self, pipeline: list):
+        """
+            Lets the data folders of each pipeline step save file listing information (shard assignments and, if
+            `file_manifest` is True, manifests of the `input_folders` of each step, such as the data folders of readers
+            and the signatures read by dedup stages) in `logging_dir/listings`, so that it is computed only once for
+            all tasks. Other folders (such as output folders) are always listed again, as they change during the job.
+        Args:
+            pipeline: list of pipeline steps (nested pipelines are also handled)
+
+        Returns:
+
+        """
+        listings_folder = get_datafolder((self.logging_dir.resolve_paths("listings"), self.logging_dir.fs))
+        for pipeline_step in pipeline:
+            for folder in self.get_data_folders(pipeline_step):
+                folder.listings_folder = listings_folder
+            for name in getattr(pipeline_step, "input_folders", ()):
+                if isinstance(folder := getattr(pipeline_step, name), DataFolder):
+                    folder.use_manifest = self.file_manifest
+            if isinstance(getattr(pipeline_step, "pipeline", None), list):
+                self.set_listings_folder(pipeline_step.pipeline)
+
+    @staticmethod
+    def get_data_folders(pipeline_step) -> list[DataFolder]:
+        """
+            Gets the data folders used by a pipeline step, including those of the steps it uses (e.g. the
+            exclusion_writer of filters). The staging folders of writers are left out: the bytes written to them are
+            counted again when they are uploaded to the output folder, and they are never listed
+        Args:
+            pipeline_step: a pipeline step
+
+        Returns: list of data folders
+
+        """
+        folders = []
+        step_values = getattr(pipeline_step, "__dict__", {}).values()
+        for step in [pipeline_step, *(value for value in step_values if isinstance(value, PipelineStep))]:
+            staging_folder = step.staging_folder if isinstance(step, DiskWriter) else None
+            folders.extend(
+                folder
+                for folder in getattr(step, "__dict__", {}).values()
+                if isinstance(folder, DataFolder) and folder is not staging_folder
+            )
+        return folders
+
+    def reset_io_stats(self, pipeline: list):
+        """
+            Resets the I/O counters of the data folders of each pipeline step, at the start of a task
+        Args:
+            pipeline: list of pipeline steps (nested pipelines are also handled)
+
+        Returns:
+
+        """
+        for pipeline_step in pipeline:
+            for folder in self.get_data_folders(pipeline_step):
+                folder.io_stats = ResourceStats()
+            if isinstance(getattr(pipeline_step, "pipeline", None), list):
+                self.reset_io_stats(pipeline_step.pipeline)
+
+    def add_io_stats(self, pipeline: list, seen: set | None = None):
+        """
+            Adds the bytes read/written through the data folders of each pipeline step (and the time spent doing so)
+            to the step's resource stats. Folders shared by several steps are only counted once.
+        Args:
+            pipeline: list of pipeline steps (nested pipelines are also handled)
+            seen: ids of the folders already counted
+
+        Returns:
+
+        """
+        seen = set() if seen is None else seen
+        for pipeline_step in pipeline:
+            for folder in self.get_data_folders(pipeline_step):
+                if id(folder) not in seen and isinstance(pipeline_step, PipelineStep):
+                    seen.add(id(folder))
+                    pipeline_step.stats.resource_stats.merge(folder.io_stats)
+            if isinstance(getattr(pipeline_step, "pipeline", None), list):
+                self.add_io_stats(pipeline_step.pipeline, seen)
+
+    def setup_checkpoints(self, rank: int) -> CheckpointTracker:
+        """
+            Loads the checkpoint of a task and attaches it to the readers and writers of the pipeline (see
+            `checkpoints`)
+        Args:
+            rank: the rank of the task
+
+        Returns: the checkpoint tracker of this task
+
+        """
+        checkpoint_tracker = CheckpointTracker(self.logging_dir, rank)
+        for pipeline_step in self.pipeline:
+            if not isinstance(pipeline_step, CHECKPOINT_SAFE_STEPS):
+                # steps that hold documents back (batching, ParallelStep, Tee, custom generators, ...) would have the
+                # outputs of an input file committed before all of its documents were written
+                raise ValueError(
+                    f"{getattr(pipeline_step, '__name__', type(pipeline_step).__name__)} can not be used with "
+                    f"checkpoints: only readers, filters, extractors and writers are supported"
+                )
+            if isinstance(pipeline_step, BaseDiskReader):
+                if pipeline_step.shuffle_files:
+                    raise ValueError("Readers can not use shuffle_files with checkpoints: files must be read in order")
+                pipeline_step.checkpoint_tracker = checkpoint_tracker
+            # writers can also be used by other steps (e.g. the exclusion_writer of filters)
+            for writer in [pipeline_step, *getattr(pipeline_step, "__dict__", {}).values()]:
+                if isinstance(writer, DiskWriter):
+                    checkpoint_tracker.add_writer(writer)
+        return checkpoint_tracker
+
+    def prepare_file_listings(self):
+        """
+            Lists the input files of each reader before launching the tasks, so that they only have to load the saved
+            manifest (and shard assignment). Only used when `file_manifest` is True. Other steps save their manifests
+            the first time a task needs them.
+        Returns:
+
+        """
+        if not self.file_manifest:
+            return
+        self.set_listings_folder(self.pipeline)
+        for pipeline_step in self.pipeline:
+            if isinstance(pipeline_step, BaseDiskReader):
+                logger.info(f"Listing input files of {pipeline_step}...")
+                pipeline_step.prepare_file_listing(self.world_size)
+
     def is_rank_completed(self, rank: int) -> bool:
         """
             Checks if a given task has already been completed.
@@ -112,19 +395,18 @@ class PipelineExecutor(ABC):
         Returns: whether task is already completed. If `skip_completed=False`, will always return `False`.
 
         """
-        return self.skip_completed and self.logging_dir.isfile(f"completions/{rank:05d}")
+        return self.skip_completed and self.completion_store.is_completed(rank)
 
     def mark_rank_as_completed(self, rank: int):
         """
-            Marks a given task as completed.
-            In practice this involves creating an empty file with the rank in the filename.
+            Marks a given task as completed (see `datatrove.utils.completions.CompletionStore`).
         Args:
             rank: the rank of the task to mark as completed
 
         Returns:
 
         """
-        self.logging_dir.open(f"completions/{rank:05d}", "w").close()
+        self.completion_store.mark_completed(rank)
 
     def get_incomplete_ranks(self, ranks=None) -> list[int]:
         """
@@ -133,13 +415,8 @@ class PipelineExecutor(ABC):
         Returns: list of ranks that are incomplete
 
         """
-        completed = set(self.logging_dir.list_files("completions"))
-        return list(
-            filter(
-                lambda rank: not self.skip_completed or f"completions/{rank:05d}" not in completed,
-                ranks if ranks is not None else range(self.world_size),
-            )
-        )
+        completed = self.completion_store.completed_ranks() if self.skip_completed else set()
+        return [rank for rank in (ranks if ranks is not None else range(self.world_size)) if rank not in completed]
 
     def to_json(self, indent=4) -> str:
         """
@@ -1,14 +1,21 @@
+import statistics
 import time
+from collections import Counter, deque
+from contextlib import closing
 from copy import deepcopy
 from functools import partial
+from itertools import chain
 from typing import Callable
 
 import multiprocess
+import multiprocess.connection
 
 from datatrove.executor.base import PipelineExecutor
 from datatrove.io import DataFolderLike
 from datatrove.pipeline.base import PipelineStep
-from datatrove.utils.logging import logger
+from datatrove.utils.dispatch import RankDispatcher
+from datatrove.utils.logging import get_random_str, logger
+from datatrove.utils.speculation import SpeculativeAttempt, check_speculation_support, get_pipeline_writers
 from datatrove.utils.stats import PipelineStats
 
 
@@ -30,6 +37,30 @@ class LocalPipelineExecutor(PipelineExecutor):
             Tasks [local_rank_offset, local_rank_offset + local_tasks] will be run.
         depends: another LocalPipelineExecutor that should run
             before this one
+        file_manifest: list the files of each data folder only once and save the result to `logging_dir/listings`,
+            instead of listing them on every task
+        checkpoints: save the progress of each task after each input file, so that relaunching an incomplete task
+            resumes it from its last completed input file (see PipelineExecutor)
+        profile_fraction: fraction of the tasks to run with a sampling profiler. Profiles are saved to
+            `logging_dir/profiles` and merged into `logging_dir/profile.collapsed` (see PipelineExecutor)
+        progress_interval: save a snapshot of the stats of each running task to `logging_dir/progress` every
+            `progress_interval` seconds, used by `jobs_status` to show live throughput (see PipelineExecutor)
+        prometheus_dir: local folder where the last snapshot of each task is also saved in the prometheus text format
+        fast_stats: accumulate stat updates and only time 1 in 16 documents, for pipelines of very cheap steps (see
+            PipelineExecutor)
+        dispatch: instead of running a fixed range of ranks (`local_tasks`/`local_rank_offset`), each worker claims
+            incomplete ranks one at a time with a lease file in `logging_dir/leases`, until all ranks are completed.
+            Launch the same executor (with the same `logging_dir`, on any fsspec filesystem) on several nodes: fast
+            nodes run more ranks, and the ranks of a node that died are run by the others once its leases expire.
+            See `datatrove.utils.dispatch.RankDispatcher`
+        lease_timeout: with `dispatch`, seconds after which the rank of a node that stopped renewing its lease
+            (every `lease_timeout / 4` seconds) can be claimed by another node
+        speculation_factor: enables speculative execution (requires workers != 1): once no task is waiting to be
+            run, a task that has been running for more than `speculation_factor` times the median duration of the
+            completed tasks is launched a second time on a free worker. Each attempt writes to its own temporary
+            folder (`.attempts` in the output folder of each writer): the first attempt to finish moves its files to
+            their final location and the other is stopped and its files deleted. Every output must be written by a
+            writer (DiskWriter). None to disable
     """
 
     def __init__(
@@ -43,14 +74,46 @@ class LocalPipelineExecutor(PipelineExecutor):
         start_method: str = "forkserver",
         local_tasks: int = -1,
         local_rank_offset: int = 0,
+        file_manifest: bool = False,
+        checkpoints: bool = False,
+        profile_fraction: float = 0.0,
+        progress_interval: float | None = None,
+        prometheus_dir: str | None = None,
+        fast_stats: bool = False,
+        dispatch: bool = False,
+        lease_timeout: float = 600,
+        speculation_factor: float | None = None,
     ):
-        super().__init__(pipeline, logging_dir, skip_completed)
+        super().__init__(
+            pipeline,
+            logging_dir,
+            skip_completed,
+            file_manifest,
+            checkpoints,
+            profile_fraction,
+            progress_interval,
+            prometheus_dir,
+            fast_stats,
+        )
         self.tasks = tasks
         self.workers = workers if workers != -1 else tasks
         self.start_method = start_method
         self.local_tasks = local_tasks if local_tasks != -1 else tasks
         self.local_rank_offset = local_rank_offset
         self.depends = depends
+        self.dispatch = dispatch
+        self.lease_timeout = lease_timeout
+        self.speculation_factor = speculation_factor
+        if speculation_factor is not None:
+            if dispatch or checkpoints:
+                raise ValueError("speculation_factor can not be used with dispatch or checkpoints")
+            check_speculation_support(pipeline)
+        if dispatch and (local_tasks != -1 or local_rank_offset != 0):
+            raise ValueError(
+                "local_tasks and local_rank_offset can not be used with dispatch: ranks are claimed dynamically"
+            )
+        if dispatch and not skip_completed:
+            raise ValueError("dispatch relies on the completion of each rank: skip_completed must be True")
         if self.local_rank_offset + self.local_tasks > self.tasks:
             raise ValueError(
                 f"Local tasks go beyond the total tasks (local_rank_offset + local_tasks = {self.local_rank_offset + self.local_tasks} > {self.tasks} = tasks)"
@@ -79,6 +142,24 @@ class LocalPipelineExecutor(PipelineExecutor):
                     logger.info(f"{completed.value}/{self.world_size} tasks completed.")
             ranks_q.put(local_rank)  # free up used rank
 
+    def _dispatch_ranks(self, local_rank: int) -> list[PipelineStats]:
+        """
+            Runs the ranks claimed through a RankDispatcher until all ranks are completed (see `dispatch`)
+        Args:
+            local_rank: index of this worker
+
+        Returns: the stats of each task run by this worker
+
+        """
+        dispatcher = RankDispatcher(self.logging_dir, self.world_size, self.get_incomplete_ranks, self.lease_timeout)
+        pipeline = self.pipeline
+        stats = []
+        with closing(dispatcher.ranks()) as ranks:
+            for rank in ranks:
+                self.pipeline = deepcopy(pipeline)
+                stats.append(self._run_for_rank(rank, local_rank))
+        return stats
+
     def run(self):
         """
             This method is responsible for correctly invoking `self._run_for_rank` for each task that is to be run.
@@ -101,49 +182,182 @@ class LocalPipelineExecutor(PipelineExecutor):
                 time.sleep(2 * 60)
 
         self._launched = True
-        if all(map(self.is_rank_completed, range(self.local_rank_offset, self.local_rank_offset + self.local_tasks))):
+        if not self.get_incomplete_ranks(range(self.local_rank_offset, self.local_rank_offset + self.local_tasks)):
             logger.info(f"Not doing anything as all {self.local_tasks} tasks have already been completed.")
             return
 
         self.save_executor_as_json()
-        mg = multiprocess.Manager()
-        ranks_q = mg.Queue()
-        for i in range(self.workers):
-            ranks_q.put(i)
-
+        self.prepare_file_listings()
+        if self.dispatch:
+            if self.workers == 1:
+                stats = self._dispatch_ranks(0)
+            else:
+                with multiprocess.get_context(self.start_method).Pool(self.workers) as pool:
+                    stats = list(chain.from_iterable(pool.imap_unordered(self._dispatch_ranks, range(self.workers))))
+            return self.save_stats(stats, f"{len(stats)} tasks run by this node")
         ranks_to_run = self.get_incomplete_ranks(
             range(self.local_rank_offset, self.local_rank_offset + self.local_tasks)
         )
         if (skipped := self.local_tasks - len(ranks_to_run)) > 0:
             logger.info(f"Skipping {skipped} already completed tasks")
+        stats = self.run_ranks(ranks_to_run, skipped)
+        return self.save_stats(stats, f"All {self.local_tasks} tasks")
+
+    def run_ranks(self, ranks: list[int], skipped: int = 0) -> list[PipelineStats]:
+        """
+            Runs the given ranks, sequentially if workers == 1 and in a multiprocess pool of `workers` processes
+            otherwise. Also used by SlurmPipelineExecutor to run the ranks of a slurm job concurrently.
+        Args:
+            ranks: the ranks to run
+            skipped: number of tasks that were already completed, for the progress logs
+
+        Returns: the stats of each task
+
+        """
+        mg = multiprocess.Manager()
+        ranks_q = mg.Queue()
+        for i in range(self.workers):
+            ranks_q.put(i)
 
         if self.workers == 1:
             pipeline = self.pipeline
             stats = []
-            for rank in ranks_to_run:
+            for rank in ranks:
                 self.pipeline = deepcopy(pipeline)
                 stats.append(self._launch_run_for_rank(rank, ranks_q))
-        else:
-            completed_counter = mg.Value("i", skipped)
-            completed_lock = mg.Lock()
-            ctx = multiprocess.get_context(self.start_method)
-            with ctx.Pool(self.workers) as pool:
-                stats = list(
-                    pool.imap_unordered(
-                        partial(
-                            self._launch_run_for_rank,
-                            ranks_q=ranks_q,
-                            completed=completed_counter,
-                            completed_lock=completed_lock,
-                        ),
-                        ranks_to_run,
-                    )
+            return stats
+        if self.speculation_factor is not None:
+            return self._run_ranks_speculatively(ranks, skipped)
+        completed_counter = mg.Value("i", skipped)
+        completed_lock = mg.Lock()
+        ctx = multiprocess.get_context(self.start_method)
+        with ctx.Pool(self.workers) as pool:
+            return list(
+                pool.imap_unordered(
+                    partial(
+                        self._launch_run_for_rank,
+                        ranks_q=ranks_q,
+                        completed=completed_counter,
+                        completed_lock=completed_lock,
+                    ),
+                    ranks,
                 )
-        # merged stats
+            )
+
+    def _run_attempt(self, rank: int, attempt_id: str, local_rank: int, committed, outcomes):
+        """
+            Runs an attempt of a task, with speculative execution. Saves its stats (or its error) to `outcomes`
+        Args:
+            rank: rank of the task
+            attempt_id: unique id of this attempt
+            local_rank: index of the worker running this attempt
+            committed: shared dictionary {rank: id of the attempt that committed its outputs}
+            outcomes: shared dictionary {attempt id: (stats, error)}
+
+        Returns:
+
+        """
+        try:
+            stats = self._run_for_rank(rank, local_rank, SpeculativeAttempt(attempt_id, rank, committed))
+            outcomes[attempt_id] = (stats, None)
+        except Exception as e:
+            outcomes[attempt_id] = (None, repr(e))
+
+    def _run_ranks_speculatively(self, ranks: list[int], skipped: int = 0) -> list[PipelineStats]:
+        """
+            Runs the given ranks with up to `workers` processes at the same time, launching a second attempt of the
+            tasks that take much longer than the others once no task is waiting (see `speculation_factor`)
+        Args:
+            ranks: the ranks to run
+            skipped: number of tasks that were already completed, for the progress logs
+
+        Returns: the stats of each task
+
+        """
+        ctx = multiprocess.get_context(self.start_method)
+        mg = multiprocess.Manager()
+        committed, outcomes = mg.dict(), mg.dict()
+        pending = deque(ranks)
+        free_local_ranks = list(range(self.workers - 1, -1, -1))
+        # attempt id -> (rank, local rank, process, start time)
+        running = {}
+        attempts = Counter()
+        durations, stats = [], []
+        completed = skipped
+
+        def launch(rank: int):
+            attempts[rank] += 1
+            attempt_id = f"{rank:05d}_{attempts[rank]}_{get_random_str()}"
+            local_rank = free_local_ranks.pop()
+            process = ctx.Process(target=self._run_attempt, args=(rank, attempt_id, local_rank, committed, outcomes))
+            process.start()
+            running[attempt_id] = (rank, local_rank, process, time.time())
+
+        def stop(attempt_id: str):
+            rank, local_rank, process, _ = running.pop(attempt_id)
+            process.terminate()
+            process.join()
+            free_local_ranks.append(local_rank)
+            for writer in get_pipeline_writers(self.pipeline):
+                writer.discard_attempt(attempt_id)
+
+        try:
+            while pending or running:
+                while pending and free_local_ranks:
+                    launch(pending.popleft())
+                if free_local_ranks and durations:
+                    threshold = self.speculation_factor * statistics.median(durations)
+                    for rank, _, _, start in list(running.values()):
+                        if free_local_ranks and attempts[rank] == 1 and time.time() - start > threshold:
+                            logger.info(
+                                f"Task {rank} has been running for {time.time() - start:.0f}s (median task: "
+                                f"{statistics.median(durations):.0f}s), launching a second attempt."
+                            )
+                            launch(rank)
+                multiprocess.connection.wait([process.sentinel for _, _, process, _ in running.values()], timeout=1)
+                for attempt_id, (rank, local_rank, process, start) in list(running.items()):
+                    if process.is_alive() or attempt_id not in running:
+                        continue
+                    process.join()
+                    del running[attempt_id]
+                    free_local_ranks.append(local_rank)
+                    task_stats, error = outcomes.pop(attempt_id, (None, f"exit code {process.exitcode}"))
+                    if error:
+                        if committed.get(rank) != attempt_id and any(r == rank for r, *_ in running.values()):
+                            logger.warning(f"An attempt of task {rank} failed ({error}), waiting for the other one.")
+                            continue
+                        raise RuntimeError(f"Task {rank} failed: {error}")
+                    if committed.get(rank) != attempt_id:
+                        # another attempt committed first, or the task was already completed
+                        continue
+                    for other_id in [other_id for other_id, (r, *_) in running.items() if r == rank]:
+                        logger.info(f"Stopping the other attempt of task {rank}.")
+                        stop(other_id)
+                    durations.append(time.time() - start)
+                    stats.append(task_stats)
+                    completed += 1
+                    logger.info(f"{completed}/{self.world_size} tasks completed.")
+        finally:
+            for attempt_id in list(running):
+                stop(attempt_id)
+        return stats
+
+    def save_stats(self, stats: list[PipelineStats], text: str) -> PipelineStats:
+        """
+            Merges the stats of the tasks run by this executor and saves them to `logging_dir/stats.json`
+        Args:
+            stats: the stats of each task
+            text: description of these tasks, for the logs
+
+        Returns: the merged stats
+
+        """
         stats = sum(stats, start=PipelineStats())
         with self.logging_dir.open("stats.json", "wt") as statsfile:
             stats.save_to_disk(statsfile)
-        logger.success(stats.get_repr(f"All {self.local_tasks} tasks"))
+        logger.success(stats.get_repr(text))
+        if self.profile_fraction > 0:
+            self.merge_profiles()
         return stats
 
     @property
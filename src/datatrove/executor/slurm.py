@@ -11,15 +11,24 @@ import tempfile
 import textwrap
 import time
 from copy import deepcopy
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
 import dill
+import humanize
 from dill import CONTENTS_FMODE
 
 from datatrove.executor.base import PipelineExecutor
 from datatrove.io import DataFolderLike
 from datatrove.pipeline.base import PipelineStep
 from datatrove.utils.logging import get_random_str, get_timestamp, logger
+from datatrove.utils.speculation import check_speculation_support
+
+
+if TYPE_CHECKING:
+    from datatrove.executor.local import LocalPipelineExecutor
+
+# warn when the pickled executor, that every task downloads and unpickles, is larger than this
+EXECUTOR_PICKLE_WARNING_SIZE = 100 * 2**20
 
 
 def requeue_handler(signum, _frame):
@@ -80,6 +89,26 @@ class SlurmPipelineExecutor(PipelineExecutor):
         mail_user: email address to send notifications to
         requeue: requeue the job if it fails
         tasks_per_job: each slurm job in the job array will run these many datatrove tasks. This reduces the total nb of slurm jobs launched.
+        file_manifest: list the files of each data folder only once and save the result to `logging_dir/listings`,
+            instead of listing them on every task. Input files are listed at launch time if this job has no
+            dependencies, otherwise by the first task that needs them
+        checkpoints: save the progress of each task after each input file, so that a task that is requeued or
+            relaunched resumes from its last completed input file (see PipelineExecutor)
+        profile_fraction: fraction of the tasks to run with a sampling profiler. Profiles are saved to
+            `logging_dir/profiles` and merged into `logging_dir/profile.collapsed` (see PipelineExecutor)
+        progress_interval: save a snapshot of the stats of each running task to `logging_dir/progress` every
+            `progress_interval` seconds, used by `jobs_status` to show live throughput (see PipelineExecutor)
+        prometheus_dir: local folder where the last snapshot of each task is also saved in the prometheus text format
+        fast_stats: accumulate stat updates and only time 1 in 16 documents, for pipelines of very cheap steps (see
+            PipelineExecutor)
+        job_workers: how many of the `tasks_per_job` tasks of each slurm job to run at the same time, in a local
+            process pool (see LocalPipelineExecutor). -1 to run `cpus_per_task` of them at the same time. For example,
+            `cpus_per_task=64, tasks_per_job=64, job_workers=-1` runs 64 tasks on each 64 cpus allocation
+        start_method: method used to spawn the process pool when `job_workers` is not 1 (default: "forkserver")
+        speculation_factor: with `job_workers` != 1, once no task of a slurm job is waiting to be run, launch a
+            second attempt of its tasks running for more than `speculation_factor` times the median task duration of
+            the job, on its free workers. The first attempt to finish commits its outputs and the other is stopped (see
+            LocalPipelineExecutor). None to disable
     """
 
     def __init__(
@@ -113,14 +142,40 @@ class SlurmPipelineExecutor(PipelineExecutor):
         requeue: bool = True,
         srun_args: dict = None,
         tasks_per_job: int = 1,
+        file_manifest: bool = False,
+        checkpoints: bool = False,
+        profile_fraction: float = 0.0,
+        progress_interval: float | None = None,
+        prometheus_dir: str | None = None,
+        fast_stats: bool = False,
+        job_workers: int = 1,
+        start_method: str = "forkserver",
+        speculation_factor: float | None = None,
     ):
-        super().__init__(pipeline, logging_dir, skip_completed)
+        super().__init__(
+            pipeline,
+            logging_dir,
+            skip_completed,
+            file_manifest,
+            checkpoints,
+            profile_fraction,
+            progress_interval,
+            prometheus_dir,
+            fast_stats,
+        )
         self.tasks = tasks
         self.workers = workers
         self.partition = partition
         self.cpus_per_task = cpus_per_task
         self.mem_per_cpu_gb = mem_per_cpu_gb
         self.tasks_per_job = tasks_per_job
+        self.job_workers = min(job_workers if job_workers != -1 else cpus_per_task, tasks_per_job)
+        self.start_method = start_method
+        self.speculation_factor = speculation_factor
+        if speculation_factor is not None:
+            if checkpoints:
+                raise ValueError("speculation_factor can not be used with checkpoints")
+            check_speculation_support(pipeline)
         self.time = time
         self.job_name = job_name
         self.qos = qos
@@ -173,11 +228,14 @@ class SlurmPipelineExecutor(PipelineExecutor):
             for ss in self.requeue_signals or []:
                 signal.signal(signal.Signals[ss], requeue_handler)
 
-            for rank_to_run in range(*ranks_to_run_range):
-                if rank_to_run >= len(all_ranks):
-                    break
-                rank = all_ranks[rank_to_run]
+            ranks = all_ranks[ranks_to_run_range[0] : ranks_to_run_range[1]]
+            if self.job_workers != 1:
+                if self.randomize_start:
+                    time.sleep(random.randint(0, 60 * 3))
+                self.get_job_executor().run_ranks(self.get_incomplete_ranks(ranks))
+                return
 
+            for rank in ranks:
                 if self.randomize_start:
                     time.sleep(random.randint(0, 60 * 3))
                 self._run_for_rank(rank)
@@ -185,9 +243,34 @@ class SlurmPipelineExecutor(PipelineExecutor):
             # we still have to launch the job
             self.launch_job()
 
+    def get_job_executor(self) -> LocalPipelineExecutor:
+        """
+            Local executor with the same pipeline, logging_dir and options, used to run the tasks of a slurm job in a
+            pool of `job_workers` processes. Task logs, stats and completions are saved as usual.
+        Returns: the local executor
+
+        """
+        from datatrove.executor.local import LocalPipelineExecutor
+
+        return LocalPipelineExecutor(
+            pipeline=self.pipeline,
+            tasks=self.world_size,
+            workers=self.job_workers,
+            logging_dir=self.logging_dir,
+            skip_completed=self.skip_completed,
+            start_method=self.start_method,
+            file_manifest=self.file_manifest,
+            checkpoints=self.checkpoints,
+            profile_fraction=self.profile_fraction,
+            progress_interval=self.progress_interval,
+            prometheus_dir=self.prometheus_dir,
+            fast_stats=self.fast_stats,
+            speculation_factor=self.speculation_factor,
+        )
+
     def launch_merge_stats(self):
         """
-            Launch a slurm task to merge the stats of each individual task into one big stats summary file.
+            Launch a slurm task to merge the stats (and profiles) of each individual task into one big stats summary file.
         Returns:
 
         """
@@ -200,7 +283,13 @@ class SlurmPipelineExecutor(PipelineExecutor):
                     "dependency": f"afterok:{self.job_id}",
                 },
                 f'merge_stats {self.logging_dir.resolve_paths("stats")} '
-                f'-o {self.logging_dir.resolve_paths("stats.json")}',
+                f'-o {self.logging_dir.resolve_paths("stats.json")}'
+                + (
+                    f' && merge_profiles {self.logging_dir.resolve_paths("profiles")} '
+                    f'-o {self.logging_dir.resolve_paths("profile.collapsed")}'
+                    if self.profile_fraction > 0
+                    else ""
+                ),
             )
         )
 
@@ -242,11 +331,18 @@ class SlurmPipelineExecutor(PipelineExecutor):
             self.job_id = -1
             return
 
+        if not self.depends_job_id:
+            # the input of jobs with dependencies is usually not ready yet
+            self.prepare_file_listings()
+
         executor = deepcopy(self)
 
         # pickle. The slurm job will load the executor from this pik file
+        pickled_executor = dill.dumps(executor, fmode=CONTENTS_FMODE)
         with self.logging_dir.open("executor.pik", "wb") as executor_f:
-            dill.dump(executor, executor_f, fmode=CONTENTS_FMODE)
+            executor_f.write(pickled_executor)
+        if len(pickled_executor) > EXECUTOR_PICKLE_WARNING_SIZE:
+            self.warn_large_pickle(len(pickled_executor))
         self.save_executor_as_json()
 
         with self.logging_dir.open("ranks_to_run.json", "w") as ranks_to_run_file:
@@ -313,6 +409,23 @@ class SlurmPipelineExecutor(PipelineExecutor):
             sbatch_args["qos"] = self.qos
         return sbatch_args
 
+    def warn_large_pickle(self, size: int):
+        """
+            Warns that executor.pik is large, showing the size of each pipeline step once pickled
+        Args:
+            size: size of executor.pik in bytes
+
+        """
+        step_sizes = ", ".join(
+            f"{step}: {humanize.naturalsize(len(dill.dumps(step, fmode=CONTENTS_FMODE)), binary=True)}"
+            for step in self.pipeline
+        )
+        logger.warning(
+            f"executor.pik is {humanize.naturalsize(size, binary=True)}, every task will have to load it. Pickled size "
+            f"of each step: {step_sizes}. Steps should declare heavy state built in their `__init__` (loaded files, "
+            f"large buffers, etc) with `@asset` (see datatrove.pipeline.base) so that it is only built by the tasks."
+        )
+
     def get_launch_file_contents(self, sbatch_args: dict, run_script: str) -> str:
         """
             Actually generate the sbatch script
@@ -1,16 +1,39 @@
+import asyncio
+import bisect
+import hashlib
+import heapq
+import io
+import json
 import os.path
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from glob import has_magic
 from typing import IO, Callable, TypeAlias
 
 from fsspec import AbstractFileSystem
 from fsspec import open as fsspec_open
+from fsspec.asyn import sync
 from fsspec.callbacks import NoOpCallback, TqdmCallback
-from fsspec.core import get_fs_token_paths, strip_protocol, url_to_fs
+from fsspec.compression import compr
+from fsspec.core import get_compression, get_fs_token_paths, strip_protocol, url_to_fs
 from fsspec.implementations.dirfs import DirFileSystem
 from fsspec.implementations.local import LocalFileSystem
-from huggingface_hub import HfFileSystem, cached_assets_path
 
-from datatrove.utils.logging import logger
+from datatrove.utils._import_utils import check_required_dependencies
+from datatrove.utils.compression import infer_compression, open_decompressed
+from datatrove.utils.logging import get_random_str, logger
+from datatrove.utils.stats import ResourceStats
+
+
+# maximum number of requests sent at the same time by the bulk operations of DataFolder
+DEFAULT_MAX_CONCURRENCY = 32
+# listings (file manifests and shard assignments) are only created by the process holding their lock. Locks older
+# than this (in seconds) were left behind by a crashed process
+LISTING_LOCK_TIMEOUT = 600
 
 
 class OutputFileManager:
@@ -85,15 +108,236 @@ class OutputFileManager:
         self.close()
 
 
+class IOTrackingFile:
+    """Wraps a (binary) file object to count the bytes read from/written to it, and the time spent doing so, in
+        `io_stats`. All other attributes are those of the wrapped file.
+
+    Args:
+        file: the file object to wrap
+        io_stats: where to add the number of bytes read/written and the time waiting for them
+    """
+
+    def __init__(self, file, io_stats: ResourceStats):
+        self.file = file
+        self.io_stats = io_stats
+
+    def _read(self, method, *args):
+        start = time.perf_counter()
+        data = method(*args)
+        self.io_stats.io_wait += time.perf_counter() - start
+        self.io_stats.read_bytes += len(data) if data else 0
+        return data
+
+    def read(self, *args):
+        return self._read(self.file.read, *args)
+
+    def read1(self, *args):
+        return self._read(getattr(self.file, "read1", self.file.read), *args)
+
+    def readline(self, *args):
+        return self._read(self.file.readline, *args)
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        n = self.file.readinto(buffer)
+        self.io_stats.io_wait += time.perf_counter() - start
+        self.io_stats.read_bytes += n or 0
+        return n
+
+    def readinto1(self, buffer):
+        return self.readinto(buffer)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if line := self.readline():
+            return line
+        raise StopIteration
+
+    def write(self, data):
+        start = time.perf_counter()
+        n = self.file.write(data)
+        self.io_stats.io_wait += time.perf_counter() - start
+        self.io_stats.written_bytes += len(data)
+        return n
+
+    def close(self):
+        # remote files are usually uploaded when closed
+        start = time.perf_counter()
+        self.file.close()
+        self.io_stats.io_wait += time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, item):
+        return getattr(self.file, item)
+
+
+class FilePrefetcher:
+    """Downloads the next files of a list in background threads, while the current one is being read.
+        Files must be requested (with `pop`) in the order of the list. Files of the list that are not requested (for
+        instance, skipped input files) are dropped once a file after them is requested.
+
+    Args:
+        data_folder: the folder the files are read from
+        paths: the files that will be read, in order
+        max_files: maximum number of files being downloaded or waiting to be read
+        max_bytes: maximum total size of the files being downloaded or waiting to be read, known before downloading
+            them from their `info`. Larger files are not prefetched. None for no limit
+    """
+
+    def __init__(self, data_folder: "DataFolder", paths: list[str], max_files: int, max_bytes: int | None = None):
+        self.data_folder = data_folder
+        self.paths = list(paths)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._index = {path: i for i, path in enumerate(self.paths)}
+        self._next = 0
+        self._pending: dict[str, Future] = {}
+        # sizes of the files, requested before downloading them when there is a byte budget
+        self._sizes: dict[str, int | None] = {}
+        self._pool = ThreadPoolExecutor(max_files, thread_name_prefix="datatrove-prefetch")
+        self._schedule()
+
+    def _get_size(self, path: str) -> int | None:
+        if path not in self._sizes:
+            try:
+                self._sizes[path] = self.data_folder.info(path)["size"]
+            except Exception as e:
+                logger.warning(f"Could not prefetch {path}: {e}")
+                self._sizes[path] = None
+        return self._sizes[path]
+
+    def _schedule(self):
+        while self._next < len(self.paths) and len(self._pending) < self.max_files:
+            path = self.paths[self._next]
+            if self.max_bytes is not None:
+                if (size := self._get_size(path)) is None or size > self.max_bytes:
+                    # read normally when requested
+                    self._next += 1
+                    continue
+                if sum(self._sizes[pending] for pending in self._pending) + size > self.max_bytes:
+                    break
+            self._next += 1
+            self._pending[path] = self._pool.submit(self.data_folder.cat_file, path)
+
+    def pop(self, path: str) -> bytes | None:
+        """
+            Returns the content of a file of the list, waiting for its download to finish if needed, and starts
+            downloading the next files
+        Args:
+            path: the file to read
+
+        Returns: the content of the file, or None if it was not prefetched (not in the list, too far ahead or its
+            download failed): it should then be opened normally
+
+        """
+        if (index := self._index.get(path)) is None:
+            return None
+        for other in list(self._pending):
+            if self._index[other] >= index:
+                break
+            # will not be read
+            self._pending.pop(other).cancel()
+            self._sizes.pop(other, None)
+        future = self._pending.pop(path, None)
+        self._sizes.pop(path, None)
+        self._next = max(self._next, index + 1)
+        self._schedule()
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Could not prefetch {path}: {e}")
+            return None
+
+    def close(self):
+        """
+        Cancels the downloads that did not start and drops the files that were not read
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+
+
+class FileUploader:
+    """Uploads files from a local folder to a DataFolder in background threads, so that writing the next files does
+        not wait for the uploads. Each upload is verified by comparing the size of the uploaded file with the size of
+        the local one, which is then deleted.
+
+    Args:
+        local_folder: the local folder the files are uploaded from
+        output_folder: the folder the files are uploaded to, with the same relative paths
+        max_concurrency: maximum number of files uploaded at the same time
+    """
+
+    def __init__(self, local_folder: "DataFolder", output_folder: "DataFolder", max_concurrency: int = 4):
+        self.local_folder = local_folder
+        self.output_folder = output_folder
+        self._pool = ThreadPoolExecutor(max_concurrency, thread_name_prefix="datatrove-upload")
+        self._pending: list[Future] = []
+
+    def _upload(self, filename: str) -> int:
+        local_path = self.local_folder.resolve_paths(filename)
+        size = os.path.getsize(local_path)
+        if os.path.dirname(filename):
+            self.output_folder.makedirs(os.path.dirname(filename), exist_ok=True)
+        self.output_folder.put_file(local_path, filename)
+        if (uploaded_size := self.output_folder.size(filename)) != size:
+            raise OSError(f"Upload of {filename} to {self.output_folder.path} failed: {uploaded_size=} != {size=}")
+        os.remove(local_path)
+        return size
+
+    def upload(self, filename: str):
+        """
+            Starts uploading a file in the background. The file must not be modified until the upload finishes
+        Args:
+            filename: relative path of the file, in both folders
+
+        Returns:
+
+        """
+        self._pending.append(self._pool.submit(self._upload, filename))
+
+    def wait(self):
+        """
+        Waits for all the uploads to finish. The bytes uploaded, and the time spent waiting for them, are counted in
+        the `io_stats` of the output folder. Raises the error of the first failed upload, if any
+        """
+        start = time.perf_counter()
+        pending, self._pending = self._pending, []
+        try:
+            for future in pending:
+                self.output_folder.io_stats.written_bytes += future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            self.output_folder.io_stats.io_wait += time.perf_counter() - start
+
+
 class DataFolder(DirFileSystem):
     """A simple wrapper around fsspec's DirFileSystem to handle file listing and sharding files accross multiple workers/process.
         Also handles the creation of output files.
         All file operations will be relative to `path`.
 
+        Remote files read from a DataFolder with a `local_cache` are downloaded once to that local folder and then
+        read from it, by every process of the node: see `get_cached_path`.
+
     Args:
         path: the path to the folder (local or remote)
         fs: the filesystem to use (see fsspec for more details)
         auto_mkdir: whether to automatically create the parent directories when opening a file in write mode
+        local_cache: local folder where the remote files read from this folder are cached. None to disable caching
+        local_cache_size: the least recently used files are deleted from `local_cache` when it holds more than this
+            number of bytes. None for no limit
+        decompression_backend: implementation used to decompress the compressed files read from this folder (see
+            `open_decompressed`). "auto" picks the fastest installed one
+        decompression_threads: number of threads decompressing each multi-member gzip file (such as WARC files)
         **storage_options: additional options to pass to the filesystem
     """
 
@@ -102,6 +346,10 @@ class DataFolder(DirFileSystem):
         path: str,
         fs: AbstractFileSystem | None = None,
         auto_mkdir: bool = True,
+        local_cache: str | None = None,
+        local_cache_size: int | None = 100 * 2**30,
+        decompression_backend: str = "auto",
+        decompression_threads: int = 1,
         **storage_options,
     ):
         """
@@ -110,10 +358,31 @@ class DataFolder(DirFileSystem):
             path: main path to base directory
             fs: fsspec filesystem to wrap
             auto_mkdir: if True, when opening a file in write mode its parent directories will be automatically created
+            local_cache: local folder where remote files are cached when they are read. Shared by all the processes
+                (and DataFolders) using it
+            local_cache_size: maximum size of `local_cache` in bytes
+            decompression_backend: gzip/zstd decompression backend, or "auto"
+            decompression_threads: number of decompression threads per file, for the "parallel" gzip backend
             **storage_options: will be passed to a new fsspec filesystem object, when it is created. Ignored if fs is given
         """
         super().__init__(path=path, fs=fs if fs else url_to_fs(path, **storage_options)[0])
         self.auto_mkdir = auto_mkdir
+        if local_cache is not None:
+            # for safely_create_file
+            check_required_dependencies("DataFolder local_cache", ["fasteners"])
+            local_cache = os.path.abspath(os.path.expanduser(local_cache))
+        self.local_cache = local_cache
+        self.local_cache_size = local_cache_size
+        self.decompression_backend = decompression_backend
+        self.decompression_threads = decompression_threads
+        # where file listing information (such as shard assignments) can be persisted. Set by the executor
+        self.listings_folder: DataFolder | None = None
+        # load file listings from a manifest saved in `listings_folder` instead of listing files on every call
+        self.use_manifest = False
+        # bytes read/written through `open` and time spent doing so. Reset by the executor at the start of each task
+        self.io_stats = ResourceStats()
+        # serves the files downloaded ahead of time, see `prefetch`
+        self._prefetcher: FilePrefetcher | None = None
 
     def list_files(
         self,
@@ -121,28 +390,41 @@ class DataFolder(DirFileSystem):
         recursive: bool = True,
         glob_pattern: str | None = None,
         include_directories: bool = False,
-    ) -> list[str]:
+        detail: bool = False,
+    ) -> list[str] | dict[str, dict]:
         """
         Get a list of files on this directory. If `subdirectory` is given will search in `path/subdirectory`. If
         glob_pattern is given, it will only return files that match the pattern, which can be used to match a given
         extension, for example `*.myext`. Be careful with subdirectories when using glob (use ** if you want to match
         any subpath). Args: subdirectory: str:  (Default value = "") recursive: bool:  (Default value = True)
-        glob_pattern: str | None:  (Default value = None)
+        glob_pattern: str | None:  (Default value = None) detail: bool:  (Default value = False) return a dictionary
+        with the info of each file (as returned by fsspec, including its "size") instead of a list
 
-        Returns: a list of file paths, relative to `self.path`
+        Returns: a list of file paths, relative to `self.path`, or a dictionary {path: info} sorted by path
 
         """
+        if self.use_manifest and self.listings_folder is not None:
+            files = self._get_manifest(subdirectory, recursive, glob_pattern, include_directories)
+        else:
+            files = self._find_files(subdirectory, recursive, glob_pattern, include_directories)
+        return dict(files) if detail else [f for f, _ in files]
+
+    def _find_files(
+        self, subdirectory: str, recursive: bool, glob_pattern: str | None, include_directories: bool
+    ) -> list[tuple[str, dict]]:
         if glob_pattern and not has_magic(glob_pattern):
             # makes it slightly easier for file extensions
             glob_pattern = f"*{glob_pattern}"
         extra_options = {}
-        if isinstance(self.fs, HfFileSystem):
+        # huggingface_hub is slow to import: if it was not imported, this is not an HfFileSystem
+        hf_file_system = sys.modules.get("huggingface_hub.hf_file_system")
+        if hf_file_system is not None and isinstance(self.fs, hf_file_system.HfFileSystem):
             extra_options["expand_info"] = False  # speed up
         if include_directories:
             extra_options["withdirs"] = True
         return sorted(
             [
-                f
+                (f, info)
                 for f, info in (
                     self.find(subdirectory, maxdepth=1 if not recursive else None, detail=True, **extra_options)
                     if not glob_pattern
@@ -154,24 +436,163 @@ class DataFolder(DirFileSystem):
                     )
                 ).items()
                 if include_directories or info["type"] != "directory"
-            ]
+            ],
+            key=lambda file: file[0],
+        )
+
+    def _get_manifest(
+        self, subdirectory: str, recursive: bool, glob_pattern: str | None, include_directories: bool
+    ) -> list[tuple[str, dict]]:
+        """
+        Loads the manifest for this listing query from `listings_folder`, or lists the files and saves it if it
+        does not exist yet (in a single process, see `_load_or_create_listing`). Each entry of the manifest has the
+        file path, size, etag (if provided by the filesystem) and, for directories, a "d" flag.
+        """
+        manifest_file = self._get_listing_file(
+            "manifests",
+            "json.gz",
+            subdirectory=subdirectory,
+            recursive=recursive,
+            glob_pattern=glob_pattern,
+            include_directories=include_directories,
         )
+        manifest = self._load_or_create_listing(
+            manifest_file,
+            lambda: [
+                [path, info.get("size"), info.get("ETag", info.get("etag"))]
+                + (["d"] if info["type"] == "directory" else [])
+                for path, info in self._find_files(subdirectory, recursive, glob_pattern, include_directories)
+            ],
+            compression="gzip",
+        )
+        return [
+            (path, {"name": path, "size": size, "etag": etag, "type": "directory" if is_dir else "file"})
+            for path, size, etag, *is_dir in manifest
+        ]
+
+    def _get_listing_file(self, kind: str, extension: str, **query) -> str:
+        key = json.dumps({"path": self.fs.unstrip_protocol(self.path), **query}, sort_keys=True)
+        return f"{kind}/{hashlib.sha1(key.encode()).hexdigest()}.{extension}"
+
+    def _load_listing(self, filename: str, compression: str | None = None):
+        if not self.listings_folder.isfile(filename):
+            return None
+        with self.listings_folder.open(filename, "rt", compression=compression) as f:
+            return json.load(f)
+
+    def _save_listing(self, filename: str, data, compression: str | None = None):
+        # write to a temporary file first so that other ranks never load a partial listing
+        tmp_file = f"{filename}.{os.getpid()}.tmp"
+        with self.listings_folder.open(tmp_file, "wt", compression=compression) as f:
+            json.dump(data, f)
+        self.listings_folder.mv(tmp_file, filename)
+
+    def try_lock(self, lock_file: str, timeout: float) -> str | None:
+        """
+            Takes a lock held by a single process: a file with a random id and the time it was taken. Works on any
+            filesystem (unlike `safely_create_file`, which relies on local file locks). Locks taken more than
+            `timeout` seconds ago were left behind by a crashed process, and are taken over
+        Args:
+            lock_file: path of the lock file
+            timeout: seconds after which a lock can be taken over
+
+        Returns: the id of the lock (see `release_lock`), or None if another process holds it
+
+        """
+        try:
+            with self.open(lock_file, "rt") as f:
+                if time.time() - float(f.read().split()[1]) < timeout:
+                    return None
+        except (FileNotFoundError, IndexError, ValueError):
+            pass
+        lock_id = get_random_str(16)
+        with self.open(lock_file, "wt") as f:
+            f.write(f"{lock_id} {time.time()}")
+        # processes taking the lock at the same time all write it: the last write wins
+        return lock_id if self._get_lock_id(lock_file) == lock_id else None
+
+    def _get_lock_id(self, lock_file: str) -> str | None:
+        try:
+            with self.open(lock_file, "rt") as f:
+                return f.read().split()[0]
+        except (FileNotFoundError, IndexError):
+            return None
+
+    def release_lock(self, lock_file: str, lock_id: str):
+        """
+            Removes a lock taken with `try_lock`, unless another process took it over since
+        Args:
+            lock_file: path of the lock file
+            lock_id: id returned by `try_lock`
+
+        """
+        if self._get_lock_id(lock_file) == lock_id:
+            with suppress(FileNotFoundError):
+                self.rm_file(lock_file)
+
+    def _load_or_create_listing(self, filename: str, create: Callable, compression: str | None = None):
+        """
+        Loads a listing from `listings_folder`. If it does not exist yet, the process holding `{filename}.lock`
+        creates and saves it while the others wait for it, so that every rank uses the same listing.
+        """
+        while (data := self._load_listing(filename, compression=compression)) is None:
+            if (lock_id := self.listings_folder.try_lock(f"{filename}.lock", LISTING_LOCK_TIMEOUT)) is not None:
+                try:
+                    data = create()
+                    self._save_listing(filename, data, compression=compression)
+                finally:
+                    self.listings_folder.release_lock(f"{filename}.lock", lock_id)
+                return data
+            time.sleep(1)
+            # the listing saved by another process must be seen
+            self.listings_folder.fs.invalidate_cache()
+        return data
 
-    def get_shard(self, rank: int, world_size: int, **kwargs) -> list[str]:
+    def get_shard(self, rank: int, world_size: int, balance_by_size: bool = False, **kwargs) -> list[str]:
         """Fetch a shard (set of files) for a given rank, assuming there are a total of `world_size` shards.
         This should be deterministic to not have any overlap among different ranks.
-        Will return files [rank, rank+world_size, rank+2*world_size, ...]
+        Will return files [rank, rank+world_size, rank+2*world_size, ...], or, if `balance_by_size` is True, a set of
+        files such that all shards have roughly the same total size (see `get_size_balanced_shards`)
         Args:
           rank: int: rank of the shard to fetch
           world_size: int: total number of shards
+          balance_by_size: bool: assign files to shards based on their size instead of round-robin
           **kwargs:
         other parameters will be passed to list_files
 
         Returns: a list of file paths
 
         """
+        if balance_by_size:
+            return self.get_size_balanced_shards(world_size, **kwargs)[rank]
         return self.list_files(**kwargs)[rank::world_size]
 
+    def get_size_balanced_shards(self, world_size: int, **kwargs) -> list[list[str]]:
+        """
+            Assigns the files in this folder to `world_size` shards so that each shard has a similar total size,
+            using a greedy longest-processing-time-first assignment (see `assign_files_by_size`).
+            If `listings_folder` is set, the assignment of each file listing is computed by a single rank, saved there,
+            and then loaded by every other rank. Listing the files from a manifest (`use_manifest`) ensures that all
+            ranks see the same files.
+        Args:
+          world_size: int: total number of shards
+          **kwargs:
+        other parameters will be passed to list_files
+
+        Returns: a list with the file paths of each shard
+
+        """
+        files = self.list_files(detail=True, **kwargs)
+        file_sizes = {path: info.get("size") or 0 for path, info in files.items()}
+        if self.listings_folder is None:
+            return assign_files_by_size(file_sizes, world_size)
+        # a different listing (files were added, removed or modified) gets a new assignment
+        listing = hashlib.sha1(json.dumps(file_sizes, sort_keys=True).encode()).hexdigest()
+        return self._load_or_create_listing(
+            self._get_listing_file("shards", "json", world_size=world_size, listing=listing, **kwargs),
+            lambda: assign_files_by_size(file_sizes, world_size),
+        )
+
     def resolve_paths(self, paths) -> list[str] | str:
         """
             Transform  a list of relative paths into a list of complete paths (including fs protocol and base path)
@@ -200,18 +621,181 @@ class DataFolder(DirFileSystem):
         """
         return OutputFileManager(self, **kwargs)
 
-    def open_files(self, paths, mode="rb", **kwargs):
-        """Opens all files in an iterable with the given options, in the same order as given
+    def _map_concurrently(self, method: str, calls: list[tuple[str, dict]], max_concurrency: int) -> list:
+        """
+            Calls a method of the wrapped filesystem once for each (path, keyword arguments) in `calls`, with
+            at most `max_concurrency` calls running at the same time. Async filesystems (such as s3 or http) run the
+            calls as coroutines on their event loop, other remote filesystems in threads. Calls on the local filesystem
+            are cheap and run one after the other
+        Args:
+            method: name of the filesystem method, e.g. "cat_file"
+            calls: full path and keyword arguments of each call
+            max_concurrency: maximum number of calls running at the same time
+
+        Returns: the result of each call, in the same order as `calls`
+
+        """
+        if not calls:
+            return []
+        if self.is_local():
+            return [getattr(self.fs, method)(path, **kwargs) for path, kwargs in calls]
+        if self.fs.async_impl:
+
+            async def _gather():
+                # the connection pool of the filesystem is shared: only send as many requests as it can handle
+                semaphore = asyncio.Semaphore(max_concurrency)
+
+                async def _call(path, kwargs):
+                    async with semaphore:
+                        return await getattr(self.fs, f"_{method}")(path, **kwargs)
+
+                return await asyncio.gather(*(_call(path, kwargs) for path, kwargs in calls))
+
+            return sync(self.fs.loop, _gather)
+        with ThreadPoolExecutor(min(max_concurrency, len(calls)), thread_name_prefix="datatrove-io") as pool:
+            return list(pool.map(lambda call: getattr(self.fs, method)(call[0], **call[1]), calls))
+
+    def exists_many(self, paths, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> list[bool]:
+        """
+            Checks whether each of the given files exists, sending the requests concurrently
+        Args:
+            paths: iterable of relative paths
+            max_concurrency: maximum number of requests sent at the same time
+
+        Returns: a list of booleans, in the same order as `paths`
+
+        """
+        return self._map_concurrently("exists", [(self._join(path), {}) for path in paths], max_concurrency)
+
+    def _cat_files(self, calls: list[tuple[str, dict]], max_concurrency: int) -> list[bytes]:
+        # calls are (relative path, keyword arguments of cat_file)
+        if self._use_local_cache():
+            # the cached files are downloaded (once per node) and read in threads
+            with ThreadPoolExecutor(min(max_concurrency, len(calls) or 1), thread_name_prefix="datatrove-io") as pool:
+                return list(pool.map(lambda call: self.cat_file(call[0], **call[1]), calls))
+        return self._map_concurrently(
+            "cat_file", [(self._join(path), kwargs) for path, kwargs in calls], max_concurrency
+        )
+
+    def _cat(self, calls: list[tuple[str, dict]], max_concurrency: int) -> list[bytes]:
+        start = time.perf_counter()
+        contents = self._cat_files(calls, max_concurrency)
+        self.io_stats.io_wait += time.perf_counter() - start
+        self.io_stats.read_bytes += sum(len(data) for data in contents)
+        return contents
+
+    def cat_many(self, paths, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> list[bytes]:
+        """
+            Reads the full content of each of the given files, downloading them concurrently. The bytes read are
+            counted in `self.io_stats`
+        Args:
+            paths: iterable of relative paths
+            max_concurrency: maximum number of files downloaded at the same time
+
+        Returns: the content of each file, in the same order as `paths`
+
+        """
+        return self._cat([(path, {}) for path in paths], max_concurrency)
+
+    def cat_ranges(
+        self,
+        paths: list[str],
+        starts: list[int],
+        ends: list[int],
+        max_gap: int = 2**16,
+        max_block: int = 2**25,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> list[bytes]:
+        """
+            Reads the byte ranges [start, end) of the given files. Ranges of the same file that overlap or are separated
+            by at most `max_gap` bytes are coalesced into a single request (as long as it is not larger than `max_block`
+            bytes), and the requests are sent concurrently. The bytes read are counted in `self.io_stats`
+        Args:
+            paths: relative path of the file of each range (the same file can be given several times)
+            starts: start offset of each range
+            ends: end offset (excluded) of each range
+            max_gap: maximum number of unneeded bytes downloaded to coalesce two ranges
+            max_block: maximum size of a coalesced request
+            max_concurrency: maximum number of requests sent at the same time
+
+        Returns: the content of each range, in the same order as `paths`
+
+        """
+        if not len(paths) == len(starts) == len(ends):
+            raise ValueError("`paths`, `starts` and `ends` must have the same length")
+        blocks = _coalesce_ranges(zip(paths, starts, ends), max_gap, max_block)
+        contents = self._cat([(path, {"start": start, "end": end}) for path, start, end in blocks], max_concurrency)
+        # (start offsets, (start offset, content)) of the blocks of each file, sorted
+        file_blocks: dict[str, tuple[list[int], list[tuple[int, bytes]]]] = {}
+        for (path, start, _), data in zip(blocks, contents):
+            offsets, datas = file_blocks.setdefault(path, ([], []))
+            offsets.append(start)
+            datas.append((start, data))
+        ranges = []
+        for path, start, end in zip(paths, starts, ends):
+            offsets, datas = file_blocks[path]
+            block_start, data = datas[bisect.bisect_right(offsets, start) - 1]
+            ranges.append(data[start - block_start : end - block_start])
+        return ranges
+
+    def open_files(
+        self, paths, mode="rb", prefetch: bool = False, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, **kwargs
+    ):
+        """Opens all files in an iterable with the given options, in the same order as given.
+            Remote files are opened concurrently. With `prefetch`, the full content of every file is downloaded
+            concurrently and the files are then read from memory: use it for files that will be read entirely and
+            that fit in memory together
 
         Args:
             paths: iterable of relative paths
             mode: the mode to open the files with (Default value = "rb")
+            prefetch: download the content of all the files before returning them. Only for reading
+            max_concurrency: maximum number of files opened/downloaded at the same time
             **kwargs: additional arguments to pass to the open
         """
-        return [self.open(path, mode=mode, **kwargs) for path in paths]
+        paths = list(paths)
+        if prefetch:
+            if "r" not in mode or "+" in mode:
+                raise ValueError("Only files opened for reading can be prefetched")
+            # counted in `io_stats` when read, like the files opened normally
+            contents = self._cat_files([(path, {}) for path in paths], max_concurrency)
+            # other arguments of `open` (such as block_size) do not apply to files read from memory
+            wrap_kwargs = {
+                key: kwargs[key] for key in ("compression", "encoding", "errors", "newline") if key in kwargs
+            }
+            return [
+                self._wrap_file(io.BytesIO(data), path, mode, **wrap_kwargs) for path, data in zip(paths, contents)
+            ]
+        if self.is_local() or len(paths) <= 1:
+            return [self.open(path, mode=mode, **kwargs) for path in paths]
+        with ThreadPoolExecutor(min(max_concurrency, len(paths)), thread_name_prefix="datatrove-io") as pool:
+            return list(pool.map(lambda path: self.open(path, mode=mode, **kwargs), paths))
+
+    @contextmanager
+    def prefetch(self, paths: list[str], max_files: int, max_bytes: int | None = None) -> Iterator[FilePrefetcher]:
+        """
+            While in this context, the next files of `paths` are downloaded in background threads and `open` reads
+            them from memory (see FilePrefetcher). Files must be opened in the order of `paths`
+        Args:
+            paths: the files that will be opened, in order
+            max_files: maximum number of files being downloaded or waiting to be opened
+            max_bytes: maximum total size of the files being downloaded or waiting to be opened. Larger files are
+                not prefetched. None for no limit
 
-    def open(self, path, mode="rb", *args, **kwargs):
+        Returns: the prefetcher
+
+        """
+        prefetcher = FilePrefetcher(self, paths, max_files, max_bytes)
+        self._prefetcher = prefetcher
+        try:
+            yield prefetcher
+        finally:
+            self._prefetcher = None
+            prefetcher.close()
+
+    def open(self, path, mode="rb", *args, compression=None, **kwargs):
         """Open a file locally or remote, and create the parent directories if self.auto_mkdir is `True` and we are opening in write mode.
+            The (compressed) bytes read/written are counted in `self.io_stats`.
 
             args/kwargs will depend on the filesystem (see fsspec for more details)
             Typically we often use:
@@ -222,11 +806,109 @@ class DataFolder(DirFileSystem):
             path: the path to the file
             mode: the mode to open the file with (Default value = "rb")
             *args: additional arguments to pass to the open
+            compression: the compression to use. "infer" to guess it from the file extension
             **kwargs: additional arguments to pass to the open
         """
         if self.auto_mkdir and ("w" in mode or "a" in mode):
             self.fs.makedirs(self.fs._parent(self._join(path)), exist_ok=True)
-        return super().open(path, mode=mode, *args, **kwargs)
+        text_kwargs = {key: kwargs.pop(key) for key in ("encoding", "errors", "newline") if key in kwargs}
+        binary_mode = mode if "b" in mode else mode.replace("t", "") + "b"
+        if binary_mode == "rb" and self._prefetcher is not None and (data := self._prefetcher.pop(path)) is not None:
+            raw_file = io.BytesIO(data)
+        elif binary_mode == "rb" and self._use_local_cache():
+            raw_file = self._open_cached(path)
+        else:
+            raw_file = super().open(path, binary_mode, *args, **kwargs)
+        return self._wrap_file(raw_file, path, mode, compression=compression, **text_kwargs)
+
+    def _wrap_file(self, raw_file, path: str, mode: str, compression: str | None = None, **text_kwargs):
+        # same as fsspec's `open`, with the tracking wrapper between the file and the decompression
+        file = IOTrackingFile(raw_file, self.io_stats)
+        if compression == "infer":
+            compression = infer_compression(path)
+        if compression is not None and mode[0] == "r":
+            file = open_decompressed(file, compression, self.decompression_backend, self.decompression_threads)
+        elif compression is not None:
+            file = compr[get_compression(path, compression)](file, mode=mode[0])
+        if "b" not in mode:
+            file = io.TextIOWrapper(file, **text_kwargs)
+        return file
+
+    def _use_local_cache(self) -> bool:
+        return self.local_cache is not None and not self.is_local()
+
+    def get_cached_path(self, path: str) -> str:
+        """
+            Downloads a remote file to `local_cache`, unless it is already there, and returns its local path. Cached
+            files are identified by their full path and version (etag, or modification time), so that files modified
+            after being cached are downloaded again. Process-safe (see `safely_create_file`): when several processes
+            need the same file, only one downloads it and the others wait for it.
+            After each download, the least recently used files are deleted if the cache is larger than
+            `local_cache_size`
+        Args:
+            path: relative path of the remote file
+
+        Returns: the local path of the cached file
+
+        """
+        full_path = self._join(path)
+        info = self.fs.info(full_path)
+        key = hashlib.sha256(
+            json.dumps(
+                [self.fs.unstrip_protocol(full_path), info.get("size"), get_file_version(info)], default=str
+            ).encode()
+        ).hexdigest()
+        local_path = os.path.join(self.local_cache, key[:2], key)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+        downloaded = False
+
+        def do_download():
+            nonlocal downloaded
+            tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self.fs.get_file(full_path, tmp_path)
+            os.replace(tmp_path, local_path)
+            downloaded = True
+
+        safely_create_file(local_path, do_download)
+        if downloaded:
+            # once marked as completed, so that it is counted
+            evict_local_cache(self.local_cache, self.local_cache_size, keep=local_path)
+        return local_path
+
+    def _open_cached(self, path: str):
+        for _ in range(3):
+            local_path = self.get_cached_path(path)
+            try:
+                file = open(local_path, "rb")
+            except FileNotFoundError:
+                # evicted by another process in the meantime: download it again
+                with suppress(FileNotFoundError):
+                    os.remove(f"{local_path}.completed")
+                continue
+            # recently used files are evicted last
+            os.utime(local_path)
+            return file
+        return open(self.get_cached_path(path), "rb")
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        """
+            Reads the content of a file, or the bytes [start, end) of it. Read from `local_cache`, if set
+        Args:
+            path: relative path of the file
+            start: start offset. Negative values are relative to the end of the file
+            end: end offset (excluded). Negative values are relative to the end of the file
+            **kwargs: additional arguments to pass to the filesystem
+
+        Returns: the bytes read
+
+        """
+        if not self._use_local_cache():
+            return super().cat_file(path, start=start, end=end, **kwargs)
+        with self._open_cached(path) as f:
+            start, end, _ = slice(start, end).indices(os.fstat(f.fileno()).st_size)
+            f.seek(start)
+            return f.read(max(0, end - start))
 
     def is_local(self):
         """
@@ -235,6 +917,95 @@ class DataFolder(DirFileSystem):
         return isinstance(self.fs, LocalFileSystem)
 
 
+def get_file_version(info: dict):
+    """
+    Version of a file, as given in its `info` by fsspec: its etag on object storage (also saved in file manifests),
+    its modification time on other filesystems. None if the filesystem does not provide any.
+    """
+    for key in ("ETag", "etag", "mtime", "LastModified", "last_modified"):
+        if info.get(key):
+            return info[key]
+    return None
+
+
+def evict_local_cache(local_cache: str, max_size: int | None, keep: str | None = None):
+    """
+    Deletes the least recently used (read or downloaded) files of a `DataFolder` local cache until it holds at most
+    `max_size` bytes. Files being downloaded are not counted nor deleted.
+
+    Args:
+        local_cache: the local cache folder
+        max_size: maximum size of the cache in bytes. None for no limit
+        keep: a cached file that should not be deleted (typically, the one that was just downloaded)
+    """
+    if max_size is None:
+        return
+    entries, total_size = [], 0
+    for root, _, files in os.walk(local_cache):
+        for name in files:
+            if not name.endswith(".completed"):
+                continue
+            path = os.path.join(root, name.removesuffix(".completed"))
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        if path == keep:
+            continue
+        try:
+            # the completion marker first, so that other processes download the file again instead of reading it.
+            # Processes already reading it keep their open file. Lock files are kept: other processes may hold them
+            os.remove(f"{path}.completed")
+            os.remove(path)
+        except FileNotFoundError:
+            # evicted by another process
+            pass
+        total_size -= size
+
+
+def _coalesce_ranges(ranges, max_gap: int, max_block: int) -> list[tuple[str, int, int]]:
+    """
+    Merges the byte ranges (path, start, end) of the same file that overlap or are separated by at most `max_gap`
+    bytes, as long as the merged range is not larger than `max_block` bytes (larger ranges are never split).
+
+    Returns: sorted list of the merged ranges, each one containing one or more of the given ranges
+    """
+    blocks = []
+    for path, start, end in sorted(set(ranges)):
+        if blocks and blocks[-1][0] == path:
+            _, block_start, block_end = blocks[-1]
+            if start - block_end <= max_gap and max(end, block_end) - block_start <= max_block:
+                blocks[-1] = (path, block_start, max(end, block_end))
+                continue
+        blocks.append((path, start, end))
+    return blocks
+
+
+def assign_files_by_size(file_sizes: dict[str, int], world_size: int) -> list[list[str]]:
+    """
+    Greedy longest-processing-time-first assignment: files are sorted by decreasing size and each one is assigned to
+    the shard with the smallest total size so far. Deterministic: ties are broken by file path and by shard index.
+
+    Args:
+        file_sizes: dictionary {file path: size in bytes}
+        world_size: number of shards
+
+    Returns: a list with the (sorted) file paths of each shard
+    """
+    shards = [[] for _ in range(world_size)]
+    heap = [(0, rank) for rank in range(world_size)]
+    for path, size in sorted(file_sizes.items(), key=lambda file: (-file[1], file[0])):
+        total_size, rank = heapq.heappop(heap)
+        shards[rank].append(path)
+        heapq.heappush(heap, (total_size + size, rank))
+    return [sorted(shard) for shard in shards]
+
+
 def get_datafolder(data: DataFolder | str | tuple[str, dict] | tuple[str, AbstractFileSystem]) -> DataFolder:
     """
     `DataFolder` factory.
@@ -348,6 +1119,8 @@ def cached_asset_path_or_download(
         desc: description of the file being downloaded
     """
 
+    from huggingface_hub import cached_assets_path
+
     download_dir = cached_assets_path(library_name="datatrove", namespace=namespace, subfolder=subfolder)
     local_path = os.path.join(download_dir, strip_protocol(remote_path).replace("/", "_"))
 
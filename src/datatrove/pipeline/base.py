@@ -1,11 +1,30 @@
 from abc import ABC, abstractmethod
+from functools import cached_property
 from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-from datatrove.data import Document, DocumentsPipeline
+from datatrove.data import BatchedDocumentsPipeline, Document, DocumentBatch, DocumentsPipeline
 from datatrove.utils._import_utils import check_required_dependencies
 from datatrove.utils.stats import Stats
 
 
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class asset(cached_property):
+    """
+    Declares heavy state of a pipeline step (loaded word lists, automatons, large buffers, etc): like
+    `functools.cached_property`, the value is built on first access and then cached. It is never pickled, so that it
+    does not end up in `executor.pik`: each worker builds it again when it first uses it.
+
+    class MyFilter(BaseFilter):
+        @asset
+        def word_list(self):
+            return load_big_word_list()
+    """
+
+
 class PipelineStep(ABC):
     """Base pipeline block, all blocks should inherit from this one.
         Takes care of some general things such as handling dependencies, and stats
@@ -18,6 +37,12 @@ class PipelineStep(ABC):
 
     name: str = None
     type: str = None
+    # whether the step keeps data proportional to the size of its input in memory until the end of the task (e.g. to
+    # sort it). Used by `PipelineExecutor.plan` to extrapolate the memory of a task
+    memory_grows_with_input: bool = False
+    # data folders this step only reads, written by a previous (completed) job, so that they do not change while it
+    # runs. With `file_manifest`, the executor lists their files only once for all tasks
+    input_folders: tuple[str, ...] = ()
 
     def __new__(cls, *args, **kwargs):
         """
@@ -35,6 +60,15 @@ class PipelineStep(ABC):
         super().__init__()
         self.stats = Stats(str(self))
 
+    def __getstate__(self):
+        # declared assets are rebuilt lazily after unpickling
+        state = self.__dict__.copy()
+        for cls in type(self).mro():
+            for name, value in vars(cls).items():
+                if isinstance(value, asset):
+                    state.pop(name, None)
+        return state
+
     def stat_update(self, *labels, value: int = 1, unit: str = None):
         """
         Register statistics. `stat_update("metric1", "metric2")` will add 1 to the count of both metrics. Using
@@ -50,8 +84,7 @@ class PipelineStep(ABC):
         Returns:
 
         """
-        for label in labels:
-            self.stats[label].update(value, unit)
+        self.stats.add(labels, value, unit)
 
     def update_doc_stats(self, document: Document):
         """
@@ -67,6 +100,41 @@ class PipelineStep(ABC):
         if token_count := document.metadata.get("token_count", None):
             self.stat_update("doc_len_tokens", value=token_count, unit="doc")
 
+    def stat_update_many(self, *labels, values: "np.ndarray | int", unit: str = None):
+        """
+            Bulk version of `stat_update`, for steps processing batches of documents. `stat_update_many("metric1",
+            values=10)` is equivalent to calling `stat_update("metric1")` 10 times, while passing an array as `values`
+            is equivalent to calling `stat_update("metric1", value=x)` for each value `x` of the array.
+
+        Args:
+          *labels: names of stats to change
+          values: np.ndarray | int: array of values or number of unit increments
+          unit: str:  (Default value = None) None is treated as doc (so when printing you will see /doc)
+
+        Returns:
+
+        """
+        for label in labels:
+            self.stats[label].update_many(values, unit)
+
+    def update_batch_stats(self, batch: DocumentBatch):
+        """
+            Batch version of `update_doc_stats`
+        Args:
+          batch: DocumentBatch:
+
+        Returns:
+
+        """
+        import numpy as np
+
+        if len(batch) == 0:
+            return
+        self.stat_update_many("doc_len", values=np.fromiter(map(len, batch.text), dtype=np.int64), unit="doc")
+        if (token_count := batch.metadata.get("token_count", None)) is not None:
+            token_counts = np.array([count for count in token_count if isinstance(count, (int, np.integer)) and count])
+            self.stat_update_many("doc_len_tokens", values=token_counts, unit="doc")
+
     def track_time(self, unit: str = None):
         """
             Track the time a given block of code takes to run and add it to statistics. If this block is not applied
@@ -102,12 +170,56 @@ class PipelineStep(ABC):
         if data:
             yield from data
 
-    def __call__(self, data: DocumentsPipeline = None, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+    @property
+    def supports_batches(self) -> bool:
+        """
+        Whether this step can process `DocumentBatch` directly (it overrides `run_batch`)
+        """
+        return type(self).run_batch is not PipelineStep.run_batch
+
+    def run_batch(self, batch: DocumentBatch, rank: int = 0, world_size: int = 1) -> DocumentBatch | None:
+        """
+        Optional batch entrypoint. Steps that can process a columnar `DocumentBatch` without creating a `Document`
+        for each sample should override this method and return the resulting batch (or None if no document is left).
+        When the previous step yields batches, `run_batch` is used instead of `run`.
+
+        Args:
+          batch: DocumentBatch: the batch to process
+          rank: int:  (Default value = 0) used when each worker needs to choose a shard of data to work on
+          world_size: int:  (Default value = 1) used when each worker needs to choose a shard of data to work on
+
+        Returns: the processed batch
+
+        """
+        raise NotImplementedError
+
+    def run_batches(
+        self, data: Iterable[DocumentBatch], rank: int = 0, world_size: int = 1
+    ) -> Iterator[DocumentBatch]:
+        """
+            Calls `run_batch` on each batch of a stream of batches, skipping empty results
+        Args:
+            data: iterable of DocumentBatch
+            rank:
+            world_size:
+
+        Returns: generator of DocumentBatch
+
+        """
+        for batch in data:
+            if (batch := self.run_batch(batch, rank, world_size)) is not None and len(batch) > 0:
+                yield batch
+
+    def __call__(
+        self, data: DocumentsPipeline | BatchedDocumentsPipeline = None, rank: int = 0, world_size: int = 1
+    ) -> DocumentsPipeline | BatchedDocumentsPipeline:
         """
             Shorthand way of calling the `run` method.
             block = Block()
             for resultdoc in block():
                 ...
+            If `data` is a stream of batches (BatchedDocumentsPipeline), steps supporting batches will process them
+            with `run_batch`, while for other steps they are converted back into individual documents.
         Args:
             data:
             rank:
@@ -116,4 +228,8 @@ class PipelineStep(ABC):
         Returns:
 
         """
+        if isinstance(data, BatchedDocumentsPipeline):
+            if self.supports_batches:
+                return BatchedDocumentsPipeline(self.run_batches(data, rank, world_size))
+            data = data.to_documents()
         return self.run(data, rank, world_size)
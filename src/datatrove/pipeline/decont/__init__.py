@@ -1 +1,15 @@
-from .n_grams import NGramsDecontConfig, NGramsDecontFilter, NGramsDecontIndexer
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .n_grams import NGramsDecontConfig, NGramsDecontFilter, NGramsDecontIndexer
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "n_grams": ["NGramsDecontConfig", "NGramsDecontFilter", "NGramsDecontIndexer"],
+    },
+)
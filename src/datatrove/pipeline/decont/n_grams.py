@@ -6,7 +6,6 @@ Then read your training data and apply the filter with the index loaded.
 
 import os
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Tuple
 
@@ -17,7 +16,6 @@ from datatrove.io import DataFolderLike, file_exists, get_datafolder, open_file
 from datatrove.pipeline.base import PipelineStep
 from datatrove.pipeline.filters.base_filter import BaseFilter
 from datatrove.pipeline.writers.disk_base import DiskWriter
-from datatrove.utils.binaryio import read_np_from_file
 from datatrove.utils.hashing import HashConfig, create_hash_func
 from datatrove.utils.logging import logger
 from datatrove.utils.text import TextNormConfig, ngrams, simplify_text
@@ -193,14 +191,12 @@ class NGramsDecontFilter(BaseFilter):
         self.tokenizer = load_word_tokenizer(language)
 
     def load_index_hashes(self):
-        def load_index_from_file(file):
-            with self.index_folder.open(file, mode="rb") as f:
-                return file, read_np_from_file(
-                    f, np.dtype(self.config.hash_config.np_descr), self.index_folder.is_local()
-                ).tolist()
-
-        with ThreadPoolExecutor() as pool:
-            hashes = pool.map(load_index_from_file, self.index_folder.list_files())
+        files = self.index_folder.list_files()
+        dtype = np.dtype(self.config.hash_config.np_descr)
+        hashes = [
+            (file, np.frombuffer(data, dtype=dtype).tolist())
+            for file, data in zip(files, self.index_folder.cat_many(files))
+        ]
 
         self._index_hashes = {}
         for filename, hashlist in hashes:
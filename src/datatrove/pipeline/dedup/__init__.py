@@ -1,12 +1,37 @@
-from .bloom_filter import SingleBloomFilter
-from .exact_substrings import ESDatasetToSequence, ESMergeSequences, ESRangeRemover
-from .minhash import (
-    MinhashBuildIndex,
-    MinhashConfig,
-    MinhashDedupBuckets,
-    MinhashDedupCluster,
-    MinhashDedupFilter,
-    MinhashDedupSignature,
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .bloom_filter import SingleBloomFilter
+    from .exact_substrings import ESDatasetToSequence, ESMergeSequences, ESRangeRemover
+    from .minhash import (
+        MinhashBuildIndex,
+        MinhashConfig,
+        MinhashDedupBuckets,
+        MinhashDedupCluster,
+        MinhashDedupFilter,
+        MinhashDedupSignature,
+    )
+    from .sentence_dedup import SentDedupConfig, SentenceDedupFilter, SentenceDedupSignature, SentenceFindDedups
+    from .url_dedup import UrlDedupConfig, UrlDedupFilter, UrlDedupSignature, UrlFindDedups
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "bloom_filter": ["SingleBloomFilter"],
+        "exact_substrings": ["ESDatasetToSequence", "ESMergeSequences", "ESRangeRemover"],
+        "minhash": [
+            "MinhashBuildIndex",
+            "MinhashConfig",
+            "MinhashDedupBuckets",
+            "MinhashDedupCluster",
+            "MinhashDedupFilter",
+            "MinhashDedupSignature",
+        ],
+        "sentence_dedup": ["SentDedupConfig", "SentenceDedupFilter", "SentenceDedupSignature", "SentenceFindDedups"],
+        "url_dedup": ["UrlDedupConfig", "UrlDedupFilter", "UrlDedupSignature", "UrlFindDedups"],
+    },
 )
-from .sentence_dedup import SentDedupConfig, SentenceDedupFilter, SentenceDedupSignature, SentenceFindDedups
-from .url_dedup import UrlDedupConfig, UrlDedupFilter, UrlDedupSignature, UrlFindDedups
@@ -6,7 +6,7 @@ import numpy as np
 
 from datatrove.data import Document, DocumentsPipeline
 from datatrove.io import DataFolderLike, get_datafolder
-from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.base import PipelineStep, asset
 from datatrove.pipeline.writers.disk_base import DiskWriter
 from datatrove.utils.hashing import HashConfig, create_hash_func
 from datatrove.utils.logging import logger
@@ -87,7 +87,6 @@ class SingleBloomFilter(PipelineStep):
         self.output_folder = get_datafolder(output_folder)
         self.tokenizer = load_word_tokenizer(language)
         self.config = config
-        self.bit_vector = bytearray(([0] * self.config.m_bytes))
         self.save_bloom_filter = save_bloom_filter
         self.exclusion_writer = exclusion_writer
         # TODO: Add support for 64-bit
@@ -107,6 +106,10 @@ class SingleBloomFilter(PipelineStep):
                 logger.info(f"False probability = {fp:.3}")
         self.language = language
 
+    @asset
+    def bit_vector(self) -> bytearray:
+        return bytearray(self.config.m_bytes)
+
     @property
     def parameters(self):
         """Returns the parameters for the hash functions.
@@ -131,6 +131,7 @@ class MinhashDedupSignature(PipelineStep):
 
     type = "🫂 - DEDUP"
     name = "🎯 MinHash stage 1"
+    memory_grows_with_input = True
 
     def __init__(self, output_folder: DataFolderLike, config: MinhashConfig = None, language: str = Languages.english):
         super().__init__()
@@ -263,6 +264,7 @@ class MinhashDedupBuckets(PipelineStep):
 
     type = "🫂 - DEDUP"
     name = "🎯 MinHash stage 2"
+    input_folders = ("input_folder",)
 
     def __init__(
         self,
@@ -423,6 +425,7 @@ class MinhashDedupCluster(PipelineStep):
 
     type = "🫂 - DEDUP"
     name = "🎯 MinHash stage 3"
+    input_folders = ("input_folder",)
 
     def __init__(
         self,
@@ -493,6 +496,7 @@ class MinhashDedupFilter(PipelineStep):
 
     type = "🫂 - DEDUP"
     name = "🎯 MinHash stage 4"
+    input_folders = ("data_folder",)
 
     def __init__(
         self,
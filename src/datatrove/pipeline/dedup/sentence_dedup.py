@@ -72,6 +72,7 @@ class SentenceDedupSignature(PipelineStep):
 
     type = "🫂 - DEDUPS"
     name = "💥 sentence-deduplication stage 1"
+    memory_grows_with_input = True
 
     def __init__(
         self,
@@ -196,6 +197,7 @@ class SentenceFindDedups(PipelineStep):
 
     type = "🫂 - DEDUPS"
     name = "💥 sentence-deduplication stage 2"
+    input_folders = ("data_folder",)
 
     def __init__(
         self,
@@ -298,6 +300,7 @@ class SentenceDedupFilter(PipelineStep):
 
     type = "🫂 - DEDUPS"
     name = "💥 sentence-deduplication stage 3"
+    input_folders = ("data_folder",)
 
     def __init__(
         self,
@@ -378,19 +381,18 @@ class SentenceDedupFilter(PipelineStep):
         """
         folders = self.data_folder.list_files(include_directories=True, recursive=False)
         # for performance reasons when having for instance 12k*10k files
-        files = [
-            f
-            for f in [f"{folder}/{rank:05d}{ExtensionHelperSD.stage_2_duplicates}" for folder in folders]
-            if self.data_folder.exists(f)
-        ]
+        candidates = [f"{folder}/{rank:05d}{ExtensionHelperSD.stage_2_duplicates}" for folder in folders]
+        files = [f for f, exists in zip(candidates, self.data_folder.exists_many(candidates)) if exists]
 
         logger.info(f"Loading duplicate indexes from {len(files)} results files.")
 
         all_dups = np.array([], dtype=[("doc", "<u4"), ("sent", "<u2")])
         if files:
+            # remote files are downloaded concurrently, local ones are read directly with np.fromfile
+            dup_files = self.data_folder.open_files(files, prefetch=not self.data_folder.is_local())
             with ThreadPoolExecutor() as pool:
                 all_dups = np.concatenate(
-                    list(tqdm(pool.map(self.read_duplicates, self.data_folder.open_files(files)), total=len(files))),
+                    list(tqdm(pool.map(self.read_duplicates, dup_files), total=len(files))),
                     axis=0,
                 )
             all_dups.sort()
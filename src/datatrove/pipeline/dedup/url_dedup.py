@@ -79,6 +79,7 @@ class UrlDedupSignature(PipelineStep):
 
     type = "🫂 - DEDUPS"
     name = "💥 url-deduplication stage 1"
+    memory_grows_with_input = True
 
     def __init__(
         self,
@@ -317,23 +318,22 @@ class UrlDedupFilter(PipelineStep):
     def run(self, data: DocumentsPipeline, rank: int = 0, world_size: int = 1):
         folders = self.data_folder.list_files(include_directories=True, recursive=False)
         # for performance reasons when having for instance 12k*10k files
-        files = [
-            f
-            for f in [f"{folder}/{rank:05d}{ExtensionHelperSD.stage_2_duplicates}" for folder in folders]
-            if self.data_folder.exists(f)
-        ]
+        candidates = [f"{folder}/{rank:05d}{ExtensionHelperSD.stage_2_duplicates}" for folder in folders]
+        files = [f for f, exists in zip(candidates, self.data_folder.exists_many(candidates)) if exists]
 
         logger.info(f"Loading duplicate indexes from {len(files)} results files.")
 
         dup_dtype = get_sig_dtype(self.config.hash_config)[2]
         all_dups = np.array([], dtype=dup_dtype)
         if files:
+            # remote files are downloaded concurrently, local ones are read directly with np.fromfile
+            dup_files = self.data_folder.open_files(files, prefetch=not self.data_folder.is_local())
             with ThreadPoolExecutor() as pool:
                 read_partial = partial(self.read_duplicates, dup_dtype=dup_dtype)
                 all_dups = np.concatenate(
                     list(
                         tqdm(
-                            pool.map(read_partial, self.data_folder.open_files(files)),
+                            pool.map(read_partial, dup_files),
                             total=len(files),
                         )
                     ),
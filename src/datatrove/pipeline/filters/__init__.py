@@ -1,11 +1,35 @@
-from .c4_filters import C4BadWordsFilter, C4ParagraphFilter, C4QualityFilter
-from .fasttext_filter import FastTextClassifierFilter
-from .fineweb_quality_filter import FineWebQualityFilter
-from .gopher_quality_filter import GopherQualityFilter
-from .gopher_repetition_filter import GopherRepetitionFilter
-from .lambda_filter import LambdaFilter
-from .language_filter import LanguageFilter
-from .regex_filter import RegexFilter
-from .sampler_filter import SamplerFilter
-from .unigram_log_probs import UnigramLogProbFilter
-from .url_filter import URLFilter
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .c4_filters import C4BadWordsFilter, C4ParagraphFilter, C4QualityFilter
+    from .fasttext_filter import FastTextClassifierFilter
+    from .fineweb_quality_filter import FineWebQualityFilter
+    from .gopher_quality_filter import GopherQualityFilter
+    from .gopher_repetition_filter import GopherRepetitionFilter
+    from .lambda_filter import LambdaFilter
+    from .language_filter import LanguageFilter
+    from .regex_filter import RegexFilter
+    from .sampler_filter import SamplerFilter
+    from .unigram_log_probs import UnigramLogProbFilter
+    from .url_filter import URLFilter
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "c4_filters": ["C4BadWordsFilter", "C4ParagraphFilter", "C4QualityFilter"],
+        "fasttext_filter": ["FastTextClassifierFilter"],
+        "fineweb_quality_filter": ["FineWebQualityFilter"],
+        "gopher_quality_filter": ["GopherQualityFilter"],
+        "gopher_repetition_filter": ["GopherRepetitionFilter"],
+        "lambda_filter": ["LambdaFilter"],
+        "language_filter": ["LanguageFilter"],
+        "regex_filter": ["RegexFilter"],
+        "sampler_filter": ["SamplerFilter"],
+        "unigram_log_probs": ["UnigramLogProbFilter"],
+        "url_filter": ["URLFilter"],
+    },
+)
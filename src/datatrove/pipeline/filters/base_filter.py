@@ -1,13 +1,18 @@
 import contextlib
 from abc import ABC, abstractmethod
-from typing import Tuple
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable, Iterator, Tuple
 
-from datatrove.data import Document, DocumentsPipeline
+from datatrove.data import Document, DocumentBatch, DocumentsPipeline
 from datatrove.pipeline.base import PipelineStep
 from datatrove.pipeline.writers.disk_base import DiskWriter
 from datatrove.utils.typeshelper import StatHints
 
 
+if TYPE_CHECKING:
+    import numpy as np
+
+
 def get_filter_result(res):
     result, reason = res, None
     if isinstance(result, tuple):
@@ -42,6 +47,60 @@ class BaseFilter(PipelineStep, ABC):
         """
         raise NotImplementedError
 
+    def filter_batch(self, batch: DocumentBatch) -> "np.ndarray | list[bool | Tuple[bool, str]]":
+        """Optional batch version of `filter`. Filters that can decide on a whole `DocumentBatch` at once (without
+        creating a `Document` for each sample) should override this method. Filters that modify the documents they
+        receive (e.g. to add metadata) should instead only implement `filter`.
+
+        Args:
+            batch: batch of samples to filter
+
+        Returns:
+            a boolean mask with True for each sample that should be KEPT, or a list with the same format as the
+            results of `filter` (bool or (False, str)) for each sample
+        """
+        raise NotImplementedError
+
+    @property
+    def supports_batches(self) -> bool:
+        return type(self).filter_batch is not BaseFilter.filter_batch
+
+    def run_batch(self, batch: DocumentBatch, rank: int = 0, world_size: int = 1) -> DocumentBatch:
+        import numpy as np
+
+        self.stat_update_many(StatHints.total, values=len(batch))
+        with self.track_time("batch"):
+            results = self.filter_batch(batch)
+            reasons = None
+            if isinstance(results, np.ndarray):
+                mask = results.astype(bool, copy=False)
+            else:
+                results = [get_filter_result(res) for res in results]
+                mask = np.fromiter((result for result, _ in results), dtype=bool, count=len(results))
+                reasons = [reason for _, reason in results]
+            kept = batch.filter(mask)
+            self.stat_update_many(StatHints.forwarded, values=len(kept))
+            self.update_batch_stats(kept)
+            if (n_dropped := len(batch) - len(kept)) > 0:
+                self.stat_update_many(StatHints.dropped, values=n_dropped)
+                dropped_indices = np.flatnonzero(~mask)
+                if reasons:
+                    for reason, count in Counter(reasons[i] for i in dropped_indices if reasons[i]).items():
+                        self.stat_update_many(f"dropped_{reason}", values=count)
+                if self.exclusion_writer:
+                    for i in dropped_indices:
+                        doc = batch.get_document(i)
+                        if reasons and reasons[i]:
+                            doc.metadata["filter_reason"] = reasons[i]
+                        self.exclusion_writer.write(doc, rank)
+        return kept
+
+    def run_batches(
+        self, data: Iterable[DocumentBatch], rank: int = 0, world_size: int = 1
+    ) -> Iterator[DocumentBatch]:
+        with self.exclusion_writer if self.exclusion_writer else contextlib.nullcontext():
+            yield from super().run_batches(data, rank, world_size)
+
     def run(self, data: DocumentsPipeline, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
         with self.exclusion_writer if self.exclusion_writer else contextlib.nullcontext() as writer:
             for doc in data:
@@ -1,6 +1,8 @@
 import re
 
-from datatrove.data import Document
+import numpy as np
+
+from datatrove.data import Document, DocumentBatch
 from datatrove.pipeline.filters.base_filter import BaseFilter
 from datatrove.pipeline.writers.disk_base import DiskWriter
 
@@ -27,3 +29,6 @@ class RegexFilter(BaseFilter):
             is_filter
         """
         return not self.regex.search(doc.text)
+
+    def filter_batch(self, batch: DocumentBatch) -> np.ndarray:
+        return np.fromiter((not self.regex.search(text) for text in batch.text), dtype=bool, count=len(batch))
@@ -1,6 +1,7 @@
+import numpy as np
 from numpy.random import default_rng
 
-from datatrove.data import Document
+from datatrove.data import Document, DocumentBatch
 from datatrove.pipeline.filters.base_filter import BaseFilter
 from datatrove.pipeline.writers.disk_base import DiskWriter
 
@@ -26,3 +27,6 @@ class SamplerFilter(BaseFilter):
 
     def filter(self, doc: Document) -> bool | tuple[bool, str]:
         return self.uniform() < self.rate
+
+    def filter_batch(self, batch: DocumentBatch) -> np.ndarray:
+        return self.uniform(size=len(batch)) < self.rate
@@ -6,6 +6,7 @@ import numpy as np
 from huggingface_hub import cached_assets_path
 
 from datatrove.data import Document
+from datatrove.pipeline.base import asset
 from datatrove.pipeline.filters.base_filter import BaseFilter
 from datatrove.pipeline.writers.disk_base import DiskWriter
 from datatrove.utils.logging import logger
@@ -37,9 +38,12 @@ class UnigramLogProbFilter(BaseFilter):
         """
         super().__init__(exclusion_writer)
         self.logprobs_threshold = logprobs_threshold
-        self.unigram_frequencies = self.get_frequencies()
         self.tokenizer = load_word_tokenizer(language)
 
+    @asset
+    def unigram_frequencies(self) -> dict[str, float]:
+        return self.get_frequencies()
+
     def get_frequencies(self):
         download_dir = cached_assets_path(
             library_name="datatrove", namespace="filters", subfolder="unigram_logprob_filter"
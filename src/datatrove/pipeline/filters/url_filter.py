@@ -10,6 +10,7 @@ from datatrove.io import safely_create_file
 from datatrove.utils._import_utils import ASSETS_PATH
 from datatrove.utils.logging import logger
 
+from ..base import asset
 from ..writers.disk_base import DiskWriter
 from .base_filter import BaseFilter
 
@@ -56,9 +57,6 @@ class URLFilter(BaseFilter):
         use_integrated_lists: bool = True,
         exclusion_writer: DiskWriter = None,
     ):
-        import ahocorasick
-        from tldextract import TLDExtract
-
         super().__init__(exclusion_writer)
         self.soft_word_threshold = soft_word_threshold
         self.block_listed_domains = parse_list(extra_domains, do_normalize=False) if extra_domains else set()
@@ -68,14 +66,24 @@ class URLFilter(BaseFilter):
         self.soft_banned_words = parse_list(soft_banned_words) if soft_banned_words else set()
         self.use_integrated_lists = use_integrated_lists
         self._downloaded = False
-        self.tldextractor = TLDExtract()
 
-        self.banned_subwords_automaton = ahocorasick.Automaton(ahocorasick.STORE_INTS)
-        for word in self.banned_subwords:
-            self.banned_subwords_automaton.add_word(word, len(self.banned_subwords_automaton))
+    @asset
+    def tldextractor(self):
+        from tldextract import TLDExtract
 
-        if not self.use_integrated_lists:
-            self.banned_subwords_automaton.make_automaton()
+        return TLDExtract()
+
+    @asset
+    def banned_subwords_automaton(self):
+        import ahocorasick
+
+        # built from the integrated lists as well, once they have been loaded by `download_data`
+        self.download_data()
+        automaton = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+        for word in self.banned_subwords:
+            automaton.add_word(word, len(automaton))
+        automaton.make_automaton()
+        return automaton
 
     def download_data(self):
         if self._downloaded or not self.use_integrated_lists:
@@ -98,9 +106,6 @@ class URLFilter(BaseFilter):
         self.banned_words = get_list(ASSETS_PATH, "banned_words.txt", self.banned_words)
         self.banned_subwords = get_list(ASSETS_PATH, "banned_subwords.txt", self.banned_subwords)
         self.soft_banned_words = get_list(ASSETS_PATH, "soft_banned_words.txt", self.soft_banned_words)
-        for word in self.banned_subwords:
-            self.banned_subwords_automaton.add_word(word, len(self.banned_subwords_automaton))
-        self.banned_subwords_automaton.make_automaton()
         self._downloaded = True
 
     def filter(self, document: Document) -> bool | tuple[bool, str]:
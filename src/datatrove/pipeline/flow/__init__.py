@@ -0,0 +1,19 @@
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .cache import Cache
+    from .parallel import ParallelStep
+    from .tee import Branch, Tee
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "cache": ["Cache"],
+        "parallel": ["ParallelStep"],
+        "tee": ["Branch", "Tee"],
+    },
+)
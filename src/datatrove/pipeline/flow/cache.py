@@ -0,0 +1,228 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from functools import partial
+from typing import Callable
+
+from fsspec import AbstractFileSystem
+
+from datatrove.data import BatchedDocumentsPipeline, DocumentsPipeline
+from datatrove.io import DataFolder, get_file_version
+from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.readers.base import BaseDiskReader
+from datatrove.utils.logging import logger
+
+
+def _default_cache_dir() -> str:
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "datatrove", "pipelines")
+
+
+def get_config(value, _depth: int = 0):
+    """
+        Json serializable representation of the configuration of a pipeline step (or of any value it holds), that does
+        not depend on the process or on the memory addresses of objects. Functions are represented by their name and
+        source code, steps and other objects by their class and public attributes.
+    Args:
+        value: a pipeline step, or any value
+
+    Returns: nested lists, dictionaries and json scalars
+
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if _depth > 10:
+        # cyclic or very deep structures
+        return type(value).__qualname__
+    if isinstance(value, (list, tuple)):
+        return [get_config(item, _depth + 1) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(json.dumps(get_config(item, _depth + 1), sort_keys=True) for item in value)
+    if isinstance(value, dict):
+        return {str(key): get_config(item, _depth + 1) for key, item in value.items()}
+    if isinstance(value, DataFolder):
+        return {"folder": value.fs.unstrip_protocol(value.path)}
+    if isinstance(value, AbstractFileSystem):
+        # the other attributes of filesystems are caches
+        return {"filesystem": value.protocol, "options": get_config(value.storage_options, _depth + 1)}
+    if isinstance(value, partial):
+        return {"partial": get_config([value.func, value.args, value.keywords], _depth + 1)}
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if inspect.isfunction(value) or inspect.ismethod(value):
+        try:
+            source = inspect.getsource(value)
+        except (OSError, TypeError):
+            source = value.__code__.co_code.hex()
+        return {"function": f"{value.__module__}.{value.__qualname__}", "source": source}
+    if isinstance(value, PipelineStep):
+        # declared assets are left out, like when pickling
+        attributes = value.__getstate__()
+    elif hasattr(value, "__dict__"):
+        attributes = vars(value)
+    else:
+        text = repr(value)
+        return text if " at 0x" not in text else type(value).__qualname__
+    return {
+        "class": f"{type(value).__module__}.{type(value).__qualname__}",
+        # private attributes and stats hold state, not configuration
+        **{
+            name: get_config(attribute, _depth + 1)
+            for name, attribute in attributes.items()
+            if not name.startswith("_") and name != "stats"
+        },
+    }
+
+
+class Cache(PipelineStep):
+    """Runs a list of pipeline steps (typically the expensive start of a pipeline, such as reading and extracting
+        text) and saves the documents they yield to a local cache. When a task is run again with the same steps and
+        inputs, the cached documents are read instead of running the steps, so that only the following steps are
+        recomputed.
+
+        Cache entries are identified by a fingerprint of the configuration of the wrapped steps (class and public
+        attributes, source code of functions, see `get_config`), of the number of tasks and of the input files of the
+        readers (path, size and etag or modification time of each file listed in their data folder). Changing any of
+        them runs the steps again. Each task saves its documents (pickled) to `{cache_dir}/{fingerprint}/{rank}.pkl`
+        once the wrapped steps are exhausted: tasks that fail or whose documents are not all consumed save nothing.
+
+        After saving an entry, entries that were not used for more than `max_age` seconds are deleted, and then the
+        least recently used entries until the cache is smaller than `max_size` bytes.
+
+        Must be the first step of the pipeline.
+
+    Args:
+        pipeline: list of PipelineStep and/or custom functions whose output is cached
+        cache_dir: local folder where the documents are saved. Defaults to `$XDG_CACHE_HOME/datatrove/pipelines`
+        max_age: seconds after which unused cache entries are deleted. None to keep them
+        max_size: maximum total size of the cache in bytes. None for no limit
+    """
+
+    type = "🔀 - FLOW"
+    name = "💾 Cache"
+
+    def __init__(
+        self,
+        pipeline: list[PipelineStep | Callable],
+        cache_dir: str | None = None,
+        max_age: float | None = 7 * 24 * 3600,
+        max_size: int | None = None,
+    ):
+        super().__init__()
+        self.pipeline = pipeline
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir or _default_cache_dir()))
+        self.max_age = max_age
+        self.max_size = max_size
+        # computed now, before running the steps changes their state
+        self.pipeline_config = json.dumps(get_config(pipeline), sort_keys=True, default=str)
+
+    def get_fingerprint(self, world_size: int) -> str:
+        """
+            Fingerprint of the wrapped steps and of their input files
+        Args:
+            world_size: total number of tasks
+
+        Returns: a hexadecimal digest
+
+        """
+        inputs = []
+        for pipeline_step in self.pipeline:
+            if isinstance(pipeline_step, BaseDiskReader):
+                files = pipeline_step.data_folder.list_files(
+                    recursive=pipeline_step.recursive, glob_pattern=pipeline_step.glob_pattern, detail=True
+                )
+                inputs.append([[path, info.get("size"), get_file_version(info)] for path, info in files.items()])
+        key = json.dumps([self.pipeline_config, inputs, world_size], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _read_cache(self, path: str) -> DocumentsPipeline:
+        with open(path, "rb", buffering=2**20) as f:
+            while True:
+                try:
+                    document = pickle.load(f)
+                except EOFError:
+                    return
+                self.update_doc_stats(document)
+                yield document
+
+    def evict(self):
+        """
+        Deletes the cache entries unused for more than `max_age` seconds, then the least recently used entries until
+        the cache is smaller than `max_size` bytes
+        """
+        now = time.time()
+        entries, total_size = [], 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".tmp"):
+                    # being written, or left behind by a task that crashed
+                    if self.max_age is not None and now - stat.st_mtime > self.max_age:
+                        entries.append((0, stat.st_size, path))
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+        for mtime, size, path in sorted(entries):
+            if (self.max_age is None or now - mtime <= self.max_age) and (
+                self.max_size is None or total_size <= self.max_size
+            ):
+                break
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                # already deleted, or other entries are left in this folder
+                pass
+            if mtime:
+                total_size -= size
+
+    def run(self, data: DocumentsPipeline = None, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+        """
+            Reads the cached documents of this task, or runs the wrapped steps and caches their documents
+        Args:
+            data: must be empty: the cache can not depend on the output of previous steps
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if data:
+            raise ValueError("Cache must be the first step of the pipeline")
+        fingerprint = self.get_fingerprint(world_size)
+        path = os.path.join(self.cache_dir, fingerprint, f"{rank:05d}.pkl")
+        if os.path.isfile(path):
+            logger.info(f"Reading cached documents of {rank=} from {path}")
+            self.stat_update("cache_hits")
+            # used now: the least recently used entries are evicted first
+            os.utime(path)
+            yield from self._read_cache(path)
+            return
+
+        self.stat_update("cache_misses")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pipelined_data = None
+        for pipeline_step in self.pipeline:
+            pipelined_data = pipeline_step(pipelined_data, rank, world_size)
+        if isinstance(pipelined_data, BatchedDocumentsPipeline):
+            pipelined_data = pipelined_data.to_documents()
+        try:
+            with open(tmp_path, "wb", buffering=2**20) as f:
+                for document in pipelined_data or []:
+                    # saved before the following steps can modify it
+                    f.write(pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL))
+                    self.update_doc_stats(document)
+                    yield document
+            os.replace(tmp_path, path)
+            logger.info(f"Cached the documents of {rank=} to {path}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable
+
+import dill
+
+from datatrove.data import Document, DocumentsPipeline
+from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.readers.base import BaseReader
+from datatrove.pipeline.writers.disk_base import DiskWriter
+from datatrove.utils.batching import batched
+from datatrove.utils.stats import Stats, get_pipeline_stats
+
+
+# state of each worker process, set by `_init_worker`
+_worker_pipeline: list[PipelineStep | Callable] | None = None
+_worker_rank: int = 0
+_worker_world_size: int = 1
+
+
+def _init_worker(pipeline_bytes: bytes, rank: int, world_size: int):
+    global _worker_pipeline, _worker_rank, _worker_world_size
+    _worker_pipeline = dill.loads(pipeline_bytes)
+    _worker_rank, _worker_world_size = rank, world_size
+
+
+def _get_available_cpus() -> int:
+    # cpus this process may run on. sched_getaffinity is not available on macOS and Windows
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _process_batch(batch: list[Document]) -> tuple[list[Document], list[Stats]]:
+    """
+        Runs the wrapped steps on a batch of documents, inside a worker process.
+    Args:
+        batch: list of documents to process
+
+    Returns: the resulting documents and the stats collected for this batch (one Stats per wrapped step)
+
+    """
+    pipelined_data = batch
+    for pipeline_step in _worker_pipeline:
+        pipelined_data = pipeline_step(pipelined_data, _worker_rank, _worker_world_size)
+    documents = list(pipelined_data) if pipelined_data else []
+    stats = list(get_pipeline_stats(_worker_pipeline))
+    for step_stats in stats:
+        step_stats.flush()
+    # reset the stats so that the next batch only reports its own
+    for step in _worker_pipeline:
+        if hasattr(step, "stats"):
+            old_stats, step.stats = step.stats, Stats(step.stats.name)
+            if old_stats.flush_every:
+                step.stats.enable_fast_mode(old_stats.flush_every, old_stats.time_stats.sample_every)
+    return documents, stats
+
+
+class ParallelStep(PipelineStep):
+    """Runs a list of pipeline steps on a pool of worker processes.
+        Documents are sent to the workers in batches of `batch_size`, and the resulting documents are yielded back
+        in their original order (unless `ordered=False`). Stats collected by each worker are merged into the stats of
+        the wrapped steps.
+
+        Only wrap steps that process each document independently (filters, extractors, formatters, etc): readers,
+        writers (including filters with an `exclusion_writer`) and steps that rely on the order or index of documents
+        (such as dedup filters) should stay outside.
+
+    Args:
+        pipeline: list of PipelineStep and/or custom functions to run on the workers
+        workers: number of worker processes. -1 to use all the cpus available to the task running the step (resolved
+            when it runs, not when the pipeline is defined)
+        batch_size: number of documents sent to a worker at a time
+        ordered: yield documents in their original order. Set to False to yield each batch as soon as it is ready
+        max_pending_batches: maximum number of batches being processed or waiting to be yielded at any given time.
+            Defaults to 2 * workers
+        start_method: method to use to start the worker processes (default: "forkserver")
+    """
+
+    type = "🔀 - FLOW"
+    name = "⚡ Parallel"
+
+    def __init__(
+        self,
+        pipeline: list[PipelineStep | Callable],
+        workers: int = -1,
+        batch_size: int = 1000,
+        ordered: bool = True,
+        max_pending_batches: int | None = None,
+        start_method: str = "forkserver",
+    ):
+        super().__init__()
+        for step in pipeline:
+            if isinstance(step, (BaseReader, DiskWriter)) or isinstance(
+                getattr(step, "exclusion_writer", None), DiskWriter
+            ):
+                raise ValueError(
+                    f"{step} can not be run inside a ParallelStep: readers and writers are not supported."
+                )
+        self.pipeline = pipeline
+        self.workers = workers
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.max_pending_batches = max_pending_batches
+        self.start_method = start_method
+
+    def _merge_batch_result(self, future: Future) -> list[Document]:
+        documents, batch_stats = future.result()
+        for stats, worker_stats in zip(get_pipeline_stats(self.pipeline), batch_stats):
+            stats.merge(worker_stats)
+        self.stat_update("batches")
+        return documents
+
+    def run(self, data: DocumentsPipeline, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+        """
+            Sends batches of documents to the worker pool and yields the processed documents
+        Args:
+            data: documents to process
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if not data:
+            return
+        workers = self.workers if self.workers != -1 else _get_available_cpus()
+        max_pending_batches = self.max_pending_batches or 2 * workers
+        if workers == 1:
+            # nothing to parallelize, run the wrapped steps in this process
+            pipelined_data = data
+            for pipeline_step in self.pipeline:
+                pipelined_data = pipeline_step(pipelined_data, rank, world_size)
+            if pipelined_data:
+                yield from pipelined_data
+            return
+
+        # ranks launched by the LocalPipelineExecutor run in daemonic `multiprocess` workers, which are not allowed to
+        # have children. The standard library's multiprocessing keeps its own process state, so we use it here
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(dill.dumps(self.pipeline), rank, world_size),
+        ) as pool:
+            pending: deque[Future] = deque()
+            for batch in batched(data, self.batch_size):
+                pending.append(pool.submit(_process_batch, batch))
+                while len(pending) >= max_pending_batches:
+                    if self.ordered:
+                        yield from self._merge_batch_result(pending.popleft())
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            yield from self._merge_batch_result(future)
+            while pending:
+                yield from self._merge_batch_result(pending.popleft())
@@ -0,0 +1,164 @@
+import queue
+import threading
+from collections import deque
+from typing import Callable
+
+from datatrove.data import Document, DocumentsPipeline
+from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.readers.base import BaseReader
+from datatrove.utils.typeshelper import StatHints
+
+
+class Branch(PipelineStep):
+    """One of the sub-pipelines of a Tee. Its stats count the documents it received, followed (in PipelineStats) by
+    the stats of each of its steps.
+
+    Args:
+        pipeline: list of PipelineStep and/or custom functions
+        name: name of this branch
+    """
+
+    type = "🔀 - FLOW"
+
+    def __init__(self, pipeline: list[PipelineStep | Callable], name: str):
+        self.name = f"↳ {name}"
+        super().__init__()
+        for step in pipeline:
+            if isinstance(step, BaseReader):
+                raise ValueError(f"{step} can not be used in a Tee branch: branches can not read their own data.")
+        self.pipeline = pipeline
+
+    def _count(self, data: DocumentsPipeline) -> DocumentsPipeline:
+        for document in data:
+            self.stat_update(StatHints.total)
+            yield document
+
+    def run(self, data: DocumentsPipeline, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+        """
+            Runs the steps of this branch on `data`
+        Args:
+            data: documents to process
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns: the documents yielded by the last step of this branch
+
+        """
+        pipelined_data = self._count(data)
+        for pipeline_step in self.pipeline:
+            pipelined_data = pipeline_step(pipelined_data, rank, world_size)
+        if pipelined_data:
+            yield from pipelined_data
+
+
+class Tee(PipelineStep):
+    """Feeds every document to several sub-pipelines (branches), each typically ending with its own writer or stats
+        step, and yields the documents unchanged to the following steps. The input is only read and parsed once for all
+        the branches.
+
+        Each branch runs in its own thread and receives a copy of each document (see `Document.copy`), so that steps
+        modifying documents in one branch do not affect the others. Documents are sent to the branches in batches of
+        `batch_size`: at most `max_pending_batches` batches are buffered for each branch, and reading waits for the
+        slowest branch once its buffer is full.
+
+        The stats of each branch (see Branch) and of its steps are reported separately, after the stats of the Tee.
+
+    Args:
+        branches: the sub-pipelines, as a list of lists of steps, or as a dictionary {name: list of steps}
+        batch_size: number of documents sent to each branch at a time
+        max_pending_batches: maximum number of batches waiting to be processed by each branch
+    """
+
+    type = "🔀 - FLOW"
+    name = "🌿 Tee"
+
+    def __init__(
+        self,
+        branches: list[list[PipelineStep | Callable]] | dict[str, list[PipelineStep | Callable]],
+        batch_size: int = 100,
+        max_pending_batches: int = 10,
+    ):
+        super().__init__()
+        if not isinstance(branches, dict):
+            branches = {f"branch {i}": branch for i, branch in enumerate(branches)}
+        self.pipeline: list[Branch] = [Branch(branch, name) for name, branch in branches.items()]
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
+
+    @staticmethod
+    def _feed(batches: queue.Queue) -> DocumentsPipeline:
+        while (batch := batches.get()) is not None:
+            yield from batch
+
+    def _run_branch(self, branch: Branch, batches: queue.Queue, errors: list, rank: int, world_size: int):
+        try:
+            deque(branch(self._feed(batches), rank, world_size), maxlen=0)
+        except BaseException as e:
+            errors.append(e)
+
+    def _send(self, batch: list[Document] | None, feeds: list[queue.Queue], threads: list[threading.Thread]):
+        """
+            Sends a batch (or the end of the data, if None) to each branch, waiting for branches with a full buffer.
+            Branches that stopped (after an error, or that did not consume all their data) are skipped
+        Args:
+            batch: list of documents, copied for each branch
+            feeds: the queue of each branch
+            threads: the thread of each branch
+
+        Returns:
+
+        """
+        for feed, thread in zip(feeds, threads):
+            branch_batch = [document.copy() for document in batch] if batch is not None else None
+            while thread.is_alive():
+                try:
+                    feed.put(branch_batch, timeout=1)
+                    break
+                except queue.Full:
+                    pass
+
+    def run(self, data: DocumentsPipeline, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+        """
+            Sends each document to every branch and yields it
+        Args:
+            data: documents to process
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if not data:
+            return
+        errors = []
+        feeds = [queue.Queue(self.max_pending_batches) for _ in self.pipeline]
+        threads = [
+            threading.Thread(
+                target=self._run_branch, args=(branch, feed, errors, rank, world_size), name=f"tee-{branch.name}"
+            )
+            for branch, feed in zip(self.pipeline, feeds)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            batch = []
+            for document in data:
+                batch.append(document)
+                if len(batch) == self.batch_size:
+                    self._send(batch, feeds, threads)
+                    self.stat_update("batches")
+                    if errors:
+                        break
+                    yield from batch
+                    batch = []
+            if batch and not errors:
+                self._send(batch, feeds, threads)
+                self.stat_update("batches")
+                yield from batch
+        finally:
+            # let the branches finish (e.g. close their writers) even if the following steps stopped early
+            self._send(None, feeds, threads)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
@@ -1,3 +1,19 @@
-from .ftfy import FTFYFormatter
-from .pii import PIIFormatter
-from .symbol_lines_remover import SymbolLinesFormatter
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .ftfy import FTFYFormatter
+    from .pii import PIIFormatter
+    from .symbol_lines_remover import SymbolLinesFormatter
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "ftfy": ["FTFYFormatter"],
+        "pii": ["PIIFormatter"],
+        "symbol_lines_remover": ["SymbolLinesFormatter"],
+    },
+)
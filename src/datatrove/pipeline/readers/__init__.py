@@ -1,6 +1,25 @@
-from .csv import CSVReader
-from .huggingface import HuggingFaceDatasetReader
-from .ipc import IpcReader
-from .jsonl import JsonlReader
-from .parquet import ParquetReader
-from .warc import WarcReader
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .csv import CSVReader
+    from .huggingface import HuggingFaceDatasetReader
+    from .ipc import IpcReader
+    from .jsonl import JsonlReader
+    from .parquet import ParquetReader
+    from .warc import WarcReader
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "csv": ["CSVReader"],
+        "huggingface": ["HuggingFaceDatasetReader"],
+        "ipc": ["IpcReader"],
+        "jsonl": ["JsonlReader"],
+        "parquet": ["ParquetReader"],
+        "warc": ["WarcReader"],
+    },
+)
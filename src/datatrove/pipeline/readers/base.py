@@ -1,16 +1,35 @@
 import random
 from abc import abstractmethod
+from contextlib import nullcontext
+from functools import partial
 from types import MethodType
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Iterator
 
-from tqdm import tqdm
-
-from datatrove.data import Document, DocumentsPipeline
+from datatrove.data import _MISSING, BatchedDocumentsPipeline, Document, DocumentBatch, DocumentsPipeline
 from datatrove.io import DataFolderLike, get_datafolder
 from datatrove.pipeline.base import PipelineStep
+from datatrove.utils.batching import batched
 from datatrove.utils.logging import logger
 
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def _build_metadata(data: dict, default_metadata: dict | None, source_metadata: dict | None) -> dict:
+    """
+    Builds the metadata of a document read with the default adapter from its remaining raw data. Used as a lazy
+    metadata loader
+    """
+    metadata = data.pop("metadata") | data if "metadata" in data else data  # remaining data goes into metadata
+    if default_metadata:
+        metadata = default_metadata | metadata
+    if source_metadata:
+        for key, value in source_metadata.items():
+            metadata.setdefault(key, value)
+    return metadata
+
+
 class BaseReader(PipelineStep):
     """Base module for Readers. Readers read data from a source and create documents.
         Reader are the first step in a pipeline usually.
@@ -45,6 +64,9 @@ class BaseReader(PipelineStep):
         self.adapter = MethodType(adapter, self) if adapter else self._default_adapter
         self._empty_warning = False
         self.default_metadata = default_metadata
+        # with the default adapter (not overridden by a subclass), metadata is only built when a step accesses it
+        self.lazy_metadata = adapter is None and type(self)._default_adapter is BaseReader._default_adapter
+        self._metadata_loader: tuple[str, Callable] | None = None
 
     def _default_adapter(self, data: dict, path: str, id_in_file: int | str):
         """
@@ -76,20 +98,93 @@ class BaseReader(PipelineStep):
         Returns: a Document
 
         """
+        if self.lazy_metadata:
+            # same as the default adapter, but the metadata dictionary is only built if needed
+            text = data.pop(self.text_key, "")
+            if not text:
+                self._warn_empty_text(data)
+                return None
+            return Document.with_metadata_loader(
+                text,
+                data.pop(self.id_key, f"{source_file}/{id_in_file}"),
+                data,
+                self._get_metadata_loader(source_file),
+                data.pop("media", None),
+            )
         parsed_data = self.adapter(data, source_file, id_in_file)
         if not parsed_data.get("text", None):
-            if not self._empty_warning:
-                self._empty_warning = True
-                logger.warning(
-                    f"Found document without text, skipping. "
-                    f'Is your `text_key` ("{self.text_key}") correct? Available keys: {list(data.keys())}'
-                )
+            self._warn_empty_text(data)
             return None
         document = Document(**parsed_data)
         if self.default_metadata:
             document.metadata = self.default_metadata | document.metadata
+        if source_metadata := self.get_source_metadata(source_file):
+            for key, value in source_metadata.items():
+                document.metadata.setdefault(key, value)
         return document
 
+    def _get_metadata_loader(self, source_file: str) -> Callable[[dict], dict]:
+        # shared by all the documents of the same source
+        if self._metadata_loader is None or self._metadata_loader[0] != source_file:
+            loader = partial(
+                _build_metadata,
+                default_metadata=self.default_metadata,
+                source_metadata=self.get_source_metadata(source_file),
+            )
+            self._metadata_loader = (source_file, loader)
+        return self._metadata_loader[1]
+
+    def _warn_empty_text(self, data: dict):
+        if not self._empty_warning:
+            self._empty_warning = True
+            logger.warning(
+                f"Found document without text, skipping. "
+                f'Is your `text_key` ("{self.text_key}") correct? Available keys: {list(data.keys())}'
+            )
+
+    def get_source_metadata(self, source_file: str) -> dict | None:
+        """
+        Metadata describing where documents come from (such as their file path), added to each document unless it
+        already has the same keys. To be overridden
+        Args:
+            source_file: file path or source of the documents
+
+        Returns: a dictionary or None
+
+        """
+        return None
+
+    def get_batch_from_arrow(self, data: "pa.RecordBatch", source_file: str, first_id_in_file: int) -> DocumentBatch:
+        """
+        Batch version of `get_document_from_dict`, for readers of columnar formats that can produce batches. Follows
+        the same conventions as the default adapter and adds `default_metadata`.
+        Args:
+            data: an arrow RecordBatch with the "raw" data
+            source_file: file path or source for these samples
+            first_id_in_file: id in this file of the first sample in the batch (ids are only incremented for samples
+            with text)
+
+        Returns: a DocumentBatch
+
+        """
+        import numpy as np
+
+        batch = DocumentBatch.from_arrow(data, self.text_key, self.id_key)
+        has_text = np.fromiter(map(bool, batch.text), dtype=bool, count=len(batch))
+        if not has_text.all():
+            if not self._empty_warning:
+                self._empty_warning = True
+                logger.warning(
+                    f"Found document without text, skipping. "
+                    f'Is your `text_key` ("{self.text_key}") correct? Available keys: {data.schema.names}'
+                )
+            batch = batch.filter(has_text)
+        if self.id_key not in data.schema.names:
+            batch.id[:] = [f"{source_file}/{first_id_in_file + i}" for i in range(len(batch))]
+        for key, value in (self.default_metadata or {}).items():
+            set_default_metadata(batch, key, value)
+        return batch
+
     @abstractmethod
     def run(self, data: DocumentsPipeline = None, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
         """
@@ -98,6 +193,19 @@ class BaseReader(PipelineStep):
         raise NotImplementedError
 
 
+def set_default_metadata(batch: DocumentBatch, key: str, value):
+    """
+    Batch equivalent of `document.metadata.setdefault(key, value)` for each document
+    """
+    import numpy as np
+
+    if key not in batch.metadata:
+        batch.metadata[key] = np.full(len(batch), value, dtype=object)
+    else:
+        column = batch.metadata[key]
+        column[np.fromiter((v is _MISSING for v in column), dtype=bool, count=len(column))] = value
+
+
 class BaseDiskReader(BaseReader):
     """Base module for fsspec based Readers. Readers read data from a source (local or remote) and create documents.
 
@@ -115,6 +223,7 @@ class BaseDiskReader(BaseReader):
     """
 
     type = "📖 - READER"
+    input_folders = ("data_folder",)
 
     def __init__(
         self,
@@ -130,6 +239,9 @@ class BaseDiskReader(BaseReader):
         recursive: bool = True,
         glob_pattern: str | None = None,
         shuffle_files: bool = False,
+        shard_by_size: bool = False,
+        prefetch_files: int = 0,
+        prefetch_bytes: int | None = 2**30,
     ):
         """
 
@@ -147,20 +259,34 @@ class BaseDiskReader(BaseReader):
             glob_pattern: pattern that all files must match exactly to be included (relative to data_folder)
             shuffle_files: shuffle the files within the returned shard. Mostly used for data viz. purposes, do not use
             with dedup blocks
+            shard_by_size: balance the total size of the files assigned to each task instead of their number
+            prefetch_files: download up to this number of the next input files in background threads while the
+                current one is being parsed. Files are still read in the same order. 0 to disable
+            prefetch_bytes: with `prefetch_files`, maximum total size of the files being downloaded or waiting to be
+                read (1GB by default). Larger files are not prefetched. None for no limit
         """
         super().__init__(limit, skip, adapter, text_key, id_key, default_metadata)
         self.data_folder = get_datafolder(data_folder)
         self.recursive = recursive
         self.glob_pattern = glob_pattern
         self.shuffle_files = shuffle_files
+        self.shard_by_size = shard_by_size
+        self.prefetch_files = prefetch_files
+        self.prefetch_bytes = prefetch_bytes
         self.file_progress = file_progress
         self.doc_progress = doc_progress
+        self.batched = False
+        # set by the executor when checkpointing is enabled
+        self.checkpoint_tracker = None
+        # number of files in the shard being read, used to report progress
+        self.shard_size: int | None = None
+        self._source_metadata: tuple[str, dict] | None = None
 
-    def get_document_from_dict(self, data: dict, source_file: str, id_in_file: int):
-        document = super().get_document_from_dict(data, source_file, id_in_file)
-        if document:
-            document.metadata.setdefault("file_path", self.data_folder.resolve_paths(source_file))
-        return document
+    def get_source_metadata(self, source_file: str) -> dict | None:
+        # documents are read file by file: avoid resolving the same path for each one
+        if self._source_metadata is None or self._source_metadata[0] != source_file:
+            self._source_metadata = (source_file, {"file_path": self.data_folder.resolve_paths(source_file)})
+        return self._source_metadata[1]
 
     @abstractmethod
     def read_file(self, filepath: str) -> DocumentsPipeline:
@@ -175,6 +301,37 @@ class BaseDiskReader(BaseReader):
         """
         raise NotImplementedError
 
+    def get_batch_from_arrow(self, data: "pa.RecordBatch", source_file: str, first_id_in_file: int) -> DocumentBatch:
+        batch = super().get_batch_from_arrow(data, source_file, first_id_in_file)
+        for key, value in self.get_source_metadata(source_file).items():
+            set_default_metadata(batch, key, value)
+        return batch
+
+    def read_file_batches(self, filepath: str) -> Iterator[DocumentBatch]:
+        """
+        Readers of columnar formats can implement this method to support `batched=True`. Should open the filepath
+        given and yield `DocumentBatch` objects (see `get_batch_from_arrow`).
+        Args:
+            filepath: path of the file to read
+
+        Returns: generator of DocumentBatch
+
+        """
+        raise NotImplementedError
+
+    def prefetch(self, shard: list[str]):
+        """
+            Context in which the next files of the shard are downloaded in the background, if `prefetch_files` is set
+        Args:
+            shard: the files that will be read, in order
+
+        Returns: a context manager
+
+        """
+        if not self.prefetch_files:
+            return nullcontext()
+        return self.data_folder.prefetch(shard, self.prefetch_files, self.prefetch_bytes)
+
     def read_files_shard(self, shard: list[str]) -> DocumentsPipeline:
         """
             Reads a list of files and yield Documents
@@ -184,9 +341,13 @@ class BaseDiskReader(BaseReader):
         Returns: generator of Document
 
         """
+        from tqdm import tqdm
+
+        self.shard_size = len(shard)
         li = 0
         skipped = 0
         with (
+            self.prefetch(shard),
             tqdm(
                 total=self.limit if self.limit != -1 else None,
                 desc="Document progress",
@@ -196,6 +357,10 @@ class BaseDiskReader(BaseReader):
             tqdm(total=len(shard), desc="File progress", unit="file", disable=not self.file_progress) as file_pbar,
         ):
             for i, filepath in enumerate(shard):
+                if self.checkpoint_tracker and not self.checkpoint_tracker.start_file(filepath):
+                    # already processed by a previous run of this task
+                    file_pbar.update()
+                    continue
                 self.stat_update("input_files")
                 logger.info(f"Reading input file {filepath}, {i+1}/{len(shard)}")
                 di = 0
@@ -210,24 +375,68 @@ class BaseDiskReader(BaseReader):
                     li += 1
                 file_pbar.update()
                 self.stat_update("documents", value=di, unit="input_file")
+                if self.checkpoint_tracker:
+                    # the following steps (filters, extractors and writers only, see `PipelineExecutor.checkpoints`)
+                    # handled the last document of this file before asking for the next one
+                    self.checkpoint_tracker.end_file(filepath)
                 if self.limit != -1 and li >= self.limit:
                     break
 
-    def run(self, data: DocumentsPipeline = None, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+    def read_files_shard_batches(self, shard: list[str]) -> Iterator[DocumentBatch]:
         """
-        Will get this rank's shard and sequentially read each file in the shard, yielding Document.
+            Reads a list of files and yield DocumentBatch. Batch equivalent of `read_files_shard`
+        Args:
+            shard: a list of file paths
+
+        Returns: generator of DocumentBatch
+
+        """
+        self.shard_size = len(shard)
+        li = 0
+        skipped = 0
+        with self.prefetch(shard):
+            for i, filepath in enumerate(shard):
+                if self.checkpoint_tracker and not self.checkpoint_tracker.start_file(filepath):
+                    continue
+                self.stat_update("input_files")
+                logger.info(f"Reading input file {filepath}, {i+1}/{len(shard)}")
+                di = 0
+                for batch in self.read_file_batches(filepath):
+                    di += len(batch)
+                    if skipped < self.skip:
+                        to_skip = min(self.skip - skipped, len(batch))
+                        skipped += to_skip
+                        batch = batch[to_skip:]
+                    if self.limit != -1:
+                        batch = batch[: max(self.limit - li, 0)]
+                    if len(batch) == 0:
+                        if self.limit != -1 and li >= self.limit:
+                            break
+                        continue
+                    yield batch
+                    li += len(batch)
+                self.stat_update("documents", value=di, unit="input_file")
+                if self.checkpoint_tracker:
+                    self.checkpoint_tracker.end_file(filepath)
+                if self.limit != -1 and li >= self.limit:
+                    break
+
+    def get_files_shard(self, rank: int, world_size: int) -> list[str]:
+        """
+            Lists the files assigned to this rank
         Args:
-            data: any existing data from previous pipeline stages
             rank: rank of the current task
             world_size: total number of tasks
 
-        Returns:
+        Returns: list of file paths
 
         """
-        if data:
-            yield from data
         files_shard = self.data_folder.get_shard(
-            rank, world_size, recursive=self.recursive, glob_pattern=self.glob_pattern
+            rank,
+            world_size,
+            balance_by_size=self.shard_by_size,
+            recursive=self.recursive,
+            glob_pattern=self.glob_pattern,
         )
         if len(files_shard) == 0:
             if rank == 0:
@@ -236,6 +445,67 @@ class BaseDiskReader(BaseReader):
             logger.warning(f"No files found on {self.data_folder.path} for {rank=}")
         if self.shuffle_files:
             random.shuffle(files_shard)
-        for doc in self.read_files_shard(files_shard):
+        return files_shard
+
+    def prepare_file_listing(self, world_size: int):
+        """
+            Lists the input files (and computes the shard assignment if `shard_by_size` is True) ahead of time, so that
+            they are saved in the executor's file manifest
+        Args:
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if self.shard_by_size:
+            self.data_folder.get_size_balanced_shards(
+                world_size, recursive=self.recursive, glob_pattern=self.glob_pattern
+            )
+        else:
+            self.data_folder.list_files(recursive=self.recursive, glob_pattern=self.glob_pattern)
+
+    def run(self, data: DocumentsPipeline = None, rank: int = 0, world_size: int = 1) -> DocumentsPipeline:
+        """
+        Will get this rank's shard and sequentially read each file in the shard, yielding Document.
+        Args:
+            data: any existing data from previous pipeline stages
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if data:
+            yield from data
+        for doc in self.read_files_shard(self.get_files_shard(rank, world_size)):
             self.update_doc_stats(doc)
             yield doc
+
+    def run_batches(
+        self, data: BatchedDocumentsPipeline | DocumentsPipeline = None, rank: int = 0, world_size: int = 1
+    ) -> Iterator[DocumentBatch]:
+        """
+        Batch equivalent of `run`, used when `batched=True`.
+        Args:
+            data: any existing data (or batches) from previous pipeline stages
+            rank: rank of the current task
+            world_size: total number of tasks
+
+        Returns:
+
+        """
+        if isinstance(data, BatchedDocumentsPipeline):
+            yield from data
+        elif data:
+            for documents in batched(data, 1000):
+                yield DocumentBatch.from_documents(documents)
+        for batch in self.read_files_shard_batches(self.get_files_shard(rank, world_size)):
+            self.update_batch_stats(batch)
+            yield batch
+
+    def __call__(
+        self, data: DocumentsPipeline | BatchedDocumentsPipeline = None, rank: int = 0, world_size: int = 1
+    ) -> DocumentsPipeline | BatchedDocumentsPipeline:
+        if self.batched:
+            return BatchedDocumentsPipeline(self.run_batches(data, rank, world_size))
+        return super().__call__(data, rank, world_size)
@@ -26,6 +26,12 @@ class CsvReader(BaseDiskReader):
         glob_pattern: a glob pattern to filter files to read (default: None)
         shuffle_files: shuffle the files within the returned shard. Mostly used for data viz. purposes, do not use
             with dedup blocks
+        shard_by_size: assign input files to tasks so that all tasks read a similar number of bytes, instead of the
+            same number of files. Useful when file sizes vary a lot
+        prefetch_files: download up to this number of the next input files in background threads while the current
+            one is being parsed (0 to disable). Documents are still read in the same order
+        prefetch_bytes: with `prefetch_files`, no new file is downloaded while the files waiting to be read hold more
+            than this number of bytes (default: 1GB)
     """
 
     name = "🔢 Csv"
@@ -45,6 +51,9 @@ class CsvReader(BaseDiskReader):
         recursive: bool = True,
         glob_pattern: str | None = None,
         shuffle_files: bool = False,
+        shard_by_size: bool = False,
+        prefetch_files: int = 0,
+        prefetch_bytes: int | None = 2**30,
     ):
         super().__init__(
             data_folder,
@@ -59,6 +68,9 @@ class CsvReader(BaseDiskReader):
             recursive,
             glob_pattern,
             shuffle_files,
+            shard_by_size,
+            prefetch_files,
+            prefetch_bytes,
         )
         self.compression = compression
         self.empty_warning = False
@@ -51,11 +51,8 @@ class HuggingFaceDatasetReader(BaseReader):
         self.doc_progress = doc_progress
         self.streaming = streaming
 
-    def get_document_from_dict(self, data: dict, source: str, id_in_file: int | str):
-        document = super().get_document_from_dict(data, source, id_in_file)
-        if document:
-            document.metadata.setdefault("dataset", source)
-        return document
+    def get_source_metadata(self, source_file: str) -> dict | None:
+        return {"dataset": source_file}
 
     def _get_dataset_shard(self, dst, rank: int, world_size: int):
         from datasets import Dataset, IterableDataset
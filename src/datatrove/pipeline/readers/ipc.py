@@ -1,5 +1,6 @@
-from typing import Callable
+from typing import Callable, Iterator
 
+from datatrove.data import DocumentBatch
 from datatrove.io import DataFolderLike
 from datatrove.pipeline.readers.base import BaseDiskReader
 
@@ -24,6 +25,14 @@ class IpcReader(BaseDiskReader):
         glob_pattern: a glob pattern to filter files to read (default: None)
         shuffle_files: shuffle the files within the returned shard. Mostly used for data viz. purposes, do not use
             with dedup blocks
+        batched: yield columnar `DocumentBatch` objects instead of individual documents, so that the next steps that
+            support batches can process them without creating a `Document` for each row. Requires the default adapter
+        shard_by_size: assign input files to tasks so that all tasks read a similar number of bytes, instead of the
+            same number of files. Useful when file sizes vary a lot
+        prefetch_files: download up to this number of the next input files in background threads while the current
+            one is being parsed (0 to disable). Documents are still read in the same order
+        prefetch_bytes: with `prefetch_files`, no new file is downloaded while the files waiting to be read hold more
+            than this number of bytes (default: 1GB)
     """
 
     name = "🪶 Ipc"
@@ -44,6 +53,10 @@ class IpcReader(BaseDiskReader):
         recursive: bool = True,
         glob_pattern: str | None = None,
         shuffle_files: bool = False,
+        batched: bool = False,
+        shard_by_size: bool = False,
+        prefetch_files: int = 0,
+        prefetch_bytes: int | None = 2**30,
     ):
         super().__init__(
             data_folder,
@@ -58,7 +71,13 @@ class IpcReader(BaseDiskReader):
             recursive,
             glob_pattern,
             shuffle_files,
+            shard_by_size,
+            prefetch_files,
+            prefetch_bytes,
         )
+        if batched and adapter is not None:
+            raise ValueError("`batched=True` is not supported with a custom `adapter`")
+        self.batched = batched
         self.stream = stream
         # TODO: add option to disable reading metadata (https://github.com/apache/arrow/issues/13827 needs to be addressed first)
 
@@ -78,6 +97,15 @@ class IpcReader(BaseDiskReader):
                 for batch in ipc_stream_reader:
                     yield batch
 
+    def read_file_batches(self, filepath: str) -> Iterator[DocumentBatch]:
+        batch_iter = self._iter_file_batches(filepath) if not self.stream else self._iter_stream_batches(filepath)
+        li = 0
+        for record_batch in batch_iter:
+            with self.track_time("batch"):
+                batch = self.get_batch_from_arrow(record_batch, filepath, li)
+            li += len(batch)
+            yield batch
+
     def read_file(self, filepath: str):
         batch_iter = self._iter_file_batches(filepath) if not self.stream else self._iter_stream_batches(filepath)
         li = 0
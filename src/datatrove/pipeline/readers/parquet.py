@@ -1,5 +1,6 @@
-from typing import Callable
+from typing import Callable, Iterator
 
+from datatrove.data import DocumentBatch
 from datatrove.io import DataFolderLike
 from datatrove.pipeline.readers.base import BaseDiskReader
 
@@ -26,6 +27,14 @@ class ParquetReader(BaseDiskReader):
         glob_pattern: a glob pattern to filter files to read (default: None)
         shuffle_files: shuffle the files within the returned shard. Mostly used for data viz. purposes, do not use
             with dedup blocks
+        batched: yield columnar `DocumentBatch` objects instead of individual documents, so that the next steps that
+            support batches can process them without creating a `Document` for each row. Requires the default adapter
+        shard_by_size: assign input files to tasks so that all tasks read a similar number of bytes, instead of the
+            same number of files. Useful when file sizes vary a lot
+        prefetch_files: download up to this number of the next input files in background threads while the current
+            one is being parsed (0 to disable). Documents are still read in the same order
+        prefetch_bytes: with `prefetch_files`, no new file is downloaded while the files waiting to be read hold more
+            than this number of bytes (default: 1GB)
     """
 
     name = "📒 Parquet"
@@ -47,6 +56,10 @@ class ParquetReader(BaseDiskReader):
         recursive: bool = True,
         glob_pattern: str | None = None,
         shuffle_files: bool = False,
+        batched: bool = False,
+        shard_by_size: bool = False,
+        prefetch_files: int = 0,
+        prefetch_bytes: int | None = 2**30,
     ):
         super().__init__(
             data_folder,
@@ -61,24 +74,41 @@ class ParquetReader(BaseDiskReader):
             recursive,
             glob_pattern,
             shuffle_files,
+            shard_by_size,
+            prefetch_files,
+            prefetch_bytes,
         )
+        if batched and adapter is not None:
+            raise ValueError("`batched=True` is not supported with a custom `adapter`")
+        self.batched = batched
         self.batch_size = batch_size
         self.read_metadata = read_metadata
 
-    def read_file(self, filepath: str):
+    def _iter_record_batches(self, filepath: str):
         import pyarrow.parquet as pq
 
         with self.data_folder.open(filepath, "rb") as f:
             with pq.ParquetFile(f) as pqf:
-                li = 0
                 columns = [self.text_key, self.id_key] if not self.read_metadata else None
-                for batch in pqf.iter_batches(batch_size=self.batch_size, columns=columns):
-                    documents = []
-                    with self.track_time("batch"):
-                        for line in batch.to_pylist():
-                            document = self.get_document_from_dict(line, filepath, li)
-                            if not document:
-                                continue
-                            documents.append(document)
-                            li += 1
-                    yield from documents
+                yield from pqf.iter_batches(batch_size=self.batch_size, columns=columns)
+
+    def read_file_batches(self, filepath: str) -> Iterator[DocumentBatch]:
+        li = 0
+        for record_batch in self._iter_record_batches(filepath):
+            with self.track_time("batch"):
+                batch = self.get_batch_from_arrow(record_batch, filepath, li)
+            li += len(batch)
+            yield batch
+
+    def read_file(self, filepath: str):
+        li = 0
+        for batch in self._iter_record_batches(filepath):
+            documents = []
+            with self.track_time("batch"):
+                for line in batch.to_pylist():
+                    document = self.get_document_from_dict(line, filepath, li)
+                    if not document:
+                        continue
+                    documents.append(document)
+                    li += 1
+            yield from documents
@@ -1,2 +1,17 @@
-from .doc_len import DocLenStats
-from .urls import URLStats
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .doc_len import DocLenStats
+    from .urls import URLStats
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "doc_len": ["DocLenStats"],
+        "urls": ["URLStats"],
+    },
+)
@@ -1,4 +1,21 @@
-from .context_shuffler import DocumentTokenizerContextShuffler
-from .counter import LengthCounter, TokensCounter
-from .merger import DocumentTokenizerMerger
-from .tokenizer import DocumentTokenizer
+from typing import TYPE_CHECKING
+
+from datatrove.utils._import_utils import lazy_exports
+
+
+if TYPE_CHECKING:
+    from .context_shuffler import DocumentTokenizerContextShuffler
+    from .counter import LengthCounter, TokensCounter
+    from .merger import DocumentTokenizerMerger
+    from .tokenizer import DocumentTokenizer
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "context_shuffler": ["DocumentTokenizerContextShuffler"],
+        "counter": ["LengthCounter", "TokensCounter"],
+        "merger": ["DocumentTokenizerMerger"],
+        "tokenizer": ["DocumentTokenizer"],
+    },
+)
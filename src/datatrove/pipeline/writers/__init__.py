@@ -1,5 +1,19 @@
-from .jsonl import JsonlWriter
-from .parquet import ParquetWriter
+from typing import TYPE_CHECKING
 
+from datatrove.utils._import_utils import lazy_exports
 
-from .huggingface import HuggingFaceDatasetWriter  # isort:skip
+
+if TYPE_CHECKING:
+    from .huggingface import HuggingFaceDatasetWriter
+    from .jsonl import JsonlWriter
+    from .parquet import ParquetWriter
+
+# submodules (and their dependencies) are only imported when one of their classes is used
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "huggingface": ["HuggingFaceDatasetWriter"],
+        "jsonl": ["JsonlWriter"],
+        "parquet": ["ParquetWriter"],
+    },
+)
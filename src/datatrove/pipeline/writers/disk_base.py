@@ -1,17 +1,24 @@
 import dataclasses
+import hashlib
 import os.path
 from abc import ABC, abstractmethod
 from collections import Counter
 from string import Template
 from types import MethodType
-from typing import IO, Callable
+from typing import IO, Callable, Iterable, Iterator
 
-from datatrove.data import Document, DocumentsPipeline
-from datatrove.io import DataFolderLike, get_datafolder
-from datatrove.pipeline.base import PipelineStep
+from datatrove.data import Document, DocumentBatch, DocumentsPipeline
+from datatrove.io import DataFolderLike, FileUploader, get_datafolder
+from datatrove.pipeline.base import PipelineStep, asset
 from datatrove.utils.typeshelper import StatHints
 
 
+# outputs of the input file being processed are written here (relative to the output folder) when checkpointing
+CHECKPOINT_TMP_DIR = ".checkpoint_tmp"
+# outputs of each attempt of a task are written here (relative to the output folder) with speculative execution
+ATTEMPTS_TMP_DIR = ".attempts"
+
+
 class DiskWriter(PipelineStep, ABC):
     """
         Base writer block to save data to disk.
@@ -21,10 +28,18 @@ class DiskWriter(PipelineStep, ABC):
         output_filename: the filename to use when saving data, including extension. Can contain placeholders such as `${rank}` or metadata tags `${tag}`
         compression: if any compression scheme should be used. By default, "infer" - will be guessed from the filename
         adapter: a custom function to "adapt" the Document format to the desired output format
+        staging_dir: local folder (typically on a fast node-local disk) where files are written before being uploaded
+            to `output_folder` in the background, once closed. Writing never waits for the remote storage, except
+            when the writer is closed (at the end of the task, or of each input file with checkpoints), which waits
+            for all the uploads to finish. None to write directly to `output_folder`
+        max_concurrent_uploads: maximum number of files uploaded at the same time, with `staging_dir`
     """
 
     default_output_filename: str = None
     type = "💽 - WRITER"
+    # False for writers that publish their files when they are closed (e.g. to the hub): the files of a speculative
+    # attempt (see `commit_attempt`) would be published before knowing if the attempt finished first
+    supports_attempts: bool = True
 
     def __init__(
         self,
@@ -35,10 +50,20 @@ class DiskWriter(PipelineStep, ABC):
         mode: str = "wt",
         expand_metadata: bool = False,
         max_file_size: int = -1,  # in bytes. -1 for unlimited
+        staging_dir: str | None = None,
+        max_concurrent_uploads: int = 4,
     ):
         super().__init__()
         self.compression = compression
         self.output_folder = get_datafolder(output_folder)
+        self.staging_folder = None
+        if staging_dir is not None:
+            # one subfolder per output folder, so that writers sharing a staging dir do not overwrite each other's files
+            key = hashlib.sha1(self.output_folder.fs.unstrip_protocol(self.output_folder.path).encode()).hexdigest()
+            self.staging_folder = get_datafolder(os.path.join(staging_dir, key[:16]))
+            if not self.staging_folder.is_local():
+                raise ValueError("staging_dir must be a local path")
+        self.max_concurrent_uploads = max_concurrent_uploads
         output_filename = output_filename or self.default_output_filename
         if self.compression == "gzip" and not output_filename.endswith(".gz"):
             output_filename += ".gz"
@@ -47,9 +72,15 @@ class DiskWriter(PipelineStep, ABC):
         if self.max_file_size > 0 and mode != "wb":
             raise ValueError("Can only specify `max_file_size` when writing in binary mode!")
         self.output_filename = Template(output_filename)
-        self.output_mg = self.output_folder.get_output_file_manager(mode=mode, compression=compression)
+        self.output_mg = (self.staging_folder or self.output_folder).get_output_file_manager(
+            mode=mode, compression=compression
+        )
         self.adapter = MethodType(adapter, self) if adapter else self._default_adapter
         self.expand_metadata = expand_metadata
+        # set by the executor's CheckpointTracker (see `commit_checkpoint_part`)
+        self.checkpoint_part: int | None = None
+        # set by the executor when this task may run more than once at the same time (see `commit_attempt`)
+        self.attempt: str | None = None
 
     def _default_adapter(self, document: Document) -> dict:
         """
@@ -68,8 +99,20 @@ class DiskWriter(PipelineStep, ABC):
     def __enter__(self):
         return self
 
+    @asset
+    def uploader(self) -> FileUploader:
+        return FileUploader(self.staging_folder, self.output_folder, self.max_concurrent_uploads)
+
     def close(self):
+        """
+        Closes all the open files. With a staging folder, uploads them and waits for all the uploads to finish
+        """
+        filenames = list(self.output_mg.get_open_files())
         self.output_mg.close()
+        if self.staging_folder is not None:
+            for filename in filenames:
+                self.uploader.upload(filename)
+            self.uploader.wait()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
@@ -119,6 +162,8 @@ class DiskWriter(PipelineStep, ABC):
 
         """
         self.output_mg.pop(old_filename).close()
+        if self.staging_folder is not None:
+            self.uploader.upload(old_filename)
 
     def _get_filename_with_file_id(self, filename):
         """
@@ -131,18 +176,17 @@ class DiskWriter(PipelineStep, ABC):
         """
         return f"{os.path.dirname(filename)}/{self.file_id_counter[filename]:03d}_{os.path.basename(filename)}"
 
-    def write(self, document: Document, rank: int = 0, **kwargs):
+    def _get_current_output_filename(self, original_name: str) -> str:
         """
-        Top level method to write a `Document` to disk. Will compute its output filename, adapt it to desired output format, write it and save stats.
+            Get the filename we should currently be writing to, switching to a new file if the current one is larger
+            than `max_file_size`
         Args:
-            document:
-            rank:
-            **kwargs: for the filename
+            original_name: filename without file id
 
-        Returns:
+        Returns: the filename to write to
 
         """
-        original_name = output_filename = self._get_output_filename(document, rank, **kwargs)
+        output_filename = original_name
         # we possibly have to change file
         if self.max_file_size > 0:
             # get size of current file
@@ -153,6 +197,106 @@ class DiskWriter(PipelineStep, ABC):
                 new_output_filename = self._get_filename_with_file_id(original_name)
                 self._on_file_switch(original_name, output_filename, new_output_filename)
                 output_filename = new_output_filename
+        return output_filename
+
+    def _get_checkpoint_filename(self, filename: str, rank: int) -> str:
+        """
+            When checkpointing, the documents of each input file are written to their own temporary files (prefixed
+            with the input file's number) until `commit_checkpoint_part` moves them to the output folder
+        Args:
+            filename: filename without file id
+            rank: the rank of the current worker
+
+        Returns: the filename to use as `original_name`
+
+        """
+        if self.attempt is not None:
+            # with speculative execution, each attempt writes to its own folder until `commit_attempt`
+            return os.path.join(ATTEMPTS_TMP_DIR, self.attempt, filename)
+        if self.checkpoint_part is None:
+            return filename
+        return os.path.join(
+            CHECKPOINT_TMP_DIR,
+            f"{rank:05d}",
+            os.path.dirname(filename),
+            f"part_{self.checkpoint_part:05d}_{os.path.basename(filename)}",
+        )
+
+    def start_checkpoints(self, rank: int):
+        """
+            Called before a task starts with checkpointing enabled. Deletes the uncommitted files of previous runs
+        Args:
+            rank: the rank of the current worker
+
+        Returns:
+
+        """
+        self.clear_checkpoint_parts(rank)
+
+    def clear_checkpoint_parts(self, rank: int):
+        tmp_dir = f"{CHECKPOINT_TMP_DIR}/{rank:05d}"
+        if self.output_folder.exists(tmp_dir):
+            self.output_folder.rm(tmp_dir, recursive=True)
+
+    def commit_checkpoint_part(self, rank: int):
+        """
+            Closes the files written for the current input file and moves them to their final location. Files of an
+            input file that was not committed are overwritten when it is processed again, so a crash at any point
+            never leaves duplicated documents behind.
+        Args:
+            rank: the rank of the current worker
+
+        Returns:
+
+        """
+        self.close()
+        self._move_to_output(f"{CHECKPOINT_TMP_DIR}/{rank:05d}")
+
+    def _move_to_output(self, tmp_dir: str):
+        for path in self.output_folder.find(tmp_dir):
+            filename = os.path.relpath(path, tmp_dir)
+            if os.path.dirname(filename):
+                self.output_folder.makedirs(os.path.dirname(filename), exist_ok=True)
+            self.output_folder.mv(path, filename)
+
+    def commit_attempt(self):
+        """
+            With speculative execution, called once the current attempt of a task is the first to finish: moves the
+            files it wrote to their final location
+        Returns:
+
+        """
+        self.close()
+        tmp_dir = f"{ATTEMPTS_TMP_DIR}/{self.attempt}"
+        self._move_to_output(tmp_dir)
+        self.discard_attempt(self.attempt)
+
+    def discard_attempt(self, attempt: str):
+        """
+            Deletes the files written by an attempt of a task that did not finish first
+        Args:
+            attempt: id of the attempt
+
+        Returns:
+
+        """
+        tmp_dir = f"{ATTEMPTS_TMP_DIR}/{attempt}"
+        if self.output_folder.exists(tmp_dir):
+            self.output_folder.rm(tmp_dir, recursive=True)
+
+    def write(self, document: Document, rank: int = 0, **kwargs):
+        """
+        Top level method to write a `Document` to disk. Will compute its output filename, adapt it to desired output format, write it and save stats.
+        Args:
+            document:
+            rank:
+            **kwargs: for the filename
+
+        Returns:
+
+        """
+        original_name = self._get_checkpoint_filename(self._get_output_filename(document, rank, **kwargs), rank)
+        output_filename = self._get_current_output_filename(original_name)
         # actually write
         self._write(self.adapter(document), self.output_mg.get_file(output_filename), original_name)
         self.stat_update(self._get_output_filename(document, "XXXXX", **kwargs))
@@ -175,3 +319,41 @@ class DiskWriter(PipelineStep, ABC):
                 with self.track_time():
                     self.write(document, rank)
                 yield document
+
+    def write_batch(self, batch: DocumentBatch, rank: int = 0, **kwargs):
+        """
+        Writes a `DocumentBatch`. By default, calls `write` for each document in the batch. Writers able to write
+        columnar data directly should override this method.
+        Args:
+            batch:
+            rank:
+            **kwargs: for the filename
+
+        Returns:
+
+        """
+        for document in batch.to_documents():
+            self.write(document, rank, **kwargs)
+
+    @property
+    def supports_batches(self) -> bool:
+        return True
+
+    def run_batches(
+        self, data: Iterable[DocumentBatch], rank: int = 0, world_size: int = 1
+    ) -> Iterator[DocumentBatch]:
+        """
+        Batch equivalent of `run`: calls `write_batch` for each batch
+        Args:
+            data:
+            rank:
+            world_size:
+
+        Returns:
+
+        """
+        with self:
+            for batch in data:
+                with self.track_time("batch"):
+                    self.write_batch(batch, rank)
+                yield batch
@@ -24,6 +24,7 @@ BASE_DELAY = 0.1
 class HuggingFaceDatasetWriter(ParquetWriter):
     default_output_filename: str = "data/${rank}.parquet"
     name = "🤗 HuggingFace"
+    supports_attempts = False
 
     def __init__(
         self,
@@ -93,6 +94,10 @@ class HuggingFaceDatasetWriter(ParquetWriter):
                 self.local_working_dir.rm(filename)
         self.operations.extend(additions)
 
+    def start_checkpoints(self, rank: int):
+        # files are uploaded and committed to the hub when they are closed, not per input file
+        raise ValueError(f"{self.name} does not support checkpoints")
+
     def close(self, rank: int = 0):
         filelist = list(self.output_mg.get_open_files().keys())
         super().close()
@@ -13,6 +13,8 @@ class JsonlWriter(DiskWriter):
         output_filename: the filename to use when saving data, including extension. Can contain placeholders such as `${rank}` or metadata tags `${tag}`
         compression: if any compression scheme should be used. By default, "infer" - will be guessed from the filename
         adapter: a custom function to "adapt" the Document format to the desired output format
+        staging_dir: local folder where files are written before being uploaded to `output_folder` in the background
+        max_concurrent_uploads: maximum number of files uploaded at the same time, with `staging_dir`
     """
 
     default_output_filename: str = "${rank}.jsonl"
@@ -24,8 +26,17 @@ class JsonlWriter(DiskWriter):
         output_filename: str = None,
         compression: str | None = "gzip",
         adapter: Callable = None,
+        staging_dir: str | None = None,
+        max_concurrent_uploads: int = 4,
     ):
-        super().__init__(output_folder, output_filename=output_filename, compression=compression, adapter=adapter)
+        super().__init__(
+            output_folder,
+            output_filename=output_filename,
+            compression=compression,
+            adapter=adapter,
+            staging_dir=staging_dir,
+            max_concurrent_uploads=max_concurrent_uploads,
+        )
 
     def _write(self, document: dict, file_handler: IO, _filename: str):
         file_handler.write(json.dumps(document, ensure_ascii=False) + "\n")
@@ -1,8 +1,73 @@
 from collections import Counter, defaultdict
-from typing import IO, Callable
+from typing import IO, TYPE_CHECKING, Callable
 
+from datatrove.data import DocumentBatch
 from datatrove.io import DataFolderLike
 from datatrove.pipeline.writers.disk_base import DiskWriter
+from datatrove.utils.typeshelper import StatHints
+
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def _conform_array(array: "pa.Array", target: "pa.DataType", name: str) -> "pa.Array":
+    """
+        Casts `array` to the type of a column of the file, recursively adding null fields for the struct fields
+        (metadata keys) that it does not have. Fields that the file does not have can not be added to it
+    Args:
+        array: the values of a column
+        target: the type of this column in the file
+        name: name of the column, for error messages
+
+    Returns: an array of type `target`
+
+    """
+    import pyarrow as pa
+
+    if not (pa.types.is_struct(array.type) and pa.types.is_struct(target)):
+        return array.cast(target)
+    fields = {field.name for field in target}
+    if extra := [field.name for field in array.type if field.name not in fields]:
+        raise ValueError(
+            f"Fields {extra} of column {name!r} are not in the schema of the parquet file (that of its first batch): "
+            f"documents written to the same file can only have a subset of its columns and metadata keys"
+        )
+    children = [
+        _conform_array(array.field(field.name), field.type, f"{name}.{field.name}")
+        if array.type.get_field_index(field.name) != -1
+        else pa.nulls(len(array), field.type)
+        for field in target
+    ]
+    return pa.StructArray.from_arrays(children, fields=list(target), mask=array.is_null())
+
+
+def _conform_to_schema(batch: "pa.RecordBatch", schema: "pa.Schema") -> "pa.Table":
+    """
+        Converts a batch to the schema of the parquet file it is written to. Documents do not always have the same
+        metadata keys: missing columns and struct fields are filled with nulls, while new ones raise a ValueError
+        instead of being silently dropped
+    Args:
+        batch: the batch to write
+        schema: the schema of the file (that of its first batch)
+
+    Returns: a table with the schema of the file
+
+    """
+    import pyarrow as pa
+
+    if extra := [name for name in batch.schema.names if name not in schema.names]:
+        raise ValueError(
+            f"Columns {extra} are not in the schema of the parquet file (that of its first batch): documents written "
+            f"to the same file can only have a subset of its columns and metadata keys"
+        )
+    columns = [
+        _conform_array(batch.column(field.name), field.type, field.name)
+        if field.name in batch.schema.names
+        else pa.nulls(len(batch), field.type)
+        for field in schema
+    ]
+    return pa.Table.from_batches([pa.RecordBatch.from_arrays(columns, schema=schema)])
 
 
 class ParquetWriter(DiskWriter):
@@ -19,6 +84,8 @@ class ParquetWriter(DiskWriter):
         batch_size: int = 1000,
         expand_metadata: bool = False,
         max_file_size: int = 5 * 2**30,  # 5GB
+        staging_dir: str | None = None,
+        max_concurrent_uploads: int = 4,
     ):
         super().__init__(
             output_folder,
@@ -28,6 +95,8 @@ class ParquetWriter(DiskWriter):
             mode="wb",
             expand_metadata=expand_metadata,
             max_file_size=max_file_size,
+            staging_dir=staging_dir,
+            max_concurrent_uploads=max_concurrent_uploads,
         )
         self._writers = {}
         self._batches = defaultdict(list)
@@ -68,6 +137,35 @@ class ParquetWriter(DiskWriter):
         if len(self._batches[filename]) == self.batch_size:
             self._write_batch(filename)
 
+    def write_batch(self, batch: DocumentBatch, rank: int = 0, **kwargs):
+        """
+        Writes the batch directly as an arrow RecordBatch, when using the default adapter and an output filename
+        that only depends on the rank. Otherwise, falls back to writing each document individually.
+        """
+        if kwargs or self.adapter != self._default_adapter:
+            return super().write_batch(batch, rank, **kwargs)
+        try:
+            original_name = self.output_filename.substitute(rank=str(rank).zfill(5))
+        except (KeyError, ValueError):
+            # filename depends on the id or metadata of each document
+            return super().write_batch(batch, rank, **kwargs)
+        original_name = self._get_checkpoint_filename(original_name, rank)
+        import pyarrow.parquet as pq
+
+        # keep the order with documents written individually
+        if original_name in self._writers:
+            self._write_batch(original_name)
+        output_filename = self._get_current_output_filename(original_name)
+        record_batch = batch.to_arrow(expand_metadata=self.expand_metadata)
+        if original_name not in self._writers:
+            self._writers[original_name] = pq.ParquetWriter(
+                self.output_mg.get_file(output_filename), schema=record_batch.schema
+            )
+        table = _conform_to_schema(record_batch, self._writers[original_name].schema)
+        self._writers[original_name].write_table(table, row_group_size=self.batch_size)
+        self.stat_update_many(self.output_filename.substitute(rank="XXXXX"), StatHints.total, values=len(batch))
+        self.update_batch_stats(batch)
+
     def close(self):
         for filename in list(self._batches.keys()):
             self._write_batch(filename)
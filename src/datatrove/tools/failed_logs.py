@@ -8,6 +8,7 @@ from rich.prompt import Confirm
 
 from datatrove.io import get_datafolder
 from datatrove.utils._import_utils import is_rich_available
+from datatrove.utils.completions import CompletionStore
 from datatrove.utils.logging import logger
 
 
@@ -27,7 +28,7 @@ RANK_FROM_LOG_FILENAME_REGEX = re.compile(r"logs/task_(\d{5})\.log")
 def main():
     """
     Takes a `logging_dir` as input, gets total number of tasks from `executor.json` and then gets which ranks are
-    incomplete by scanning `logging_dir/completions`. The log files for the incomplete tasks are then displayed.
+    incomplete by loading `logging_dir/completions`. The log files for the incomplete tasks are then displayed.
     """
     args = parser.parse_args()
     console = Console()
@@ -49,8 +50,7 @@ def main():
     console.log(f"Found executor config: {world_size} tasks")
 
     with console.status("Fetching list of incomplete tasks"):
-        completed = set(logging_dir.list_files("completions"))
-        incomplete = set(filter(lambda rank: f"completions/{rank:05d}" not in completed, range(world_size)))
+        incomplete = set(range(world_size)) - CompletionStore(logging_dir).completed_ranks()
     console.log(f"Found {len(incomplete)}/{world_size} incomplete tasks.")
 
     with console.status("Looking for log files"):
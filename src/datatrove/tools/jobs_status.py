@@ -2,11 +2,14 @@ import argparse
 import json
 import os.path
 
+import humanize
 from rich.console import Console
 
 from datatrove.io import get_datafolder
 from datatrove.utils._import_utils import is_rich_available
+from datatrove.utils.completions import CompletionStore
 from datatrove.utils.logging import logger
+from datatrove.utils.progress import summarize_progress
 
 
 if not is_rich_available():
@@ -23,13 +26,34 @@ parser.add_argument(
     "-p", "--log_prefix", type=str, nargs="?", help="Prefix of logging folders to be scanned.", default=""
 )
 parser.add_argument("-hc", "--hide_complete", help="Hide all jobs that are already complete.", action="store_true")
+parser.add_argument(
+    "-np", "--no_progress", help="Do not show the live progress of incomplete jobs.", action="store_true"
+)
+
+
+def format_progress(progress: dict) -> str:
+    """
+    Formats the summary of the progress files of a job (see `summarize_progress`)
+    """
+    parts = [
+        f"{humanize.intcomma(round(progress['docs_per_second']))} docs/s",
+        f"{humanize.naturalsize(progress['chars_per_second'])}/s of text",
+        f"ETA {humanize.naturaldelta(progress['eta'])}" if progress["eta"] is not None else "ETA unknown",
+    ]
+    if progress["time_share"]:
+        bottleneck, share = max(progress["time_share"].items(), key=lambda x: x[1])
+        parts.append(f"bottleneck: {bottleneck} ({share:.0%} of the time)")
+    if drop_rates := {name: rate for name, rate in progress["drop_rate"].items() if rate > 0}:
+        parts.append("dropped: " + ", ".join(f"{name} {rate:.1%}" for name, rate in drop_rates.items()))
+    return " | ".join(parts)
 
 
 def main():
     """
     Takes a `path` as input, gets all valid job folders and their total number of tasks from `executor.json` and then gets which ranks are
     incomplete by scanning `path/{LOGGING_DIRS}/completions`. If a `log_prefix` is provided the directories following the `path/log_prefix{LOGGING_DIRS}/completions`
-    pattern are scanned.
+    pattern are scanned. For incomplete jobs that save their progress (`progress_interval`), the current throughput,
+    the step that takes the most time, drop rates and an ETA are also shown.
     """
     args = parser.parse_args()
     console = Console()
@@ -64,8 +88,8 @@ def main():
             continue
 
         with console.status("Fetching list of incomplete tasks"):
-            completed = set(logging_dir.list_files("completions"))
-            incomplete = set(filter(lambda rank: f"completions/{rank:05d}" not in completed, range(world_size)))
+            completed = CompletionStore(logging_dir).completed_ranks()
+            incomplete = set(range(world_size)) - completed
 
         if len(incomplete) == 0:
             emoji = "✅"
@@ -78,6 +102,15 @@ def main():
             console.log(
                 f"{emoji} {path + ':': <50}{len(completed)}/{world_size} ({len(completed)/(world_size):.0%}) completed tasks."
             )
+            if len(incomplete) > 0 and not args.no_progress and logging_dir.isdir("progress"):
+                with console.status("Fetching progress of running tasks"):
+                    progress = summarize_progress(
+                        get_datafolder((logging_dir.resolve_paths("progress"), logging_dir.fs)),
+                        world_size,
+                        {rank for rank in range(world_size) if rank not in incomplete},
+                    )
+                if progress:
+                    console.log(f"{'': <53}{format_progress(progress)}")
 
     if complete_jobs + incomplete_jobs > 0:
         console.log(
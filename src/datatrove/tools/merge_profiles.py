@@ -0,0 +1,36 @@
+import argparse
+import os.path
+
+from datatrove.io import get_datafolder, open_file
+from datatrove.utils.logging import logger
+from datatrove.utils.profiling import merge_profiles
+
+
+parser = argparse.ArgumentParser("Combine the collapsed stacks profiled on each task into a single profile.")
+
+parser.add_argument(
+    "path",
+    type=str,
+    nargs="?",
+    help="Path to the profiles folder. Defaults to current directory.",
+    default=os.getcwd(),
+)
+parser.add_argument(
+    "--output",
+    "-o",
+    type=str,
+    help="Save file location. Defaults to 'profile.collapsed'.",
+    default="profile.collapsed",
+)
+
+
+def main():
+    args = parser.parse_args()
+    profiles_folder = get_datafolder(args.path)
+    with open_file(args.output, mode="wt") as f:
+        merge_profiles(profiles_folder, f)
+    logger.info(f"Processing complete. Results saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
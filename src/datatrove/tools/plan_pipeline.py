@@ -0,0 +1,74 @@
+import argparse
+import json
+import runpy
+
+import dill
+
+from datatrove.executor.base import PipelineExecutor
+from datatrove.io import open_file
+
+
+parser = argparse.ArgumentParser(
+    "Dry run of a pipeline on a sample of its input files: projects the time, cpu-hours and memory of the whole job and "
+    "recommends tasks, workers and mem_per_cpu_gb."
+)
+
+parser.add_argument(
+    "path",
+    type=str,
+    help="Path to a pickled executor (executor.pik) or to a python script that creates one. Scripts must only launch "
+    'their executors under `if __name__ == "__main__":`',
+)
+parser.add_argument(
+    "--executor", "-e", type=str, help="Name of the executor variable in the script, if it defines more than one"
+)
+parser.add_argument("--sample_files", "-n", type=int, default=5, help="Number of input files to run the pipeline on.")
+parser.add_argument(
+    "--sample_tasks", type=int, default=2, help="Number of tasks to run instead, for pipelines without a reader."
+)
+parser.add_argument("--target_task_hours", type=float, default=2.0, help="Maximum duration of a recommended task.")
+parser.add_argument("--seed", type=int, default=0, help="Seed used to sample the files or tasks.")
+parser.add_argument("--output", "-o", type=str, help="Also save the plan to this json file.")
+
+
+def load_executor(path: str, name: str | None = None) -> PipelineExecutor:
+    """
+        Loads an executor from a pickled file or from the global variables of a python script
+    Args:
+        path: path to executor.pik or to a python script
+        name: name of the executor variable in the script
+
+    Returns: the executor
+
+    """
+    if not path.endswith(".py"):
+        with open_file(path, "rb") as f:
+            return dill.load(f)
+    variables = runpy.run_path(path, run_name="__datatrove_plan__")
+    executors = {key: value for key, value in variables.items() if isinstance(value, PipelineExecutor)}
+    if name:
+        if name not in executors:
+            raise ValueError(f'"{name}" is not an executor defined in {path}. Executors: {list(executors)}')
+        return executors[name]
+    if len(executors) != 1:
+        raise ValueError(f"{path} should define exactly one executor (use --executor). Executors: {list(executors)}")
+    return next(iter(executors.values()))
+
+
+def main():
+    args = parser.parse_args()
+    executor = load_executor(args.path, args.executor)
+    plan = executor.plan(
+        sample_files=args.sample_files,
+        sample_tasks=args.sample_tasks,
+        target_task_hours=args.target_task_hours,
+        seed=args.seed,
+    )
+    print(plan)
+    if args.output:
+        with open_file(args.output, "wt") as f:
+            json.dump(plan.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
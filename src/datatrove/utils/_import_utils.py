@@ -1,10 +1,39 @@
-import importlib.resources
+import importlib.util
 import os
+import sys
 from functools import lru_cache
-from typing import NoReturn
+from typing import Callable, NoReturn
 
 
-ASSETS_PATH = os.path.join(importlib.resources.files(__package__.split(".")[0]), "assets")
+# importlib.resources is slow to import, and datatrove is always installed as a regular package
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+
+def lazy_exports(package: str, exports: dict[str, list[str]]) -> tuple[Callable, Callable, list[str]]:
+    """
+        Lets a package expose the classes of its submodules without importing them (and their dependencies) until they
+        are used. Usage, in the package's `__init__.py`: `__getattr__, __dir__, __all__ = lazy_exports(__name__, {...})`
+    Args:
+        package: name of the package (`__name__`)
+        exports: {submodule name: names it exports}
+
+    Returns: the `__getattr__`, `__dir__` and `__all__` of the package
+
+    """
+    submodules = {name: submodule for submodule, names in exports.items() for name in names}
+
+    def __getattr__(name: str):
+        if name not in submodules:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(f".{submodules[name]}", package), name)
+        # later accesses do not go through __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(vars(sys.modules[package])) | set(submodules))
+
+    return __getattr__, __dir__, list(submodules)
 
 
 def check_required_dependencies(step_name: str, required_dependencies: list[str] | list[tuple[str, str]]):
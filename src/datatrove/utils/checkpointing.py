@@ -0,0 +1,92 @@
+import json
+import os
+
+from datatrove.io import DataFolder
+from datatrove.utils.logging import logger
+
+
+class CheckpointTracker:
+    """Keeps track of the input files fully processed by a task, so that a rerun of an incomplete task (after a crash
+        or preemption) resumes from its last completed file.
+        Readers call `start_file` before reading each input file and `end_file` once all its documents went through the
+        pipeline. The writers added with `add_writer` save the documents of each input file to temporary files, which
+        are moved to their final location by `end_file` before the input file is recorded as completed.
+
+    Args:
+        logging_dir: the executor's logging folder. Completed files are saved to `checkpoints/{rank:05d}.json`
+        rank: rank of the current task
+    """
+
+    def __init__(self, logging_dir: DataFolder, rank: int):
+        self.logging_dir = logging_dir
+        self.rank = rank
+        self.filename = f"checkpoints/{rank:05d}.json"
+        self.completed_files: list[str] = []
+        if logging_dir.isfile(self.filename):
+            with logging_dir.open(self.filename, "rt") as f:
+                self.completed_files = json.load(f)["completed_files"]
+            logger.info(f"Resuming {rank=}: {len(self.completed_files)} input files were already processed.")
+        self._completed = set(self.completed_files)
+        self._next_part = 0
+        self.writers = []
+
+    def add_writer(self, writer):
+        """
+            Registers a writer, whose outputs will be committed every time an input file is completed. Temporary files
+            left behind by a previous run of this task are deleted.
+        Args:
+            writer: a DiskWriter
+
+        Returns:
+
+        """
+        writer.start_checkpoints(self.rank)
+        self.writers.append(writer)
+
+    def start_file(self, filepath: str) -> bool:
+        """
+            Called by readers before reading each input file, in the same (deterministic) order on every run.
+        Args:
+            filepath: path of the input file
+
+        Returns: False if this file was already processed by a previous run and should be skipped
+
+        """
+        # input files are numbered even when skipped, so that their outputs keep the same name across runs
+        part = self._next_part
+        self._next_part += 1
+        if filepath in self._completed:
+            return False
+        for writer in self.writers:
+            writer.checkpoint_part = part
+        return True
+
+    def end_file(self, filepath: str):
+        """
+            Called by readers once every document of an input file was processed by the rest of the pipeline. Commits
+            the outputs of each writer and saves the file as completed.
+        Args:
+            filepath: path of the input file
+
+        Returns:
+
+        """
+        for writer in self.writers:
+            writer.commit_checkpoint_part(self.rank)
+            writer.checkpoint_part = None
+        self.completed_files.append(filepath)
+        self._completed.add(filepath)
+        # write to a temporary file first so that a crash never leaves a partial checkpoint behind
+        tmp_file = f"{self.filename}.{os.getpid()}.tmp"
+        with self.logging_dir.open(tmp_file, "wt") as f:
+            json.dump({"completed_files": self.completed_files}, f)
+        self.logging_dir.mv(tmp_file, self.filename)
+
+    def clear(self):
+        """
+        Deletes the checkpoint of this task, once it has been completed
+        """
+        if self.logging_dir.isfile(self.filename):
+            self.logging_dir.rm(self.filename)
+        for writer in self.writers:
+            writer.clear_checkpoint_parts(self.rank)
@@ -0,0 +1,185 @@
+import os
+import posixpath
+
+from datatrove.io import DataFolder
+from datatrove.utils.logging import get_random_str, logger
+
+
+# compact the bitmaps and segments into a single bitmap once there are more than this number of them
+COMPACTION_THRESHOLD = 64
+# only one process compacts at a time. Locks older than this (in seconds) were left behind by a crashed process
+COMPACTION_LOCK_TIMEOUT = 300
+COMPACTION_LOCK = "completions/compaction.lock"
+# processes completing more ranks than this start a new segment, so that each completion writes a small file
+MAX_SEGMENT_RANKS = 256
+
+
+def ranks_to_bitmap(ranks: set[int]) -> bytes:
+    bitmap = bytearray((max(ranks) // 8 + 1) if ranks else 0)
+    for rank in ranks:
+        bitmap[rank // 8] |= 1 << (rank % 8)
+    return bytes(bitmap)
+
+
+def bitmap_to_ranks(bitmap: bytes) -> set[int]:
+    return {i * 8 + bit for i, byte in enumerate(bitmap) if byte for bit in range(8) if byte & (1 << bit)}
+
+
+class CompletionStore:
+    """Keeps track of the completed ranks of an executor in `logging_dir/completions`, so that all of them can be
+        loaded with a single listing and a few reads instead of a file per rank:
+        - each process writing completions has its own segment, `segments/{writer}.{version}`, with the ranks it
+        completed. Every new completion writes a new version of the segment (with one more rank) and removes the
+        previous one, so that no filesystem support for appends is needed and segments are never modified. Segments
+        hold up to `MAX_SEGMENT_RANKS` ranks
+        - once there are more than `compaction_threshold` bitmaps and segments, they are compacted into a single
+        bitmap, `bitmaps/{id}.bin`, with a bit set for each completed rank. Only the process holding
+        `compaction.lock` compacts. Compaction writes a new bitmap with the union of the bitmaps and segments it read
+        before removing them: concurrent compactions (if two processes took the lock at the same time) or completions
+        never lose a rank
+        - bitmaps and segments are never modified, so each process only reads them once: checking a single rank
+        (`is_completed`) lists the folder and only reads the files created since the last check
+        - files named after a rank, `{rank:05d}`, written by older versions of datatrove, are also read
+
+    Args:
+        logging_dir: the executor's logging folder
+        compaction_threshold: number of bitmaps and segments above which `completed_ranks` compacts them
+    """
+
+    def __init__(self, logging_dir: DataFolder, compaction_threshold: int = COMPACTION_THRESHOLD):
+        self.folder = logging_dir
+        self.compaction_threshold = compaction_threshold
+        self._pid = None
+        self._writer = None
+        self._version = 0
+        self._written: set[int] = set()
+        # ranks of the bitmaps and segments already read by this process
+        self._files: dict[str, set[int]] = {}
+
+    def __getstate__(self):
+        # can be large, and is cheap to load again
+        return self.__dict__ | {"_files": {}}
+
+    def _list(self) -> tuple[set[int], list[str], list[str]]:
+        """
+        Returns: ranks of the legacy files, paths of the bitmaps and paths of the segments
+
+        """
+        legacy, bitmaps, segments = set(), [], []
+        # files written by other processes must be seen
+        self.folder.fs.invalidate_cache()
+        if not self.folder.isdir("completions"):
+            return legacy, bitmaps, segments
+        for path in self.folder.list_files("completions"):
+            parent, name = posixpath.split(path)
+            if parent == "completions" and name.isdigit():
+                legacy.add(int(name))
+            elif parent == "completions/bitmaps" and name.endswith(".bin"):
+                bitmaps.append(path)
+            elif parent == "completions/segments" and not name.endswith(".tmp"):
+                segments.append(path)
+        return legacy, bitmaps, segments
+
+    def _read(self, path: str) -> set[int] | None:
+        if path in self._files:
+            return self._files[path]
+        try:
+            with self.folder.open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        ranks = bitmap_to_ranks(data) if path.endswith(".bin") else {int(rank) for rank in data.split()}
+        self._files[path] = ranks
+        return ranks
+
+    def completed_ranks(self) -> set[int]:
+        """
+            Loads the completed ranks. Compacts the segments if there are too many of them
+        Returns: set of completed ranks
+
+        """
+        while True:
+            legacy, bitmaps, segments = self._list()
+            completed = set(legacy)
+            for path in bitmaps + segments:
+                if (ranks := self._read(path)) is None:
+                    # replaced by a newer version or compacted since it was listed: list the files again
+                    break
+                completed.update(ranks)
+            else:
+                break
+        # removed files are not listed again
+        self._files = {path: self._files[path] for path in bitmaps + segments}
+        if len(bitmaps) + len(segments) > self.compaction_threshold:
+            self.compact()
+        return completed
+
+    def is_completed(self, rank: int) -> bool:
+        """
+            Checks if a rank is completed. Only reads the bitmaps and segments created since the last check
+        Args:
+            rank: the rank to check
+
+        Returns: whether the rank is completed
+
+        """
+        return rank in self.completed_ranks()
+
+    def mark_completed(self, rank: int):
+        """
+            Saves a rank as completed, in the segment of this process
+        Args:
+            rank: the completed rank
+
+        """
+        if self._pid != os.getpid() or len(self._written) >= MAX_SEGMENT_RANKS:
+            # forked or unpickled in a new process, or the segment is full: start a new segment
+            self._pid = os.getpid()
+            self._writer = f"{self._pid}-{get_random_str(8)}"
+            self._version = 0
+            self._written = set()
+        self._written.add(rank)
+        self._version += 1
+        path = f"completions/segments/{self._writer}.{self._version:06d}"
+        # write to a temporary file first so that readers never see a partial segment
+        with self.folder.open(f"{path}.tmp", "wt") as f:
+            f.write("\n".join(map(str, sorted(self._written))))
+        self.folder.mv(f"{path}.tmp", path)
+        if self._version > 1:
+            self._remove(f"completions/segments/{self._writer}.{self._version - 1:06d}")
+
+    def _remove(self, path: str):
+        try:
+            self.folder.rm_file(path)
+        except FileNotFoundError:
+            # already removed by a concurrent compaction
+            pass
+
+    def compact(self):
+        """
+        Merges the bitmaps and segments into a single bitmap, then removes them. Does nothing if another process is
+        already compacting them
+        """
+        if (lock_id := self.folder.try_lock(COMPACTION_LOCK, COMPACTION_LOCK_TIMEOUT)) is None:
+            return
+        try:
+            self._compact()
+        finally:
+            self.folder.release_lock(COMPACTION_LOCK, lock_id)
+
+    def _compact(self):
+        _, bitmaps, segments = self._list()
+        if len(bitmaps) + len(segments) <= 1:
+            return
+        completed, merged = set(), []
+        for path in bitmaps + segments:
+            if (ranks := self._read(path)) is not None:
+                completed.update(ranks)
+                merged.append(path)
+        path = f"completions/bitmaps/{get_random_str(16)}.bin"
+        with self.folder.open(f"{path}.tmp", "wb") as f:
+            f.write(ranks_to_bitmap(completed))
+        self.folder.mv(f"{path}.tmp", path)
+        for merged_path in merged:
+            self._remove(merged_path)
+        logger.info(f"Compacted {len(merged)} completion files into {path}")
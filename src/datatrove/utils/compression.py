@@ -0,0 +1,251 @@
+import io
+import re
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+
+from fsspec.compression import compr
+from fsspec.utils import infer_compression as fsspec_infer_compression
+
+from datatrove.utils._import_utils import _is_package_available, check_required_dependencies
+
+
+# decompression backends of each compression, see `open_decompressed`
+DECOMPRESSION_BACKENDS = {
+    "gzip": ("python", "isal", "zlib-ng", "parallel"),
+    "zstd": ("zstandard",),
+}
+# start of every gzip member: magic number and deflate compression method
+GZIP_MEMBER_START = re.compile(b"\x1f\x8b\x08")
+
+
+def infer_compression(path: str) -> str | None:
+    """
+    Compression of a file, inferred from its extension. Unlike fsspec, also recognizes zstd files when `zstandard`
+    is not installed (opening them then asks to install it)
+    """
+    if path.endswith((".zst", ".zstd")):
+        return "zstd"
+    return fsspec_infer_compression(path)
+
+
+def get_inflate_module():
+    """
+    The fastest installed implementation of the `zlib` module API: ISA-L (`isal`), then zlib-ng (`zlib-ng`), then
+    the standard library
+    """
+    if _is_package_available("isal"):
+        from isal import isal_zlib
+
+        return isal_zlib
+    if _is_package_available("zlib_ng"):
+        from zlib_ng import zlib_ng
+
+        return zlib_ng
+    return zlib
+
+
+class ParallelGzipReader(io.RawIOBase):
+    """Decompresses multi-member gzip files (BGZF files, Common Crawl WARC files with one member per record, files
+        compressed with `pigz --independent`, etc) by decompressing several members at the same time in threads (zlib,
+        ISA-L and zlib-ng release the GIL while decompressing).
+
+        The compressed data is read in blocks of `block_size` bytes. Members are located by looking for the bytes that
+        start every gzip member, and each (possible) member of the block is decompressed in parallel. Those bytes may
+        also appear inside compressed data: a possible member is only kept if it starts where the previous one ended
+        and decompresses to the end of a gzip member exactly where the next possible member starts. Otherwise the
+        member is decompressed sequentially, as would a regular gzip reader, so single-member files (and members larger
+        than `block_size`) are still read correctly, just without the speedup.
+
+    Args:
+        file: the compressed binary file
+        threads: number of decompression threads
+        block_size: number of compressed bytes read at a time
+    """
+
+    def __init__(self, file: BinaryIO, threads: int = 4, block_size: int = 2**22):
+        super().__init__()
+        self.file = file
+        self.block_size = block_size
+        self._zlib = get_inflate_module()
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="datatrove-gunzip") if threads > 1 else None
+        # decompressed data not read yet
+        self._output: deque[memoryview] = deque()
+        # compressed data not decompressed yet, starting at the start of a member
+        self._data = b""
+        # decompressor of a member that continues in the next blocks
+        self._member = None
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _inflate_member(self, data: bytes) -> bytes | None:
+        # decompressed member if `data` is exactly one gzip member
+        try:
+            decompressor = self._zlib.decompressobj(31)
+            output = decompressor.decompress(data)
+        except Exception:
+            return None
+        return output if decompressor.eof and not decompressor.unused_data else None
+
+    def _emit(self, output: bytes):
+        # empty reads mean the end of the file
+        if output:
+            self._output.append(memoryview(output))
+
+    def _stream_member(self, data: bytes) -> int:
+        # decompresses the member at the start of `data`. Returns the number of bytes of `data` it used
+        if self._member is None:
+            self._member = self._zlib.decompressobj(31)
+        self._emit(self._member.decompress(data))
+        if not self._member.eof:
+            return len(data)
+        used = len(data) - len(self._member.unused_data)
+        self._member = None
+        return used
+
+    def _decompress(self, final: bool):
+        # `_data` starts after a member: zeros are padding
+        data = self._data.lstrip(b"\x00")
+        starts = [match.start() for match in GZIP_MEMBER_START.finditer(data)]
+        if data and (not starts or starts[0] > 0):
+            # garbage: decompressed sequentially, which raises the usual errors
+            starts.insert(0, 0)
+        # the last possible member is only complete at the end of the file
+        members = list(zip(starts, starts[1:] + ([len(data)] if final else [])))
+        view = memoryview(data)
+        if self._pool is not None and len(members) > 1:
+            outputs = self._pool.map(lambda member: self._inflate_member(view[member[0] : member[1]]), members)
+        else:
+            outputs = (None for _ in members)
+        position = 0
+        for (start, end), output in zip(members, outputs):
+            if self._member is None:
+                if start > position and not data[position:start].strip(b"\x00"):
+                    # gzip files can be padded with zeros after each member
+                    position = start
+                if start == position and output is not None:
+                    self._emit(output)
+                    position = end
+                    continue
+            # decompressed sequentially, one possible member at a time so that each call only copies its unused data
+            position += self._stream_member(view[position:end])
+        if self._member is not None:
+            # the member continues in the last (open) possible member
+            position += self._stream_member(view[position:])
+        self._data = data[position:]
+        if self._member is None and (final or len(self._data) > self.block_size):
+            # a member larger than a block: decompressed sequentially instead of searching it again in each block.
+            # Zeros after a member are padding
+            data = self._data.lstrip(b"\x00")
+            while data and self._member is None:
+                data = data[self._stream_member(data) :].lstrip(b"\x00")
+            self._data = data
+
+    def _fill(self):
+        chunk = self.file.read(self.block_size)
+        final = not chunk
+        if self._member is not None:
+            chunk = chunk[self._stream_member(chunk) :] if chunk else b""
+            if final and self._member is not None:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            if self._member is not None:
+                return
+        self._data += chunk
+        if self._data:
+            self._decompress(final)
+        if final:
+            if self._member is not None:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            self._eof = True
+
+    def readinto(self, buffer) -> int:
+        while not self._output and not self._eof:
+            self._fill()
+        if not self._output:
+            return 0
+        output = self._output[0]
+        n = min(len(buffer), len(output))
+        buffer[:n] = output[:n]
+        if n == len(output):
+            self._output.popleft()
+        else:
+            self._output[0] = output[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+            self._output.clear()
+            self.file.close()
+        super().close()
+
+
+def open_decompressed(file: BinaryIO, compression: str, backend: str = "auto", threads: int = 1) -> BinaryIO:
+    """
+        Wraps a compressed binary file to read its decompressed content.
+        gzip backends:
+            - "python": the standard library's `gzip` module
+            - "isal": ISA-L's igzip (`pip install isal`), several times faster
+            - "zlib-ng": zlib-ng (`pip install zlib-ng`)
+            - "parallel": decompresses the members of multi-member gzip files in `threads` threads (see
+              ParallelGzipReader), with the fastest installed implementation of zlib
+        zstd backends:
+            - "zstandard": `pip install zstandard`
+        "auto" picks "parallel" when `threads` > 1 and otherwise the fastest installed backend. Other compressions are
+        decompressed by fsspec
+    Args:
+        file: the compressed file
+        compression: "gzip", "zstd", or any other compression supported by fsspec
+        backend: one of the backends of the compression (see DECOMPRESSION_BACKENDS), or "auto"
+        threads: number of decompression threads (for the "parallel" backend)
+
+    Returns: a readable binary file
+
+    """
+    backends = DECOMPRESSION_BACKENDS.get(compression)
+    if backends is None:
+        if compression not in compr:
+            raise ValueError(f"Compression type {compression} not supported")
+        return compr[compression](file, mode="r")
+    if backend == "auto":
+        if compression == "gzip":
+            backend = (
+                "parallel"
+                if threads > 1
+                else "isal"
+                if _is_package_available("isal")
+                else "zlib-ng"
+                if _is_package_available("zlib_ng")
+                else "python"
+            )
+        else:
+            backend = backends[0]
+    if backend not in backends:
+        raise ValueError(
+            f"Unknown {compression} decompression backend {backend}. Options: auto, {', '.join(backends)}"
+        )
+    if backend == "python":
+        return compr["gzip"](file, mode="r")
+    if backend == "isal":
+        check_required_dependencies("the isal gzip backend", ["isal"])
+        from isal import igzip
+
+        return igzip.IGzipFile(fileobj=file, mode="rb")
+    if backend == "zlib-ng":
+        check_required_dependencies("the zlib-ng gzip backend", [("zlib_ng", "zlib-ng")])
+        from zlib_ng import gzip_ng
+
+        return gzip_ng.GzipNGFile(fileobj=file, mode="rb")
+    if backend == "parallel":
+        return io.BufferedReader(ParallelGzipReader(file, threads=threads), buffer_size=2**20)
+    check_required_dependencies("the zstandard zstd backend", ["zstandard"])
+    import zstandard
+
+    # zstd frames are decompressed sequentially: multi-threading only applies to compression
+    return io.BufferedReader(
+        zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True, closefd=True), buffer_size=2**20
+    )
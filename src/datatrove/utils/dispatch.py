@@ -0,0 +1,182 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+from typing import Callable, Iterator
+
+from datatrove.io import DataFolder
+from datatrove.utils.logging import get_random_str, logger
+
+
+class RankDispatcher:
+    """Lets several executors (on different nodes, or several processes of the same node) sharing a `logging_dir` claim
+        the ranks to run dynamically, instead of each running a fixed range of ranks: fast nodes take more ranks, and
+        the ranks of nodes that died are run again by the others.
+        A rank is claimed with a lease file, `leases/{rank:05d}.{node_id}`, that its owner renews while it runs the
+        rank. Leases that were not renewed for `lease_timeout` seconds are ignored, so their rank can be claimed again.
+        Only listing, reading, writing and deleting files is needed, so that any fsspec filesystem can be used. To
+        claim a rank, a node writes its lease if there is no valid one, waits `claim_delay` seconds and lists the
+        leases of the rank again: if several nodes claimed it at the same time, the one with the smallest node id
+        keeps it and the others remove their lease. `claim_delay` must be longer than the time it takes for a written
+        file to be visible to the other nodes, and the clocks of the nodes should be synchronized (to well under
+        `lease_timeout`).
+
+    Args:
+        logging_dir: the executor's logging folder
+        world_size: total number of ranks
+        get_incomplete_ranks: returns the ranks that are not completed yet (see `PipelineExecutor.get_incomplete_ranks`)
+        lease_timeout: seconds after which a lease that was not renewed expires. Leases are renewed every
+            `lease_timeout / 4` seconds
+        claim_delay: seconds to wait after writing a lease before checking that no other node claimed the same rank
+        node_id: unique id of this dispatcher. Defaults to `{hostname}-{pid}-{random string}`
+    """
+
+    def __init__(
+        self,
+        logging_dir: DataFolder,
+        world_size: int,
+        get_incomplete_ranks: Callable[[], list[int]],
+        lease_timeout: float = 600,
+        claim_delay: float = 1.0,
+        node_id: str | None = None,
+    ):
+        self.logging_dir = logging_dir
+        self.world_size = world_size
+        self.get_incomplete_ranks = get_incomplete_ranks
+        self.lease_timeout = lease_timeout
+        self.claim_delay = claim_delay
+        # node ids can not contain dots, which separate the rank from the node id in lease file names
+        self.node_id = (node_id or f"{socket.gethostname()}-{os.getpid()}-{get_random_str()}").replace(".", "-")
+        self._held: set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._renew_thread: threading.Thread | None = None
+
+    def _lease_file(self, rank: int) -> str:
+        return f"leases/{rank:05d}.{self.node_id}"
+
+    def _write_lease(self, rank: int):
+        with self.logging_dir.open(self._lease_file(rank), "wt") as f:
+            json.dump({"node": self.node_id, "expires": time.time() + self.lease_timeout}, f)
+
+    def _is_lease_valid(self, path: str) -> bool:
+        try:
+            with self.logging_dir.open(path, "rt") as f:
+                return json.load(f)["expires"] > time.time()
+        except FileNotFoundError:
+            return False
+        except (ValueError, KeyError):
+            # being written, or the node died while writing it
+            try:
+                return self.logging_dir.modified(path).timestamp() + self.lease_timeout > time.time()
+            except (NotImplementedError, FileNotFoundError):
+                return True
+
+    def _list_leases(self, rank: int | None = None) -> dict[int, list[str]]:
+        """
+            Lists the lease files, of all ranks or of a single rank
+        Returns: dictionary {rank: [lease file paths]}
+
+        """
+        # make sure that files written by other nodes are seen
+        self.logging_dir.fs.invalidate_cache()
+        if not self.logging_dir.isdir("leases"):
+            return {}
+        leases = {}
+        for path in self.logging_dir.list_files(
+            "leases", recursive=False, glob_pattern=f"{rank:05d}.*" if rank is not None else None
+        ):
+            lease_rank, _, node_id = os.path.basename(path).partition(".")
+            if lease_rank.isdigit() and node_id and not node_id.endswith(".tmp"):
+                leases.setdefault(int(lease_rank), []).append(path)
+        return leases
+
+    def _valid_lease_nodes(self, paths: list[str]) -> list[str]:
+        return [os.path.basename(path).partition(".")[2] for path in paths if self._is_lease_valid(path)]
+
+    def claim(self, rank: int) -> bool:
+        """
+            Tries to claim a rank
+        Args:
+            rank: the rank to claim
+
+        Returns: whether this node now holds the lease of this rank
+
+        """
+        if self._valid_lease_nodes(self._list_leases(rank).get(rank, [])):
+            return False
+        self._write_lease(rank)
+        time.sleep(self.claim_delay)
+        nodes = self._valid_lease_nodes(self._list_leases(rank).get(rank, []))
+        if min(nodes, default=self.node_id) != self.node_id:
+            # another node claimed it at the same time
+            self.logging_dir.rm_file(self._lease_file(rank))
+            return False
+        with self._lock:
+            self._held.add(rank)
+        return True
+
+    def release(self, rank: int):
+        """
+            Releases the lease of a rank, once it was run (or failed)
+        Args:
+            rank: a rank claimed by this node
+
+        Returns:
+
+        """
+        with self._lock:
+            self._held.discard(rank)
+        try:
+            self.logging_dir.rm_file(self._lease_file(rank))
+        except FileNotFoundError:
+            pass
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_timeout / 4):
+            with self._lock:
+                for rank in self._held:
+                    try:
+                        self._write_lease(rank)
+                    except Exception as e:
+                        logger.warning(f"Could not renew the lease of {rank=}: {e}")
+
+    def ranks(self) -> Iterator[int]:
+        """
+            Claims and yields incomplete ranks until every rank is completed. The lease of the last yielded rank is
+            renewed until the next one is requested, when it is released. Ranks that are held by other nodes are only
+            claimed once their lease expires, so this waits for the other nodes to finish their ranks.
+        Returns: generator of claimed ranks
+
+        """
+        self._stop.clear()
+        self._renew_thread = threading.Thread(target=self._renew_leases, daemon=True)
+        self._renew_thread.start()
+        # different nodes go through the ranks in a different order, so that they rarely try to claim the same rank
+        order = list(range(self.world_size))
+        random.Random(self.node_id).shuffle(order)
+        try:
+            while incomplete := set(self.get_incomplete_ranks()):
+                leases = self._list_leases()
+                claimed = False
+                for rank in order:
+                    if rank not in incomplete or self._valid_lease_nodes(leases.get(rank, [])):
+                        continue
+                    if self.claim(rank):
+                        claimed = True
+                        try:
+                            yield rank
+                        finally:
+                            self.release(rank)
+                        break
+                if not claimed:
+                    logger.info(
+                        f"{len(incomplete)} incomplete tasks are held by other nodes, waiting for them to complete "
+                        f"or for their lease to expire..."
+                    )
+                    time.sleep(self.lease_timeout / 4)
+        finally:
+            self._stop.set()
+            self._renew_thread.join()
@@ -0,0 +1,356 @@
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+from copy import deepcopy
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING
+
+import humanize
+import multiprocess
+
+from datatrove.io import DataFolder, OutputFileManager, assign_files_by_size, get_datafolder
+from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.readers.base import BaseDiskReader
+from datatrove.pipeline.writers.disk_base import DiskWriter
+from datatrove.utils.logging import logger
+from datatrove.utils.stats import MAXRSS_UNIT, PipelineStats, get_pipeline_stats, resource
+from datatrove.utils.typeshelper import StatHints
+
+
+if TYPE_CHECKING:
+    from datatrove.executor.base import PipelineExecutor
+
+# data folders written to by pipeline steps other than writers (whose data folders are all outputs)
+OUTPUT_FOLDER_ATTRIBUTES = ("output_folder", "local_working_dir")
+
+
+@dataclass
+class StepEstimate:
+    """Projected cost of a pipeline step over the whole input (all tasks)
+
+    Args:
+        name: name of the step
+        seconds: time spent in this step
+        cpu_seconds: cpu time (user + system) spent in this step
+        read_bytes: bytes read through the step's data folders
+        written_bytes: bytes written through the step's data folders
+        drop_rate: fraction of the documents dropped by this step (filters only)
+        peak_rss_increase: increase of the peak memory of a task caused by this step, for the recommended number of
+            tasks
+    """
+
+    name: str
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    read_bytes: int = 0
+    written_bytes: int = 0
+    drop_rate: float | None = None
+    peak_rss_increase: int = 0
+
+
+@dataclass
+class PipelinePlan:
+    """Result of `PipelineExecutor.plan`: what was measured on the sample and what is projected for the whole job
+
+    Args:
+        total_files: number of input files of the reader (0 if the pipeline has no reader)
+        total_bytes: total size of the input files
+        sample_files: number of input files the pipeline was run on
+        sample_bytes: total size of the sampled files
+        sampled_ranks: ranks that were run, for pipelines without a reader (e.g. the later stages of deduplication)
+        sample_seconds: wall time of the sample run(s)
+        steps: projected cost of each step
+        tasks: recommended number of tasks
+        workers: recommended number of tasks to run at once (-1 for no limit)
+        cpus_per_task: cpus per task used for the recommendation
+        mem_per_cpu_gb: recommended memory per cpu, in GB
+        wall_seconds_per_task: projected wall time of the longest task, with the recommended number of tasks
+        peak_memory_per_task: projected peak memory (RSS) of a task, in bytes, with the recommended number of tasks
+        cpu_hours: projected total cpu time of the job, in hours
+        configured_tasks: number of tasks the executor is currently configured with
+        configured_wall_seconds_per_task: projected wall time of the longest task with `configured_tasks`
+        configured_peak_memory_per_task: projected peak memory of a task with `configured_tasks`
+    """
+
+    total_files: int = 0
+    total_bytes: int = 0
+    sample_files: int = 0
+    sample_bytes: int = 0
+    sampled_ranks: list[int] = field(default_factory=list)
+    sample_seconds: float = 0.0
+    steps: list[StepEstimate] = field(default_factory=list)
+    tasks: int = 1
+    workers: int = -1
+    cpus_per_task: int = 1
+    mem_per_cpu_gb: int = 1
+    wall_seconds_per_task: float = 0.0
+    peak_memory_per_task: int = 0
+    cpu_hours: float = 0.0
+    configured_tasks: int = 1
+    configured_wall_seconds_per_task: float = 0.0
+    configured_peak_memory_per_task: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def __repr__(self):
+        if self.sampled_ranks:
+            sample = f"ranks {self.sampled_ranks} of {self.configured_tasks}"
+        else:
+            sample = (
+                f"{self.sample_files}/{self.total_files} files ({humanize.naturalsize(self.sample_bytes)} of "
+                f"{humanize.naturalsize(self.total_bytes)})"
+            )
+        lines = [f"📐 Plan based on {sample}, run in {humanize.precisedelta(self.sample_seconds)}", ""]
+        for step in self.steps:
+            lines.append(
+                f"{step.name}\n    time: {humanize.precisedelta(step.seconds)}, cpu: {humanize.precisedelta(step.cpu_seconds)}"
+                + (f", read: {humanize.naturalsize(step.read_bytes)}" if step.read_bytes else "")
+                + (f", written: {humanize.naturalsize(step.written_bytes)}" if step.written_bytes else "")
+                + (f", dropped: {step.drop_rate:.1%}" if step.drop_rate is not None else "")
+                + (f", memory: +{humanize.naturalsize(step.peak_rss_increase)}" if step.peak_rss_increase else "")
+            )
+        lines += [
+            "",
+            f"Total cpu time: {self.cpu_hours:.2f} cpu-hours",
+            f"Configured ({self.configured_tasks} tasks): "
+            f"{humanize.precisedelta(self.configured_wall_seconds_per_task)} and "
+            f"{humanize.naturalsize(self.configured_peak_memory_per_task)} per task",
+            f"Recommended: tasks={self.tasks}, workers={self.workers}, mem_per_cpu_gb={self.mem_per_cpu_gb} "
+            f"(cpus_per_task={self.cpus_per_task}): {humanize.precisedelta(self.wall_seconds_per_task)} and "
+            f"{humanize.naturalsize(self.peak_memory_per_task)} per task",
+        ]
+        return "\n".join(lines)
+
+
+def _get_steps(pipeline: list) -> list[PipelineStep]:
+    """
+    The pipeline steps (including those wrapped by other steps and those used by a step, such as exclusion writers)
+    """
+    steps = []
+    for pipeline_step in pipeline:
+        if isinstance(pipeline_step, PipelineStep):
+            steps.append(pipeline_step)
+            steps.extend(value for value in vars(pipeline_step).values() if isinstance(value, PipelineStep))
+        if isinstance(getattr(pipeline_step, "pipeline", None), list):
+            steps.extend(_get_steps(pipeline_step.pipeline))
+    return steps
+
+
+def _redirect_outputs(pipeline: list, output_dir: str):
+    """
+    Replaces the data folders the pipeline writes to (all the data folders of writers, and the
+    `OUTPUT_FOLDER_ATTRIBUTES` of other steps) with empty local folders, so that the sample runs have no side effects
+    """
+    for si, step in enumerate(_get_steps(pipeline)):
+        for name, value in list(vars(step).items()):
+            if not isinstance(value, DataFolder) or not (
+                isinstance(step, DiskWriter) or name in OUTPUT_FOLDER_ATTRIBUTES
+            ):
+                continue
+            folder = get_datafolder(os.path.join(output_dir, f"{si:03d}_{name}"))
+            setattr(step, name, folder)
+            for other_name, other in list(vars(step).items()):
+                if isinstance(other, OutputFileManager) and other.fs is value:
+                    setattr(
+                        step,
+                        other_name,
+                        folder.get_output_file_manager(mode=other.mode, compression=other.compression),
+                    )
+
+
+def _get_peak_rss() -> int:
+    # not available on windows
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT if resource else 0
+
+
+def _run_sample(executor: "PipelineExecutor", rank: int) -> tuple[PipelineStats, float, int, int]:
+    """
+    Runs a task and returns its stats, wall time, and the memory (RSS) of the process before and at its peak
+    """
+    start_rss = _get_peak_rss()
+    start = time.perf_counter()
+    # local_rank != 0: do not print the logs of the task to the console
+    stats = executor._run_for_rank(rank, local_rank=1)
+    return stats, time.perf_counter() - start, start_rss, _get_peak_rss()
+
+
+def _max_shard_bytes(file_sizes: dict[str, int], tasks: int, by_size: bool) -> int:
+    """
+    Total size of the largest shard when the files are split into `tasks` shards (as `DataFolder.get_shard` would)
+    """
+    if by_size:
+        shards = assign_files_by_size(file_sizes, tasks)
+    else:
+        paths = sorted(file_sizes)
+        shards = [paths[rank::tasks] for rank in range(min(tasks, len(paths)))]
+    return max(sum(file_sizes[path] for path in shard) for shard in shards)
+
+
+def plan_pipeline(
+    executor: "PipelineExecutor",
+    sample_files: int = 5,
+    sample_tasks: int = 2,
+    target_task_hours: float = 2.0,
+    memory_headroom: float = 1.25,
+    seed: int = 0,
+    tmp_dir: str | None = None,
+) -> PipelinePlan:
+    """
+        Dry run of a pipeline: runs it on a small random sample of the input files of its reader (in a separate process,
+        with the outputs redirected to a temporary folder), measures the time, cpu time, memory, bytes read/written and
+        drop rate of each step, and extrapolates them to the whole input from the total size of the files. Pipelines
+        without a reader (e.g. `MinhashDedupBuckets` or `SentenceFindDedups`) are planned by running `sample_tasks`
+        random tasks instead.
+        The memory of steps that keep data proportional to their input (see `PipelineStep.memory_grows_with_input`,
+        e.g. `MinhashDedupSignature` or `SentenceDedupSignature`) is extrapolated to the largest shard, the memory of
+        the other steps is assumed to be constant.
+    Args:
+        executor: the executor to plan
+        sample_files: number of input files to run the pipeline on
+        sample_tasks: number of tasks to run, for pipelines without a reader
+        target_task_hours: the recommended number of tasks is the smallest for which each task takes less than this
+        memory_headroom: multiplier applied to the projected peak memory for the recommended memory
+        seed: seed used to sample the files or tasks
+        tmp_dir: where to save the outputs and logs of the sample runs. By default, a temporary folder that is deleted
+            at the end
+
+    Returns: the plan (printing it shows a summary)
+
+    """
+    from datatrove.executor.local import LocalPipelineExecutor
+
+    rng = random.Random(seed)
+    remove_tmp_dir = tmp_dir is None
+    tmp_dir = tmp_dir or tempfile.mkdtemp(prefix="datatrove-plan-")
+    pipeline = deepcopy(executor.pipeline)
+    _redirect_outputs(pipeline, os.path.join(tmp_dir, "outputs"))
+    readers = [step for step in pipeline if isinstance(step, BaseDiskReader)]
+    plan = PipelinePlan(cpus_per_task=getattr(executor, "cpus_per_task", 1), configured_tasks=executor.world_size)
+
+    if readers:
+        reader = readers[0]
+        files = reader.data_folder.list_files(
+            recursive=reader.recursive, glob_pattern=reader.glob_pattern, detail=True
+        )
+        if not files:
+            raise RuntimeError(f"No files found on {reader.data_folder.path}!")
+        file_sizes = {path: info.get("size") or 0 for path, info in files.items()}
+        sample = sorted(rng.sample(sorted(files), min(sample_files, len(files))))
+        plan.total_files, plan.total_bytes = len(files), sum(file_sizes.values())
+        plan.sample_files, plan.sample_bytes = len(sample), sum(file_sizes[path] for path in sample)
+        # the sample task reads the sampled files from a file manifest that only lists them
+        reader.data_folder.listings_folder = get_datafolder(os.path.join(tmp_dir, "logs", "listings"))
+        reader.data_folder._save_listing(
+            reader.data_folder._get_listing_file(
+                "manifests",
+                "json.gz",
+                subdirectory="",
+                recursive=reader.recursive,
+                glob_pattern=reader.glob_pattern,
+                include_directories=False,
+            ),
+            [[path, files[path].get("size"), files[path].get("ETag", files[path].get("etag"))] for path in sample],
+            compression="gzip",
+        )
+        sample_executor = LocalPipelineExecutor(
+            pipeline,
+            tasks=1,
+            workers=1,
+            logging_dir=os.path.join(tmp_dir, "logs"),
+            skip_completed=False,
+            file_manifest=True,
+            fast_stats=executor.fast_stats,
+        )
+        ranks = [0]
+    else:
+        ranks = sorted(rng.sample(range(executor.world_size), min(sample_tasks, executor.world_size)))
+        plan.sampled_ranks = ranks
+        sample_executor = LocalPipelineExecutor(
+            pipeline,
+            tasks=executor.world_size,
+            workers=1,
+            logging_dir=os.path.join(tmp_dir, "logs"),
+            skip_completed=False,
+            fast_stats=executor.fast_stats,
+        )
+
+    logger.info(f"Planning: running the pipeline on {f'{len(sample)} sampled files' if readers else f'ranks {ranks}'}")
+    # a fresh process for each task, so that its peak memory is not affected by previous runs
+    ctx = multiprocess.get_context("forkserver")
+    runs = []
+    try:
+        for rank in ranks:
+            with ctx.Pool(1) as pool:
+                runs.append(pool.apply(_run_sample, (sample_executor, rank)))
+    finally:
+        if remove_tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    stats = sum((run[0] for run in runs), start=PipelineStats())
+    plan.sample_seconds = sum(run[1] for run in runs)
+    start_rss = max(run[2] for run in runs)
+    sample_peak = max(run[3] for run in runs)
+
+    # how much each sampled quantity should be multiplied by to cover the whole input
+    if readers:
+        scale = plan.total_bytes / plan.sample_bytes if plan.sample_bytes else plan.total_files / plan.sample_files
+    else:
+        scale = executor.world_size / len(ranks)
+    growing = {id(step.stats) for step in _get_steps(pipeline) if step.memory_grows_with_input}
+    grows = [id(stat) in growing for stat in get_pipeline_stats(pipeline)]
+
+    def project(tasks: int) -> tuple[float, int, float]:
+        """wall time of the longest task, its peak memory and by how much the memory of growing steps increases"""
+        if not readers:
+            return max(run[1] for run in runs), sample_peak, 1.0
+        max_shard = _max_shard_bytes(file_sizes, tasks, reader.shard_by_size)
+        ratio = max_shard / plan.sample_bytes if plan.sample_bytes else 1.0
+        growth = sum(stat.resource_stats.peak_rss_increase for stat, grows_ in zip(stats.stats, grows) if grows_) * (
+            ratio - 1
+        )
+        return plan.sample_seconds * ratio, max(start_rss, int(sample_peak + growth)), ratio
+
+    for stat, grows_ in zip(stats.stats, grows):
+        resources = stat.resource_stats
+        dropped, forwarded = (
+            stat.stats[key].total if key in stat.stats else 0 for key in (StatHints.dropped, StatHints.forwarded)
+        )
+        plan.steps.append(
+            StepEstimate(
+                name=stat.name,
+                seconds=stat.time_stats.total * scale,
+                cpu_seconds=(resources.cpu_user + resources.cpu_sys) * scale,
+                read_bytes=int(resources.read_bytes * scale),
+                written_bytes=int(resources.written_bytes * scale),
+                drop_rate=dropped / (dropped + forwarded) if dropped + forwarded else None,
+                peak_rss_increase=resources.peak_rss_increase,
+            )
+        )
+    plan.cpu_hours = sum(step.cpu_seconds or step.seconds for step in plan.steps) / 3600
+
+    plan.configured_wall_seconds_per_task, plan.configured_peak_memory_per_task, _ = project(executor.world_size)
+    # smallest number of tasks whose longest task fits in the target (tasks can not outnumber the input files)
+    if readers:
+        tasks = max(1, min(plan.total_files, math.ceil(plan.sample_seconds * scale / (target_task_hours * 3600))))
+        while tasks < plan.total_files and project(tasks)[0] > target_task_hours * 3600:
+            tasks = min(plan.total_files, max(tasks + 1, int(tasks * 1.1)))
+    else:
+        tasks = executor.world_size
+    plan.tasks = tasks
+    plan.wall_seconds_per_task, plan.peak_memory_per_task, ratio = project(tasks)
+    for step, grows_ in zip(plan.steps, grows):
+        if grows_:
+            step.peak_rss_increase = int(step.peak_rss_increase * ratio)
+    memory_gb = plan.peak_memory_per_task * memory_headroom / 2**30
+    plan.mem_per_cpu_gb = max(1, math.ceil(memory_gb / plan.cpus_per_task))
+    if isinstance(executor, LocalPipelineExecutor):
+        # as many tasks as this machine's cpus and memory allow
+        total_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        plan.workers = max(
+            1,
+            min(tasks, (os.cpu_count() or 1) // plan.cpus_per_task, int(total_memory / 2**30 // max(memory_gb, 1e-9))),
+        )
+    return plan
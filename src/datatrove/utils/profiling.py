@@ -0,0 +1,146 @@
+import os
+import sys
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+from typing import IO, Iterable
+
+from datatrove.io import DataFolder
+from datatrove.pipeline.base import PipelineStep
+from datatrove.utils.logging import logger
+
+
+class SamplingProfiler:
+    """Low overhead statistical profiler. A background thread samples the call stack of the profiled thread every
+        `interval` seconds. Each sample is attributed to the innermost PipelineStep being executed: pipelines are
+        chains of generators, so the stack of a step also contains the steps that consume its documents.
+        Samples are saved as "collapsed stacks" (one "step;frame;...;frame count" line per unique stack), which can be
+        turned into a flamegraph by flamegraph.pl or loaded directly in speedscope.
+
+    Args:
+        interval: time between samples, in seconds
+        pipeline: the pipeline being profiled. Custom functions in the pipeline are attributed their own samples
+    """
+
+    def __init__(self, interval: float = 0.01, pipeline: list | None = None):
+        self.interval = interval
+        self._function_steps = {
+            step.__code__: step.__name__.replace(";", ",") for step in pipeline or [] if hasattr(step, "__code__")
+        }
+        self.samples: Counter[str] = Counter()
+        self._thread_id: int | None = None
+        self._sampler: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._frame_labels: dict[CodeType, str] = {}
+
+    def start(self):
+        """
+        Starts sampling the current thread
+        """
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="datatrove-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """
+        Stops sampling
+        """
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    def _get_frame_label(self, code: CodeType) -> str:
+        if code not in self._frame_labels:
+            self._frame_labels[code] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+            )
+        return self._frame_labels[code]
+
+    def _collapse(self, frame: FrameType) -> str:
+        """
+            Builds the collapsed stack of a sample: the innermost pipeline step, followed by the frames of this step
+            (outermost first)
+        Args:
+            frame: innermost frame of the profiled thread
+
+        Returns: the collapsed stack
+
+        """
+        frames = []
+        step, step_depth = None, 0
+        while frame is not None:
+            code = frame.f_code
+            frames.append(code)
+            owner = None
+            if code in self._function_steps:
+                owner = code
+            # only look at the locals of methods
+            elif code.co_argcount and code.co_varnames[0] == "self":
+                if isinstance(obj := frame.f_locals.get("self"), PipelineStep):
+                    owner = obj
+            if owner is not None:
+                if step is None:
+                    step = owner
+                if owner is step:
+                    step_depth = len(frames)
+            frame = frame.f_back
+        if step is None:
+            root = "[no step]"
+        else:
+            root = self._function_steps[step] if isinstance(step, CodeType) else str(step).replace(";", ",")
+            # drop the frames of the steps (and executor) that are consuming documents from this one
+            frames = frames[:step_depth]
+        return ";".join([root, *(self._get_frame_label(code) for code in reversed(frames))])
+
+    def save(self, file: IO):
+        """
+            Writes the collapsed stacks to a file, most frequent first
+        Args:
+            file: file opened in text mode
+
+        Returns:
+
+        """
+        save_collapsed_stacks(self.samples, file)
+
+
+def save_collapsed_stacks(samples: Counter, file: IO):
+    for stack, count in samples.most_common():
+        file.write(f"{stack} {count}\n")
+
+
+def load_collapsed_stacks(lines: Iterable[str]) -> Counter:
+    samples = Counter()
+    for line in lines:
+        stack, _, count = line.rstrip("\n").rpartition(" ")
+        if stack:
+            samples[stack] += int(count)
+    return samples
+
+
+def merge_profiles(profiles_folder: DataFolder, output_file: IO):
+    """
+    Sums the collapsed stacks of all the tasks in `profiles_folder` and writes them to `output_file`
+    """
+    merged = Counter()
+    profile_files = profiles_folder.list_files(glob_pattern="*.collapsed")
+    for filename in profile_files:
+        with profiles_folder.open(filename, "rt") as f:
+            merged.update(load_collapsed_stacks(f))
+    save_collapsed_stacks(merged, output_file)
+    logger.info(f"Merged {len(profile_files)} profiles ({merged.total()} samples).")
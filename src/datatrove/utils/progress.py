@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+from typing import IO
+
+from datatrove.io import DataFolder
+from datatrove.utils.logging import logger
+from datatrove.utils.stats import get_pipeline_stats
+
+
+class ProgressReporter:
+    """Periodically saves a snapshot of the stats of a running task to `logging_dir/progress/{rank:05d}.json`, so
+        that the throughput of a job can be monitored while it runs (see the `jobs_status` command). Each snapshot is a
+        json record with the totals of each step's stats and timing since the task started, as well as the number of
+        input files read so far. The file is replaced with the last two snapshots (enough to compute the throughput)
+        every time, so that it does not grow with the duration of the task, and appends (which rewrite the whole
+        object on object storage) are not needed.
+        The snapshots are taken by a background thread and only read counters, so they do not slow the pipeline down.
+
+    Args:
+        pipeline: the pipeline being run
+        logging_dir: the executor's logging folder
+        rank: rank of the current task
+        interval: time between snapshots, in seconds
+        prometheus_dir: optional local folder (for example the textfile directory of a prometheus node exporter) where
+            the last snapshot is also saved, in the prometheus text format, to `datatrove_{rank:05d}.prom`
+    """
+
+    def __init__(
+        self,
+        pipeline: list,
+        logging_dir: DataFolder,
+        rank: int,
+        interval: float = 60,
+        prometheus_dir: str | None = None,
+    ):
+        self.pipeline = pipeline
+        self.logging_dir = logging_dir
+        self.rank = rank
+        self.interval = interval
+        self.prometheus_dir = prometheus_dir
+        self.start_time = time.time()
+        # last snapshot saved
+        self._last_record: dict | None = None
+        self._reporter: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        Starts taking snapshots in the background
+        """
+        self.start_time = time.time()
+        self._last_record = None
+        self._stop.clear()
+        self._reporter = threading.Thread(target=self._report, name="datatrove-progress", daemon=True)
+        self._reporter.start()
+
+    def stop(self, done: bool = False):
+        """
+            Stops taking snapshots and saves a final one. Does nothing if already stopped
+        Args:
+            done: whether the task was completed
+
+        Returns:
+
+        """
+        if self._reporter is None:
+            return
+        self._stop.set()
+        self._reporter.join()
+        self._reporter = None
+        self.flush(done)
+
+    def _report(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # monitoring should never make a task fail
+                logger.warning(f"Could not save progress of {self.rank=}: {e}")
+
+    def get_record(self, done: bool = False) -> dict:
+        """
+            Builds a snapshot of the stats of each pipeline step
+        Args:
+            done: whether the task was completed
+
+        Returns: a json serializable dictionary
+
+        """
+        files_read = files_total = None
+        for pipeline_step in self.pipeline:
+            if (n_files := getattr(pipeline_step, "shard_size", None)) is not None:
+                files_total = (files_total or 0) + n_files
+                # `stats["input_files"]` would flush the pending updates of fast mode, which only the thread running the
+                # pipeline may do: read the flushed count instead (without creating the key)
+                input_files = dict(pipeline_step.stats.stats).get("input_files")
+                files_read = (files_read or 0) + (input_files.total if input_files else 0)
+        steps = []
+        for stats in get_pipeline_stats(self.pipeline):
+            # the pipeline keeps running: copy the dictionary before iterating on it
+            metrics = dict(stats.stats)
+            steps.append(
+                {
+                    "name": stats.name,
+                    "time": stats.time_stats.total,
+                    "stats": {key: metric.total for key, metric in metrics.items()},
+                    "doc_len_n": metrics["doc_len"].n if "doc_len" in metrics else 0,
+                }
+            )
+        now = time.time()
+        return {
+            "rank": self.rank,
+            "start": self.start_time,
+            "time": now,
+            "done": done,
+            "files_read": files_read,
+            "files_total": files_total,
+            "steps": steps,
+        }
+
+    def flush(self, done: bool = False):
+        """
+            Saves a snapshot to the progress file of this task, along with the previous one (and updates the
+            prometheus file)
+        Args:
+            done: whether the task was completed
+
+        Returns:
+
+        """
+        record = self.get_record(done)
+        records = [self._last_record, record] if self._last_record else [record]
+        progress_file = f"progress/{self.rank:05d}.json"
+        # `jobs_status` could otherwise read a partially written file
+        with self.logging_dir.open(f"{progress_file}.tmp", "wt") as f:
+            json.dump(records, f)
+        self.logging_dir.mv(f"{progress_file}.tmp", progress_file)
+        self._last_record = record
+        if self.prometheus_dir:
+            os.makedirs(self.prometheus_dir, exist_ok=True)
+            filename = os.path.join(self.prometheus_dir, f"datatrove_{self.rank:05d}.prom")
+            # node exporters could otherwise read a partially written file
+            with open(f"{filename}.tmp", "wt") as f:
+                save_prometheus_metrics(record, self.logging_dir.resolve_paths(""), f)
+            os.replace(f"{filename}.tmp", filename)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def save_prometheus_metrics(record: dict, logging_dir: str, file: IO):
+    """
+    Writes a progress record in the prometheus text exposition format
+    """
+    # "job" is reserved for the scraping job in prometheus
+    labels = f'logging_dir="{_escape_label(logging_dir)}",rank="{record["rank"]}"'
+    lines = [
+        "# TYPE datatrove_task_start_time_seconds gauge",
+        f"datatrove_task_start_time_seconds{{{labels}}} {record['start']}",
+        "# TYPE datatrove_task_done gauge",
+        f"datatrove_task_done{{{labels}}} {int(record['done'])}",
+    ]
+    if record["files_total"] is not None:
+        lines += [
+            "# TYPE datatrove_input_files_read gauge",
+            f"datatrove_input_files_read{{{labels}}} {record['files_read']}",
+            "# TYPE datatrove_input_files gauge",
+            f"datatrove_input_files{{{labels}}} {record['files_total']}",
+        ]
+    lines.append("# TYPE datatrove_step_time_seconds_total counter")
+    for step in record["steps"]:
+        step_labels = f'{labels},step="{_escape_label(step["name"])}"'
+        lines.append(f"datatrove_step_time_seconds_total{{{step_labels}}} {step['time']}")
+    lines.append("# TYPE datatrove_step_stat_total counter")
+    for step in record["steps"]:
+        step_labels = f'{labels},step="{_escape_label(step["name"])}"'
+        for stat, value in step["stats"].items():
+            lines.append(f'datatrove_step_stat_total{{{step_labels},stat="{_escape_label(stat)}"}} {value}')
+    file.write("\n".join(lines) + "\n")
+
+
+def read_progress(file: IO) -> list[dict]:
+    """
+    Reads the snapshots (the last one and the one before it, if any) of a progress file
+    """
+    try:
+        return json.load(file)
+    except json.JSONDecodeError:
+        return []
+
+
+def summarize_progress(progress_folder: DataFolder, world_size: int, completed: set[int]) -> dict | None:
+    """
+        Aggregates the progress files of a job
+    Args:
+        progress_folder: the `progress` folder of the job's logging folder
+        world_size: total number of tasks of the job
+        completed: ranks that are already completed
+
+    Returns: a dictionary with the current throughput ("docs_per_second", "chars_per_second") of the running tasks,
+        the share of the total time spent in each step ("time_share"), the fraction of documents dropped by each step
+        ("drop_rate"), the estimated fraction of the job that is done ("progress") and the estimated time left in
+        seconds ("eta"). None if no progress was saved.
+
+    """
+    docs_per_second = chars_per_second = 0.0
+    step_times, step_totals, step_dropped = {}, {}, {}
+    total_time = 0.0
+    start = None
+    running_progress = 0.0
+    n_files = 0
+    for filename in progress_folder.list_files(glob_pattern="*.json"):
+        with progress_folder.open(filename, "rt") as f:
+            records = read_progress(f)
+        if not records:
+            continue
+        n_files += 1
+        last = records[-1]
+        start = min(start, last["start"]) if start is not None else last["start"]
+        total_time += last["time"] - last["start"]
+        for step in last["steps"]:
+            step_times[step["name"]] = step_times.get(step["name"], 0.0) + step["time"]
+            step_totals[step["name"]] = step_totals.get(step["name"], 0) + step["stats"].get("total", 0)
+            step_dropped[step["name"]] = step_dropped.get(step["name"], 0) + step["stats"].get("dropped", 0)
+        if last["done"] or last["rank"] in completed:
+            continue
+        if last["files_total"]:
+            running_progress += min(last["files_read"], last["files_total"]) / last["files_total"]
+        if len(records) == 2 and (elapsed := last["time"] - records[0]["time"]) > 0:
+            # the first step that reports documents is usually the reader
+            for step, previous in zip(last["steps"], records[0]["steps"]):
+                if step["doc_len_n"]:
+                    docs_per_second += (step["doc_len_n"] - previous["doc_len_n"]) / elapsed
+                    chars_per_second += (step["stats"]["doc_len"] - previous["stats"].get("doc_len", 0)) / elapsed
+                    break
+    if not n_files:
+        return None
+    progress = (len(completed) + running_progress) / world_size
+    eta = (time.time() - start) * (1 - progress) / progress if progress > 0 else None
+    return {
+        "docs_per_second": docs_per_second,
+        "chars_per_second": chars_per_second,
+        # time not tracked by any step is mostly spent reading and writing data
+        "time_share": {name: step_time / total_time for name, step_time in step_times.items()} if total_time else {},
+        "drop_rate": {name: step_dropped[name] / step_totals[name] for name in step_totals if step_totals[name]},
+        "progress": progress,
+        "eta": eta,
+    }
@@ -0,0 +1,105 @@
+from typing import MutableMapping
+
+from datatrove.io import DataFolder
+from datatrove.pipeline.base import PipelineStep
+from datatrove.pipeline.writers.disk_base import DiskWriter
+
+
+def get_pipeline_writers(pipeline: list) -> list[DiskWriter]:
+    """
+        Returns the writers of a pipeline, including those used by other steps (e.g. the exclusion_writer of filters)
+        and those of nested pipelines
+    Args:
+        pipeline: list of pipeline steps
+
+    Returns: list of writers
+
+    """
+    writers = []
+    for pipeline_step in pipeline:
+        for writer in [pipeline_step, *getattr(pipeline_step, "__dict__", {}).values()]:
+            if isinstance(writer, DiskWriter) and writer not in writers:
+                writers.append(writer)
+        if isinstance(sub_pipeline := getattr(pipeline_step, "pipeline", None), list):
+            writers.extend(writer for writer in get_pipeline_writers(sub_pipeline) if writer not in writers)
+    return writers
+
+
+def check_speculation_support(pipeline: list):
+    """
+        Raises a ValueError if some step of the pipeline saves outputs that are not written by a writer, as several
+        attempts of the same task would write to the same files, or if a writer publishes its files when they are
+        closed, before the attempt that finished first is known
+    Args:
+        pipeline: list of pipeline steps
+
+    Returns:
+
+    """
+    for writer in get_pipeline_writers(pipeline):
+        if not writer.supports_attempts:
+            raise ValueError(
+                f"{writer} publishes its files when they are closed: speculative execution is not supported"
+            )
+    for pipeline_step in pipeline:
+        if isinstance(sub_pipeline := getattr(pipeline_step, "pipeline", None), list):
+            check_speculation_support(sub_pipeline)
+        if not isinstance(pipeline_step, PipelineStep) or isinstance(pipeline_step, DiskWriter):
+            continue
+        for name, value in pipeline_step.__dict__.items():
+            if "output" in name and isinstance(value, DataFolder):
+                raise ValueError(
+                    f"{pipeline_step} saves its outputs to `{name}`: speculative execution is only supported when "
+                    f"every output is saved by a writer (DiskWriter)"
+                )
+
+
+class SpeculativeAttempt:
+    """One of the (possibly concurrent) attempts of a task with speculative execution.
+        The writers of the pipeline save the files of each attempt to their own temporary folder
+        (`.attempts/{attempt_id}`, see `DiskWriter.attempt`). Once an attempt finished processing its data, `commit`
+        checks that no other attempt of the same task committed before it: the first attempt to finish moves its
+        files to their final location and the others delete theirs.
+
+    Args:
+        attempt_id: unique id of this attempt
+        rank: rank of the task
+        committed: mapping shared by all attempts (e.g. a multiprocessing Manager dict) of {rank: id of the attempt
+            that committed}. `setdefault` must be atomic
+    """
+
+    def __init__(self, attempt_id: str, rank: int, committed: MutableMapping[int, str]):
+        self.attempt_id = attempt_id
+        self.rank = rank
+        self.committed = committed
+        self.writers = []
+
+    def start(self, pipeline: list):
+        """
+            Makes the writers of the pipeline save their files to the temporary folder of this attempt
+        Args:
+            pipeline: list of pipeline steps
+
+        Returns:
+
+        """
+        self.writers = get_pipeline_writers(pipeline)
+        for writer in self.writers:
+            writer.attempt = self.attempt_id
+
+    def commit(self) -> bool:
+        """
+            Called once this attempt processed all its data
+        Returns: True if this attempt was the first to finish and its files were moved to their final location, False
+            if another attempt committed first (the files of this one are then deleted)
+
+        """
+        won = self.committed.setdefault(self.rank, self.attempt_id) == self.attempt_id
+        for writer in self.writers:
+            if won:
+                writer.commit_attempt()
+            else:
+                writer.close()
+                writer.discard_attempt(self.attempt_id)
+            writer.attempt = None
+        return won
@@ -3,16 +3,56 @@ import heapq
 import itertools
 import json
 import math
+import os
+import sys
 import time
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import IO, Callable, TextIO
+from dataclasses import dataclass, field, fields
+from typing import IO, TYPE_CHECKING, Callable, Iterable, Iterator, TextIO
 
 import humanize
 
 
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# ru_maxrss is in kilobytes on linux and in bytes on macos
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+try:
+    import resource
+
+    # cpu usage of the current thread only (linux), so that background threads are not counted
+    RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+except ImportError:  # windows
+    resource = None
+
+# peak memory (ru_maxrss) of this process the last time it was read by a timed block (see
+# `ResourceStats.update_peak_rss`). Forked processes start over
+_last_maxrss: int | None = None
+
+
+def _reset_last_maxrss():
+    global _last_maxrss
+    _last_maxrss = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_last_maxrss)
+
 INDENT = " " * 4
 
+# defaults of the fast stats mode (see `Stats.enable_fast_mode`)
+FAST_STATS_FLUSH_EVERY = 1000
+FAST_STATS_TIME_SAMPLING = 16
+# the cpu time of 1 in this number of timed blocks is measured (two `getrusage` calls per block are noticeable when
+# blocks are single documents), and counted as this number of blocks. The peak memory is read after every block
+RESOURCE_SAMPLING = 16
+
+STARTUP_STATS_NAME = "🚀 Startup"
+# only the first task run by a process pays for its startup
+_startup_measured = False
+
 
 class MetricStatsDict(defaultdict):
     """
@@ -60,8 +100,79 @@ class Stats:
         self.name = name
         self.time_stats = TimingStats()
         self.stats = MetricStatsDict()
+        # fast mode: updates are accumulated and only applied every `flush_every` updates (0 to apply them immediately)
+        self.flush_every = 0
+        self._pending_counts = defaultdict(int)
+        self._pending_values = defaultdict(list)
+        self._pending_units = {}
+        self._n_pending = 0
+
+    def enable_fast_mode(
+        self, flush_every: int = FAST_STATS_FLUSH_EVERY, time_sampling: int = FAST_STATS_TIME_SAMPLING
+    ):
+        """
+            Lowers the overhead of collecting stats in hot loops: `add` only increments a counter (or appends the value
+            to a list), and these pending updates are applied in bulk every `flush_every` updates. Only 1 in
+            `time_sampling` blocks tracked by `time_stats` is timed, and counted as `time_sampling` blocks.
+            Totals are exact once flushed, while the time (and cpu time) is an estimate.
+        Args:
+          flush_every: number of updates to accumulate before applying them
+          time_sampling: time 1 in `time_sampling` blocks
+
+        Returns:
+
+        """
+        self.flush_every = flush_every
+        self.time_stats.sample_every = time_sampling
+
+    def add(self, labels: Iterable[str], value: float = 1, unit: str = None):
+        """
+            Updates the stats of each label with `value` (see `PipelineStep.stat_update`). In fast mode, the update is
+            only applied on the next `flush`
+        Args:
+          labels: names of the stats to update
+          value: float:  (Default value = 1)
+          unit: str:  (Default value = None)
+
+        Returns:
+
+        """
+        if not self.flush_every:
+            for label in labels:
+                self.stats[label].update(value, unit)
+            return
+        if value == 1:
+            for label in labels:
+                self._pending_counts[label] += 1
+        else:
+            for label in labels:
+                self._pending_values[label].append(value)
+        if unit:
+            for label in labels:
+                self._pending_units[label] = unit
+        self._n_pending += 1
+        if self._n_pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Applies the pending updates of the fast mode
+        """
+        if self._n_pending:
+            for label, count in self._pending_counts.items():
+                self.stats[label].update_many(count, self._pending_units.get(label))
+            for label, values in self._pending_values.items():
+                self.stats[label].update_many(values, self._pending_units.get(label))
+            self._pending_counts.clear()
+            self._pending_values.clear()
+            self._pending_units.clear()
+            self._n_pending = 0
+        self.time_stats.flush()
 
     def __getitem__(self, item: str) -> "MetricStats":
+        if self._n_pending:
+            # steps can read their stats while running
+            self.flush()
         return self.stats[item]
 
     def __setitem__(self, key: str, value: "MetricStats"):
@@ -69,29 +180,57 @@ class Stats:
 
     def __add__(self, stat):
         assert self.name == stat.name, f"Can not merge stats from different blocks {self.name} != {stat.name}"
+        self.flush()
+        stat.flush()
         result = Stats(self.name)
         result.time_stats = self.time_stats + stat.time_stats
         result.stats = self.stats + stat.stats
         return result
 
+    @property
+    def resource_stats(self) -> "ResourceStats":
+        return self.time_stats.resources
+
+    def merge(self, stat: "Stats"):
+        """
+            Merge, in place, stats that were collected for the same task (for example by several worker processes).
+            Unlike `+`, timing stats are not counted as coming from a different task.
+        Args:
+          stat: Stats: stats to merge into this object
+
+        """
+        assert self.name == stat.name, f"Can not merge stats from different blocks {self.name} != {stat.name}"
+        self.flush()
+        stat.flush()
+        resources = self.resource_stats + stat.resource_stats
+        self.time_stats = MetricStats.__add__(self.time_stats, stat.time_stats)
+        self.time_stats.resources = resources
+        self.stats = self.stats + stat.stats
+
     def __repr__(self, total_time: float = 0.0):
+        self.flush()
         return f"\n{INDENT}".join(
             filter(
                 lambda x: x is not None,
                 [
                     f"{self.name}",
                     f"Runtime: {self.time_stats.get_repr(total_time)}" if self.time_stats.total > 0 else None,
+                    f"Resources: {self.resource_stats}" if self.resource_stats else None,
                     f"Stats: {{{self.stats}}}" if len(self.stats) > 0 else None,
                 ],
             )
         )
 
     def to_dict(self):
-        return {
+        self.flush()
+        data = {
             "name": self.name,
             "time_stats": self.time_stats.to_dict(),
             "stats": self.stats.to_dict(),
         }
+        if self.resource_stats:
+            data["resource_stats"] = self.resource_stats.to_dict()
+        return data
 
     def to_json(self):
         return json.dumps(self.to_dict(), indent=4)
@@ -119,32 +258,96 @@ class Stats:
         """
         stats = cls(data["name"])
         stats.time_stats = TimingStats.from_dict(data["time_stats"])
+        if resource_stats := data.get("resource_stats", None):
+            stats.time_stats.resources = ResourceStats.from_dict(resource_stats)
         stats.stats = MetricStatsDict(init=data["stats"])
         if doc_len_stats := data.get("doc_len_stats", None):  # backwards compatibility
             stats.stats["doc_len"] = MetricStats.from_dict(doc_len_stats)
         return stats
 
 
+def get_pipeline_stats(pipeline: list) -> Iterator[Stats]:
+    """
+        Collect the stats of each pipeline step, in order. Steps wrapping other steps (that have a `pipeline` list
+        attribute) also contribute the stats of each of their wrapped steps.
+    Args:
+      pipeline: list of pipeline steps and/or callables
+
+    Returns: generator of Stats
+
+    """
+    for pipeline_step in pipeline:
+        if hasattr(pipeline_step, "stats"):
+            yield pipeline_step.stats
+        if isinstance(sub_pipeline := getattr(pipeline_step, "pipeline", None), list):
+            yield from get_pipeline_stats(sub_pipeline)
+
+
+def _process_uptime() -> float | None:
+    """
+    Seconds since the current process was started (linux only, None elsewhere)
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # the process name (2nd field) may contain spaces: fields are counted from its closing parenthesis
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def measure_startup() -> Stats:
+    """
+        Time (and cpu time) spent by the current process before running its first task: interpreter startup, imports
+        and unpickling of the executor. Tasks run after the first one in the same process have no startup cost.
+    Returns: Stats with the startup time of this task
+
+    """
+    global _startup_measured
+    stats = Stats(STARTUP_STATS_NAME)
+    if _startup_measured:
+        return stats
+    _startup_measured = True
+    if (uptime := _process_uptime()) is not None:
+        stats.time_stats.update(uptime, unit="task")
+    cpu_times = os.times()
+    stats.resource_stats.cpu_user = cpu_times.user
+    stats.resource_stats.cpu_sys = cpu_times.system
+    return stats
+
+
 class PipelineStats:
-    def __init__(self, stats: list[Stats | Callable] = None):
+    """
+    Stats of each step of a pipeline. The startup time of the processes that ran the tasks (see `measure_startup`),
+    when measured, is kept separately in `startup`
+    """
+
+    def __init__(self, stats: list[Stats | Callable] = None, startup: Stats | None = None):
         self.stats: list[Stats] = stats if stats else []
         if self.stats and not isinstance(self.stats[0], Stats):
-            self.stats: list[Stats] = [
-                pipeline_step.stats for pipeline_step in self.stats if hasattr(pipeline_step, "stats")
-            ]
+            self.stats: list[Stats] = list(get_pipeline_stats(self.stats))
+        self.startup = startup
 
     def __add__(self, pipestat):
+        startup = (
+            self.startup + pipestat.startup if self.startup and pipestat.startup else self.startup or pipestat.startup
+        )
         if not self.stats:
-            return PipelineStats(pipestat.stats)
-        return PipelineStats([x + y for x, y in zip(self.stats, pipestat.stats)])
+            return PipelineStats(pipestat.stats, startup)
+        return PipelineStats([x + y for x, y in zip(self.stats, pipestat.stats)], startup)
+
+    def _all_stats(self) -> list[Stats]:
+        return ([self.startup] if self.startup else []) + self.stats
 
     @property
     def total_time(self):
-        return sum([stat.time_stats.global_mean for stat in self.stats])
+        return sum([stat.time_stats.global_mean for stat in self._all_stats()])
 
     @property
     def total_std_dev(self):
-        return math.sqrt(sum((stat.time_stats.global_std_dev**2 for stat in self.stats)))
+        return math.sqrt(sum((stat.time_stats.global_std_dev**2 for stat in self._all_stats())))
 
     def get_repr(self, text=None):
         """
@@ -163,14 +366,15 @@ class PipelineStats:
             + (f" ± {humanize.precisedelta(total_std_dev)}/task" if total_std_dev != 0.0 else "")
             + "\n\n"
         )
-        x += "\n".join([stat.__repr__(total_time) for stat in self.stats])
+        x += "\n".join([stat.__repr__(total_time) for stat in self._all_stats()])
         return x
 
     def __repr__(self):
         return self.get_repr()
 
     def to_json(self):
-        return json.dumps([stat.to_dict() for stat in self.stats], indent=4)
+        # the startup stats are saved last, so that the stats of each step keep their index
+        return json.dumps([stat.to_dict() for stat in self.stats + ([self.startup] if self.startup else [])], indent=4)
 
     @classmethod
     def from_json(cls, data):
@@ -182,7 +386,9 @@ class PipelineStats:
         Returns:
 
         """
-        return PipelineStats([Stats.from_dict(stat) for stat in data])
+        stats = [Stats.from_dict(stat) for stat in data]
+        startup = stats.pop() if stats and stats[-1].name == STARTUP_STATS_NAME else None
+        return PipelineStats(stats, startup)
 
     def save_to_disk(self, file: IO):
         """
@@ -234,6 +440,43 @@ class MetricStats:
         if self.n > 1:
             self._running_variance += delta * (x - self.mean)
 
+    def update_many(self, values: "np.ndarray | list | int", unit: str = None):
+        """
+            Equivalent to calling `update` for each value, but computed in bulk.
+        Args:
+          values: array (or list) of values, or an int `n` (as if `update(1)` was called `n` times)
+          unit: str:  (Default value = None)
+
+        Returns:
+
+        """
+        if unit:
+            self.unit = unit
+        if isinstance(values, int):
+            if values > 0:
+                batch = MetricStats(total=values, n=values, mean=1.0, min=1, max=1, unit=self.unit)
+            else:
+                return
+        else:
+            import numpy as np
+
+            values = np.asarray(values)
+            if values.size == 0:
+                return
+            mean = float(values.mean())
+            batch = MetricStats(
+                total=values.sum().item(),
+                n=int(values.size),
+                mean=mean,
+                min=values.min().item(),
+                max=values.max().item(),
+                _running_variance=float(((values - mean) ** 2).sum()),
+                unit=self.unit,
+            )
+        merged = MetricStats.__add__(self, batch)
+        self.total, self.n, self.mean = merged.total, merged.n, merged.mean
+        self.min, self.max, self._running_variance = merged.min, merged.max, merged._running_variance
+
     @property
     def variance(self):
         return self._running_variance / (self.n - 1) if self.n > 1 else 0.0
@@ -330,6 +573,89 @@ class MetricStats:
         return str(self.total)
 
 
+@dataclass
+class ResourceStats:
+    """
+    Resources used by a block: cpu time (user and system) and increase of the peak memory usage (RSS) of the process
+    while its time was being tracked, as well as bytes read and written through its DataFolders and the time spent
+    waiting for these reads/writes. Summed over tasks, except for `peak_rss_increase` (max over tasks)
+    """
+
+    cpu_user: float = 0.0
+    cpu_sys: float = 0.0
+    peak_rss_increase: int = 0
+    read_bytes: int = 0
+    written_bytes: int = 0
+    io_wait: float = 0.0
+
+    def update(self, start: "resource.struct_rusage", end: "resource.struct_rusage", weight: int = 1):
+        """
+            Adds the cpu time used between two `resource.getrusage` calls. The peak memory is a high-water mark, that
+            can not be sampled: see `update_peak_rss`
+        Args:
+          start: usage at the start of the tracked block
+          end: usage at the end of the tracked block
+          weight: number of blocks this one stands for (when only some blocks are measured)
+
+        Returns:
+
+        """
+        self.cpu_user += (end.ru_utime - start.ru_utime) * weight
+        self.cpu_sys += (end.ru_stime - start.ru_stime) * weight
+
+    def update_peak_rss(self, usage: "resource.struct_rusage"):
+        """
+            Adds the increase of the peak memory of the process since the last call (from any ResourceStats of this
+            process), so that every increase is counted once, by the block that was running
+        Args:
+          usage: current usage of the process
+
+        Returns:
+
+        """
+        global _last_maxrss
+        if _last_maxrss is not None and usage.ru_maxrss > _last_maxrss:
+            self.peak_rss_increase += (usage.ru_maxrss - _last_maxrss) * MAXRSS_UNIT
+        _last_maxrss = max(usage.ru_maxrss, _last_maxrss or 0)
+
+    def merge(self, other: "ResourceStats"):
+        """
+        Adds, in place, resources used by the same task
+        """
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def __add__(self, other: "ResourceStats") -> "ResourceStats":
+        result = ResourceStats(**{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)})
+        result.peak_rss_increase = max(self.peak_rss_increase, other.peak_rss_increase)
+        return result
+
+    def __bool__(self):
+        return any(getattr(self, f.name) for f in fields(self))
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        elements = []
+        if self.cpu_user or self.cpu_sys:
+            elements.append(
+                f"cpu: {humanize.precisedelta(self.cpu_user)} user, {humanize.precisedelta(self.cpu_sys)} sys"
+            )
+        if self.peak_rss_increase:
+            elements.append(f"peak RSS: +{humanize.naturalsize(self.peak_rss_increase, binary=True)}")
+        if self.read_bytes or self.written_bytes or self.io_wait:
+            elements.append(
+                f"I/O: {humanize.naturalsize(self.read_bytes)} read, {humanize.naturalsize(self.written_bytes)} "
+                f"written, {humanize.precisedelta(self.io_wait)} waiting"
+            )
+        return ", ".join(elements)
+
+
 @dataclass
 class TimingStats(MetricStats):
     global_mean: float = 0
@@ -337,16 +663,91 @@ class TimingStats(MetricStats):
     global_min: float = float("inf")
     global_max: float = float("-inf")
     global_std_dev: float = 0.0
+    resources: ResourceStats = field(default_factory=ResourceStats, repr=False)
 
     def __enter__(self):
+        if self._n_unsampled:
+            # not timed, already counted by the last sampled block
+            self._n_unsampled -= 1
+            self._entry_time = None
+            return
+        self._n_unsampled = self.sample_every - 1
+        self._entry_usage = None
+        if resource and _last_maxrss is None:
+            # first block of this process
+            self.resources.update_peak_rss(resource.getrusage(RUSAGE_THREAD))
+        if self._n_unmeasured:
+            self._n_unmeasured -= 1
+        elif resource:
+            self._n_unmeasured = RESOURCE_SAMPLING - 1
+            self._entry_usage = resource.getrusage(RUSAGE_THREAD)
         self._entry_time = time.perf_counter()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.update(time.perf_counter() - self._entry_time)
+        if self._entry_time is None:
+            return
+        elapsed = time.perf_counter() - self._entry_time
+        # read the usage before updating the stats, so that their own cpu time is not counted
+        if resource:
+            usage = resource.getrusage(RUSAGE_THREAD)
+            self.resources.update_peak_rss(usage)
+            if self._entry_usage is not None:
+                weight = self.sample_every * RESOURCE_SAMPLING
+                self.resources.update(self._entry_usage, usage, weight)
+                self._resource_blocks += weight
+        if self.sample_every == 1:
+            self.update(elapsed)
+        else:
+            self._update_sampled(elapsed, self.sample_every)
 
     def __post_init__(self):
         if self.global_mean == 0:
             self.global_mean = self.global_min = self.global_max = self.total
+        # only time 1 in `sample_every` blocks (see `Stats.enable_fast_mode`)
+        self.sample_every = 1
+        self._n_unsampled = 0
+        # only the resources of 1 in `RESOURCE_SAMPLING` timed blocks are measured. Blocks counted by the measurements
+        self._n_unmeasured = 0
+        self._resource_blocks = 0
+
+    def _update_sampled(self, x: float, weight: int):
+        """
+            Counts a sampled time as `weight` blocks that took this time (weighted version of `update`)
+        Args:
+          x: float: time of the sampled block
+          weight: int: number of blocks it stands for
+
+        Returns:
+
+        """
+        self.total += x * weight
+        self.n += weight
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        delta = x - self.mean
+        self.mean += delta * weight / self.n
+        self._running_variance += delta * (x - self.mean) * weight
+        if self.n_tasks == 1:
+            self.global_mean = self.global_min = self.global_max = self.total
+
+    def flush(self):
+        """
+        Removes the blocks counted in advance by the last sampled (or measured) block, that did not run
+        """
+        if self._resource_blocks > self.n - self._n_unsampled > 0:
+            self.resources.cpu_user *= (self.n - self._n_unsampled) / self._resource_blocks
+            self.resources.cpu_sys *= (self.n - self._n_unsampled) / self._resource_blocks
+            self._resource_blocks = self.n - self._n_unsampled
+        self._n_unmeasured = 0
+        if not self._n_unsampled or not self.n:
+            return
+        n = self.n - self._n_unsampled
+        # the removed blocks took the mean time: the mean and variance sum are unchanged
+        self.total = self.mean * n
+        self.n = n
+        self._n_unsampled = 0
+        if self.n_tasks == 1:
+            self.global_mean = self.global_min = self.global_max = self.total
 
     def update(self, x: float, unit: str = None):
         """
@@ -380,6 +781,7 @@ class TimingStats(MetricStats):
             + (self.global_mean - other.global_mean) ** 2 * self.n_tasks * other.n_tasks / new_time_stats.n_tasks
         )
         new_time_stats.global_std_dev = math.sqrt(s / (new_time_stats.n_tasks - 1))
+        new_time_stats.resources = self.resources + other.resources
         return new_time_stats
 
     def _get_time_frac(self, total_time):
@@ -1,4 +1,3 @@
-import itertools
 import os.path
 from abc import ABC
 from typing import TYPE_CHECKING
@@ -7,6 +6,7 @@ import numpy as np
 from tokenizers.processors import TemplateProcessing
 
 from datatrove.pipeline.base import PipelineStep
+from datatrove.utils.batching import batched  # noqa: F401
 
 
 if TYPE_CHECKING:
@@ -58,23 +58,3 @@ class PipelineStepWithTokenizer(PipelineStep, ABC):
                     pair=None,
                 )
         return self._tokenizer
-
-
-def batched(iterable, n):
-    """In python 3.12+ we could use itertools.batched instead
-
-    One difference with itertools.batched: we return a list instead of a tuple
-
-    Args:
-      iterable:
-      n:
-
-    Returns:
-
-    """
-    # batched('ABCDEFG', 3) --> ABC DEF G
-    if n < 1:
-        raise ValueError("n must be at least one")
-    it = iter(iterable)
-    while batch := list(itertools.islice(it, n)):
-        yield batch
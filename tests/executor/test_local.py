@@ -1,11 +1,30 @@
+import json
 import os
 import shutil
 import tempfile
+import threading
+import time
 import unittest
+from collections import Counter
+from functools import partial
+from unittest import mock
 
+import multiprocess
+
+from datatrove.data import Document
 from datatrove.executor.local import LocalPipelineExecutor
 from datatrove.io import get_datafolder
+from datatrove.pipeline.dedup import MinhashDedupBuckets, SentenceFindDedups
+from datatrove.pipeline.filters import LambdaFilter
+from datatrove.pipeline.flow import ParallelStep
+from datatrove.pipeline.readers import JsonlReader
+from datatrove.pipeline.stats import URLStats
+from datatrove.pipeline.writers import JsonlWriter
 from datatrove.utils._import_utils import is_boto3_available, is_moto_available, is_s3fs_available
+from datatrove.utils.completions import CompletionStore
+from datatrove.utils.profiling import load_collapsed_stacks
+from datatrove.utils.progress import read_progress, summarize_progress
+from datatrove.utils.stats import PipelineStats, Stats
 
 from ..utils import require_boto3, require_moto, require_s3fs
 
@@ -32,6 +51,34 @@ if is_s3fs_available():
     from s3fs import S3FileSystem  # noqa: F811
 
 
+def slow_filter(document):
+    time.sleep(0.002)
+    return True
+
+
+def run_dispatch_node(tmp_dir: str):
+    def record_run(data, rank, world_size):
+        open(f"{tmp_dir}/runs/{rank}_{os.getpid()}", "w").close()
+        yield from data
+
+    LocalPipelineExecutor(
+        pipeline=[JsonlReader(f"{tmp_dir}/input"), record_run],
+        tasks=4,
+        workers=1,
+        logging_dir=f"{tmp_dir}/logs",
+        dispatch=True,
+        lease_timeout=2,
+    ).run()
+
+
+def straggle_once(data, rank, world_size, tmp_dir):
+    yield from data
+    # the first attempt of rank 2 gets stuck after writing its documents
+    if rank == 2 and not os.path.exists(f"{tmp_dir}/straggled"):
+        open(f"{tmp_dir}/straggled", "w").close()
+        time.sleep(120)
+
+
 @require_moto
 class TestLocalExecutor(unittest.TestCase):
     def setUp(self):
@@ -53,11 +100,7 @@ class TestLocalExecutor(unittest.TestCase):
         file_list = [
             "executor.json",
             "stats.json",
-        ] + [
-            x
-            for rank in range(3)
-            for x in (f"completions/{rank:05d}", f"logs/task_{rank:05d}.log", f"stats/{rank:05d}.json")
-        ]
+        ] + [x for rank in range(3) for x in (f"logs/task_{rank:05d}.log", f"stats/{rank:05d}.json")]
         for tasks, workers in configurations:
             for log_dir in (f"{self.tmp_dir}/{tasks}_{workers}", (f"s3://test-bucket/logs/{tasks}_{workers}", s3fs)):
                 log_dir = get_datafolder(log_dir)
@@ -66,3 +109,308 @@ class TestLocalExecutor(unittest.TestCase):
 
                 for file in file_list:
                     assert log_dir.isfile(file)
+                assert executor.get_incomplete_ranks() == []
+
+    def test_file_manifest(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(4):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.write('{"text": "hello"}\n' * (i + 1))
+        log_dir = get_datafolder(f"{self.tmp_dir}/logs")
+        executor = LocalPipelineExecutor(
+            pipeline=[JsonlReader(input_folder, shard_by_size=True), JsonlWriter(f"{self.tmp_dir}/output")],
+            tasks=2,
+            logging_dir=log_dir,
+            file_manifest=True,
+        )
+        stats = executor.run()
+        self.assertEqual(stats.stats[0]["input_files"].total, 4)
+        self.assertEqual(len(log_dir.list_files("listings/manifests")), 1)
+        self.assertEqual(len(log_dir.list_files("listings/shards")), 1)
+        # only the input folders of readers use manifests
+        executor.set_listings_folder(executor.pipeline)
+        self.assertTrue(executor.pipeline[0].data_folder.use_manifest)
+        self.assertFalse(executor.pipeline[1].output_folder.use_manifest)
+        # and those of dedup stages, written by the previous stage
+        buckets = MinhashDedupBuckets(f"{self.tmp_dir}/signatures", f"{self.tmp_dir}/buckets")
+        find_dedups = SentenceFindDedups(f"{self.tmp_dir}/sent_signatures", f"{self.tmp_dir}/dups")
+        executor = LocalPipelineExecutor(pipeline=[buckets, find_dedups], logging_dir=log_dir, file_manifest=True)
+        executor.set_listings_folder(executor.pipeline)
+        self.assertTrue(buckets.input_folder.use_manifest)
+        self.assertTrue(find_dedups.data_folder.use_manifest)
+        self.assertFalse(buckets.output_folder.use_manifest)
+        self.assertFalse(find_dedups.output_folder.use_manifest)
+
+    def test_staging_folder(self):
+        writer = JsonlWriter(f"{self.tmp_dir}/output", staging_dir=f"{self.tmp_dir}/staging")
+        executor = LocalPipelineExecutor(pipeline=[writer], logging_dir=f"{self.tmp_dir}/logs")
+        # staged bytes are counted once, when uploaded to the output folder
+        self.assertEqual(executor.get_data_folders(writer), [writer.output_folder])
+        executor.set_listings_folder(executor.pipeline)
+        self.assertIsNotNone(writer.output_folder.listings_folder)
+        self.assertIsNone(writer.staging_folder.listings_folder)
+
+    def test_checkpoints(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(4):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.writelines(f'{{"text": "{i}-{j}"}}\n' for j in range(3))
+        output_folder = get_datafolder(f"{self.tmp_dir}/output")
+        log_dir = get_datafolder(f"{self.tmp_dir}/logs")
+        preempted = {"enabled": True}
+
+        def preempt_on_third_file(document):
+            if preempted["enabled"] and document.text == "2-1":
+                raise RuntimeError("preempted")
+            return True
+
+        def get_executor():
+            return LocalPipelineExecutor(
+                pipeline=[JsonlReader(input_folder), LambdaFilter(preempt_on_third_file), JsonlWriter(output_folder)],
+                tasks=1,
+                logging_dir=log_dir,
+                checkpoints=True,
+            )
+
+        with self.assertRaises(RuntimeError):
+            get_executor().run()
+        # only the outputs of completed input files were committed
+        self.assertEqual(
+            output_folder.list_files(glob_pattern="*.jsonl.gz"),
+            ["part_00000_00000.jsonl.gz", "part_00001_00000.jsonl.gz"],
+        )
+        preempted["enabled"] = False
+        stats = get_executor().run()
+        self.assertEqual(stats.stats[0]["input_files"].total, 2)
+        self.assertEqual(len(output_folder.list_files()), 4)
+        texts = [doc.text for doc in JsonlReader(output_folder)()]
+        self.assertEqual(texts, [f"{i}-{j}" for i in range(4) for j in range(3)])
+        self.assertFalse(log_dir.exists("checkpoints/00000.json"))
+
+        def custom_step(data, rank, world_size):
+            # could hold documents back, so that a file would be committed before all of its documents were written
+            yield from data
+
+        executor = LocalPipelineExecutor(
+            pipeline=[JsonlReader(input_folder), custom_step, JsonlWriter(output_folder)],
+            logging_dir=f"{self.tmp_dir}/logs_custom",
+            checkpoints=True,
+        )
+        with self.assertRaises(ValueError):
+            executor.run()
+
+    def test_profiling(self):
+        def slow_step(data, rank, world_size):
+            for document in data:
+                sum(range(200_000))
+                yield document
+
+        log_dir = get_datafolder(f"{self.tmp_dir}/logs")
+        executor = LocalPipelineExecutor(
+            pipeline=[[Document(text=str(i), id=str(i)) for i in range(50)], slow_step, LambdaFilter(slow_filter)],
+            tasks=4,
+            logging_dir=log_dir,
+            profile_fraction=0.5,
+        )
+        executor.run()
+        self.assertEqual(log_dir.list_files("profiles"), ["profiles/00000.collapsed", "profiles/00002.collapsed"])
+        with log_dir.open("profile.collapsed", "rt") as f:
+            samples = load_collapsed_stacks(f)
+        step_samples = Counter()
+        for stack, count in samples.items():
+            step_samples[stack.split(";")[0]] += count
+        # the time spent in each step is attributed to it, not to the steps consuming its documents
+        self.assertGreater(step_samples["slow_step"], 0)
+        self.assertGreater(step_samples["🔻 - FILTER: 👤 Lambda"], 0)
+        for stack in samples:
+            if stack.startswith("slow_step;"):
+                self.assertNotIn("slow_filter", stack)
+
+    def test_progress(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(4):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.writelines(f'{{"text": "{i}-{j}"}}\n' for j in range(10))
+        log_dir = get_datafolder(f"{self.tmp_dir}/logs")
+        executor = LocalPipelineExecutor(
+            pipeline=[JsonlReader(input_folder), LambdaFilter(slow_filter)],
+            tasks=2,
+            logging_dir=log_dir,
+            progress_interval=0.01,
+            prometheus_dir=f"{self.tmp_dir}/prometheus",
+        )
+        executor.run()
+        with log_dir.open("progress/00000.json", "rt") as f:
+            records = read_progress(f)
+        self.assertEqual(len(records), 2)
+        self.assertTrue(records[-1]["done"])
+        self.assertEqual((records[-1]["files_read"], records[-1]["files_total"]), (2, 2))
+        progress = summarize_progress(get_datafolder(f"{self.tmp_dir}/logs/progress"), 2, {0, 1})
+        self.assertEqual(progress["progress"], 1.0)
+        self.assertEqual(progress["drop_rate"], {"🔻 - FILTER: 👤 Lambda": 0.0})
+        with open(f"{self.tmp_dir}/prometheus/datatrove_00001.prom") as f:
+            self.assertIn('stat="input_files"} 2', f.read())
+
+    def test_progress_fast_stats(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(4):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.writelines(f'{{"text": "{i}-{j}"}}\n' for j in range(5000))
+        totals = []
+        for fast in (False, True):
+            executor = LocalPipelineExecutor(
+                pipeline=[JsonlReader(input_folder), LambdaFilter(lambda doc: int(doc.text.split("-")[1]) % 3 != 0)],
+                tasks=1,
+                logging_dir=f"{self.tmp_dir}/logs_{fast}",
+                fast_stats=fast,
+                progress_interval=0.0001 if fast else None,
+            )
+            flush_threads = set()
+            original_flush = Stats.flush
+
+            def flush(stats, original_flush=original_flush, flush_threads=flush_threads):
+                flush_threads.add(threading.current_thread())
+                original_flush(stats)
+
+            with mock.patch.object(Stats, "flush", flush):
+                stats = executor.run()
+            # the progress reporter never flushes pending updates: only the thread running the pipeline does
+            self.assertEqual(flush_threads, {threading.main_thread()})
+            totals.append([{key: metric.total for key, metric in step.stats.items()} for step in stats.stats])
+        # snapshots are taken while the stats are updated: the totals must still be exact
+        self.assertEqual(totals[1], totals[0])
+        self.assertEqual(totals[0][1]["dropped"], 4 * 1667)
+
+    def test_resource_stats(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(2):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.writelines(f'{{"text": "{i}-{j}"}}\n' for j in range(100))
+        input_size = sum(input_folder.size(file) for file in input_folder.list_files())
+        executor = LocalPipelineExecutor(
+            pipeline=[
+                JsonlReader(input_folder),
+                LambdaFilter(lambda doc: sum(range(200_000)) > 0),
+                JsonlWriter(f"{self.tmp_dir}/output", compression=None),
+            ],
+            tasks=2,
+            logging_dir=f"{self.tmp_dir}/logs",
+        )
+        executor.run()
+        with open(f"{self.tmp_dir}/logs/stats.json") as f:
+            stats = PipelineStats.from_json(json.load(f))
+        reader_stats, filter_stats, writer_stats = stats.stats
+        self.assertEqual(reader_stats.resource_stats.read_bytes, input_size)
+        self.assertGreater(filter_stats.resource_stats.cpu_user + filter_stats.resource_stats.cpu_sys, 0)
+        output_folder = get_datafolder(f"{self.tmp_dir}/output")
+        output_size = sum(output_folder.size(file) for file in output_folder.list_files())
+        self.assertEqual(writer_stats.resource_stats.written_bytes, output_size)
+        self.assertIn("Resources: cpu:", repr(filter_stats))
+        # process startup is reported separately from the steps
+        self.assertEqual(stats.startup.name, "🚀 Startup")
+        self.assertGreater(stats.startup.resource_stats.cpu_user + stats.startup.resource_stats.cpu_sys, 0)
+        self.assertIn("🚀 Startup", repr(stats))
+
+    def test_plan(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(10):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.writelines(f'{{"text": "{i}-{j}"}}\n' for j in range(100))
+        input_size = sum(input_folder.size(file) for file in input_folder.list_files())
+        executor = LocalPipelineExecutor(
+            pipeline=[
+                JsonlReader(input_folder),
+                LambdaFilter(lambda doc: int(doc.text.split("-")[1]) % 2 == 0),
+                JsonlWriter(f"{self.tmp_dir}/output"),
+            ],
+            tasks=2,
+            logging_dir=f"{self.tmp_dir}/logs",
+        )
+        plan = executor.plan(sample_files=4, tmp_dir=f"{self.tmp_dir}/plan")
+        self.assertEqual((plan.total_files, plan.sample_files, plan.total_bytes), (10, 4, input_size))
+        self.assertEqual([step.drop_rate for step in plan.steps], [None, 0.5, None])
+        self.assertAlmostEqual(plan.steps[0].read_bytes, input_size, delta=1)
+        self.assertEqual(plan.tasks, 1)
+        self.assertGreater(plan.peak_memory_per_task, 0)
+        self.assertIn("Recommended: tasks=1", repr(plan))
+        # the dry run does not write to the output folder or to the logging dir
+        self.assertFalse(os.path.exists(f"{self.tmp_dir}/output"))
+        self.assertFalse(os.path.exists(f"{self.tmp_dir}/logs"))
+
+        # without a reader, whole tasks are sampled
+        executor = LocalPipelineExecutor(
+            pipeline=[
+                lambda data, rank, world_size: (Document(text=str(i), id=str(i)) for i in range(100)),
+                JsonlWriter(f"{self.tmp_dir}/output"),
+            ],
+            tasks=3,
+            logging_dir=f"{self.tmp_dir}/logs",
+        )
+        plan = executor.plan(sample_tasks=2, tmp_dir=f"{self.tmp_dir}/plan2")
+        self.assertEqual(len(plan.sampled_ranks), 2)
+        self.assertEqual(plan.tasks, 3)
+        self.assertGreater(plan.steps[0].written_bytes, 0)
+        self.assertFalse(os.path.exists(f"{self.tmp_dir}/output"))
+
+    def test_dispatch(self):
+        os.makedirs(f"{self.tmp_dir}/runs")
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(4):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.write(f'{{"text": "{i}"}}\n')
+        logs = get_datafolder(f"{self.tmp_dir}/logs")
+        # rank 0 was claimed by a node that died, rank 1 by a node that stops renewing its lease in 1s
+        for rank, expires in ((0, time.time() - 10), (1, time.time() + 1)):
+            with logs.open(f"leases/{rank:05d}.dead-node", "wt") as f:
+                json.dump({"node": "dead-node", "expires": expires}, f)
+        ctx = multiprocess.get_context("spawn")
+        nodes = [ctx.Process(target=run_dispatch_node, args=(self.tmp_dir,)) for _ in range(2)]
+        for node in nodes:
+            node.start()
+        for node in nodes:
+            node.join(timeout=120)
+            self.assertEqual(node.exitcode, 0)
+        # each rank was run exactly once
+        runs = [run.split("_") for run in os.listdir(f"{self.tmp_dir}/runs")]
+        self.assertEqual(sorted(int(rank) for rank, _ in runs), [0, 1, 2, 3])
+        self.assertEqual(CompletionStore(logs).completed_ranks(), {0, 1, 2, 3})
+        # the nodes released their leases
+        self.assertEqual(logs.list_files("leases"), ["leases/00000.dead-node", "leases/00001.dead-node"])
+
+    def test_speculation(self):
+        input_folder = get_datafolder(f"{self.tmp_dir}/input")
+        for i in range(3):
+            with input_folder.open(f"{i}.jsonl", "wt") as f:
+                f.write(f'{{"text": "{i}"}}\n')
+        executor = LocalPipelineExecutor(
+            pipeline=[
+                JsonlReader(f"{self.tmp_dir}/input"),
+                JsonlWriter(f"{self.tmp_dir}/output", compression=None),
+                partial(straggle_once, tmp_dir=self.tmp_dir),
+            ],
+            tasks=3,
+            workers=2,
+            logging_dir=f"{self.tmp_dir}/logs",
+            speculation_factor=2,
+        )
+        start = time.time()
+        executor.run()
+        self.assertLess(time.time() - start, 100)
+        self.assertTrue(os.path.exists(f"{self.tmp_dir}/straggled"))
+        # the outputs of the second attempt of rank 2 were committed, those of the first one were deleted
+        output = get_datafolder(f"{self.tmp_dir}/output")
+        self.assertEqual(sorted(output.list_files()), ["00000.jsonl", "00001.jsonl", "00002.jsonl"])
+        self.assertEqual(output.list_files(".attempts"), [])
+        with output.open("00002.jsonl", "rt") as f:
+            self.assertEqual(json.loads(f.read())["text"], "2")
+        self.assertEqual(CompletionStore(executor.logging_dir).completed_ranks(), {0, 1, 2})
+
+        with self.assertRaises(ValueError):
+            LocalPipelineExecutor(pipeline=[], speculation_factor=2, checkpoints=True)
+        # steps of nested pipelines save their outputs to the same files in every attempt too
+        with self.assertRaises(ValueError):
+            LocalPipelineExecutor(
+                pipeline=[ParallelStep([URLStats(f"{self.tmp_dir}/stats")], workers=2)],
+                workers=2,
+                speculation_factor=2,
+            )
@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from functools import partial
+from unittest import mock
+
+from datatrove.executor.slurm import SlurmPipelineExecutor
+from datatrove.io import get_datafolder
+
+
+def record_rank(data, rank, world_size, runs_dir):
+    with open(os.path.join(runs_dir, str(rank)), "w") as f:
+        f.write(str(os.getpid()))
+    return data
+
+
+class TestSlurmExecutor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_job_workers(self):
+        os.makedirs(f"{self.tmp_dir}/runs")
+        executor = SlurmPipelineExecutor(
+            pipeline=[partial(record_rank, runs_dir=f"{self.tmp_dir}/runs")],
+            tasks=6,
+            time="1:00:00",
+            partition="test",
+            cpus_per_task=3,
+            tasks_per_job=3,
+            job_workers=-1,
+            logging_dir=f"{self.tmp_dir}/logs",
+            requeue_signals=None,
+        )
+        self.assertEqual(executor.job_workers, 3)
+        logs = get_datafolder(f"{self.tmp_dir}/logs")
+        with logs.open("ranks_to_run.json", "w") as f:
+            json.dump(list(range(6)), f)
+        # already completed tasks are skipped
+        executor.mark_rank_as_completed(5)
+        # second job of the array: runs ranks 3 and 4 in a pool
+        with mock.patch.dict(os.environ, {"SLURM_ARRAY_TASK_ID": "1"}):
+            executor.run()
+        self.assertEqual(sorted(os.listdir(f"{self.tmp_dir}/runs")), ["3", "4"])
+        for rank in (3, 4):
+            with open(f"{self.tmp_dir}/runs/{rank}") as f:
+                self.assertNotEqual(int(f.read()), os.getpid())
+            self.assertTrue(executor.is_rank_completed(rank))
+            self.assertTrue(logs.isfile(f"stats/{rank:05d}.json"))
+            self.assertTrue(logs.isfile(f"logs/task_{rank:05d}.log"))
@@ -1,6 +1,14 @@
-from unittest import TestCase
+import math
+import multiprocessing
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, mock, skipIf
 
-from datatrove.pipeline.base import PipelineStep
+from datatrove.data import Document
+from datatrove.pipeline.base import PipelineStep, asset
+from datatrove.pipeline.filters import LambdaFilter
+from datatrove.utils.stats import MAXRSS_UNIT, RESOURCE_SAMPLING, resource
 
 
 class DummyPipelineStep(PipelineStep):
@@ -11,6 +19,35 @@ class DummyPipelineStep(PipelineStep):
     ]
 
 
+class StepWithAsset(PipelineStep):
+    n_builds = 0
+
+    @asset
+    def big_list(self):
+        StepWithAsset.n_builds += 1
+        return list(range(100_000))
+
+    def run(self, data, rank: int = 0, world_size: int = 1):
+        yield from data
+
+
+def get_peak_rss_increases() -> tuple[int, int]:
+    kept = []
+    # raises the peak memory by at least 128MB, whatever the memory of the process was before
+    size = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT + 2**27
+
+    def allocate(doc):
+        if doc.id == "5":
+            # not a block whose cpu time is measured
+            kept.append(b"x" * size)
+        return True
+
+    filter_step, other_step = LambdaFilter(allocate), LambdaFilter(lambda doc: True)
+    docs = [Document(text="a", id=str(i)) for i in range(RESOURCE_SAMPLING)]
+    deque(other_step(filter_step(docs)), maxlen=0)
+    return filter_step.stats.resource_stats.peak_rss_increase, other_step.stats.resource_stats.peak_rss_increase
+
+
 class TestPipelineStep(TestCase):
     def test_init_pipeline_step_with_missing_dependencies(self):
         with self.assertRaisesRegex(
@@ -18,3 +55,61 @@ class TestPipelineStep(TestCase):
             "`non_existent_dependency1` and `non_existent_dependency2`.*`pip install non_existent_dependency1 non_existent_dependency2-wheel`",
         ):
             DummyPipelineStep()
+
+    def test_fast_stats(self):
+        docs = [Document(text="a" * (i % 7), id=str(i)) for i in range(50)]
+        results = []
+        for fast in (False, True):
+            step = LambdaFilter(lambda doc: len(doc.text) % 3 != 0)
+            if fast:
+                step.stats.enable_fast_mode(flush_every=7, time_sampling=4)
+            deque(step(docs), maxlen=0)
+            results.append(step.stats.to_dict())
+        slow, fast = results
+        self.assertEqual(fast["stats"].keys(), slow["stats"].keys())
+        for key, value in slow["stats"].items():
+            if isinstance(value, dict):
+                for field in ("total", "n", "min", "max"):
+                    self.assertEqual(fast["stats"][key].get(field), value.get(field))
+                self.assertAlmostEqual(fast["stats"][key]["mean"], value["mean"])
+                self.assertAlmostEqual(fast["stats"][key]["variance"], value["variance"])
+            else:
+                self.assertEqual(fast["stats"][key], value)
+        self.assertEqual(fast["time_stats"]["n"], 50)
+
+    @skipIf(resource is None, "resource usage is not measured on windows")
+    def test_resource_sampling(self):
+        step = LambdaFilter(lambda doc: sum(range(200_000)) > 0)
+        docs = [Document(text="a", id=str(i)) for i in range(50)]
+        with (
+            mock.patch("datatrove.utils.stats._last_maxrss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+            mock.patch("datatrove.utils.stats.resource.getrusage", wraps=resource.getrusage) as getrusage,
+        ):
+            deque(step(docs), maxlen=0)
+        # the cpu time of 1 in RESOURCE_SAMPLING documents is measured, the peak memory is read after each one
+        self.assertEqual(getrusage.call_count, 50 + math.ceil(50 / RESOURCE_SAMPLING))
+        step.stats.flush()
+        self.assertEqual(step.stats.time_stats._resource_blocks, 50)
+        self.assertGreater(step.stats.resource_stats.cpu_user + step.stats.resource_stats.cpu_sys, 0)
+
+    @skipIf(resource is None, "resource usage is not measured on windows")
+    def test_peak_rss_of_unmeasured_blocks(self):
+        # in a new process, whose peak memory was not already raised by other tests
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            filter_increase, other_increase = pool.submit(get_peak_rss_increases).result()
+        self.assertGreaterEqual(filter_increase, 2**27)
+        self.assertLess(other_increase, 2**27)
+
+    def test_assets(self):
+        step = StepWithAsset()
+        small_size = len(pickle.dumps(step))
+        self.assertEqual(len(step.big_list), 100_000)
+        self.assertIs(step.big_list, step.big_list)
+        self.assertEqual(StepWithAsset.n_builds, 1)
+        # assets are not pickled, and are built again when first used
+        pickled = pickle.dumps(step)
+        self.assertEqual(len(pickled), small_size)
+        unpickled = pickle.loads(pickled)
+        self.assertNotIn("big_list", vars(unpickled))
+        self.assertEqual(len(unpickled.big_list), 100_000)
+        self.assertEqual(StepWithAsset.n_builds, 2)
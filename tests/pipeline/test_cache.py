@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from datatrove.io import get_datafolder
+from datatrove.pipeline.flow import Cache
+from datatrove.pipeline.flow.cache import get_config
+from datatrove.pipeline.readers import JsonlReader
+
+
+processed = []
+
+
+def expensive_step(data, rank, world_size):
+    for document in data:
+        processed.append(document.id)
+        document.metadata["processed"] = True
+        yield document
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.write_input("0.jsonl", 3)
+        self.write_input("1.jsonl", 2)
+        processed.clear()
+
+    def write_input(self, filename: str, n: int):
+        with get_datafolder(f"{self.tmp_dir}/input").open(filename, "wt") as f:
+            for i in range(n):
+                f.write(f'{{"text": "{filename} {i}", "id": "{filename}/{i}"}}\n')
+
+    def run_cache(self, **kwargs) -> list:
+        cache = Cache(
+            [JsonlReader(f"{self.tmp_dir}/input", compression=None), expensive_step],
+            cache_dir=f"{self.tmp_dir}/cache",
+            **kwargs,
+        )
+        documents = []
+        for document in cache(rank=0, world_size=1):
+            documents.append((document.id, document.text, document.metadata["processed"]))
+            # the following steps can modify the documents
+            document.text = ""
+        return documents
+
+    def cache_files(self) -> list[str]:
+        return [name for _, _, files in os.walk(f"{self.tmp_dir}/cache") for name in files]
+
+    def test_cache_hit(self):
+        documents = self.run_cache()
+        self.assertEqual(len(processed), 5)
+        self.assertEqual(self.cache_files(), ["00000.pkl"])
+        # documents were cached before being modified by the following steps
+        self.assertEqual(self.run_cache(), documents)
+        self.assertEqual(len(processed), 5)
+        self.assertEqual(len(self.cache_files()), 1)
+
+    def test_cache_miss(self):
+        self.run_cache()
+        # different input files
+        self.write_input("1.jsonl", 4)
+        self.assertEqual(len(self.run_cache()), 7)
+        self.assertEqual(len(processed), 12)
+        # different configuration
+        cache = Cache([JsonlReader(f"{self.tmp_dir}/input", compression=None, limit=1), expensive_step])
+        self.assertNotEqual(cache.pipeline_config, Cache([JsonlReader(f"{self.tmp_dir}/input")]).pipeline_config)
+        self.assertEqual(len(self.cache_files()), 2)
+
+    def test_partial_consumption(self):
+        cache = Cache(
+            [JsonlReader(f"{self.tmp_dir}/input", compression=None), expensive_step], cache_dir=f"{self.tmp_dir}/cache"
+        )
+        for _ in cache():
+            break
+        self.assertEqual(self.cache_files(), [])
+
+    def test_eviction(self):
+        self.run_cache()
+        (old_entry,) = [
+            os.path.join(root, name) for root, _, files in os.walk(f"{self.tmp_dir}/cache") for name in files
+        ]
+        os.utime(old_entry, (time.time() - 3600, time.time() - 3600))
+        self.write_input("2.jsonl", 1)
+        self.run_cache(max_age=60)
+        self.assertFalse(os.path.exists(old_entry))
+        self.assertEqual(len(self.cache_files()), 1)
+        self.write_input("3.jsonl", 1)
+        self.run_cache(max_size=0)
+        self.assertEqual(self.cache_files(), [])
+
+    def test_config(self):
+        reader = JsonlReader(f"{self.tmp_dir}/input")
+        steps = [reader, expensive_step, lambda doc: True]
+        config = get_config(steps)
+        self.assertEqual(config[0]["class"], "datatrove.pipeline.readers.jsonl.JsonlReader")
+        self.assertEqual(config[0]["data_folder"], {"folder": f"file://{self.tmp_dir}/input"})
+        self.assertIn("def expensive_step", config[1]["source"])
+        # does not depend on the instances
+        self.assertEqual(get_config([JsonlReader(f"{self.tmp_dir}/input"), *steps[1:]]), config)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from datatrove.data import BatchedDocumentsPipeline, Document, DocumentBatch
+from datatrove.pipeline.filters import LambdaFilter, RegexFilter
+from datatrove.pipeline.readers.parquet import ParquetReader
+from datatrove.pipeline.writers.parquet import ParquetWriter
+from datatrove.utils._import_utils import is_pyarrow_available
+
+from ..utils import require_pyarrow
+
+
+if is_pyarrow_available():
+    import pyarrow as pa  # noqa: F811
+    import pyarrow.parquet as pq  # noqa: F811
+
+
+def get_data(n: int = 20):
+    return [
+        Document(text=f"document {i} {'spam' if i % 4 == 0 else 'ham'}", id=str(i), metadata={"index": i})
+        for i in range(n)
+    ]
+
+
+class TestDocumentBatch(unittest.TestCase):
+    def test_documents_roundtrip(self):
+        docs = get_data(5)
+        docs[2].metadata["extra"] = "value"
+        batch = DocumentBatch.from_documents(docs)
+        self.assertEqual(len(batch), 5)
+        self.assertIsNone(batch.media)
+        self.assertEqual(list(batch.to_documents()), docs)
+
+    def test_filter_and_slice(self):
+        batch = DocumentBatch.from_documents(get_data(6))
+        self.assertIs(batch.filter(np.ones(6, dtype=bool)), batch)
+        self.assertEqual(list(batch.filter([True, False] * 3).id), ["0", "2", "4"])
+        self.assertEqual(list(batch[1:3].metadata["index"]), [1, 2])
+
+    def test_filter_batch_matches_filter(self):
+        docs = get_data()
+        step, batch_step = RegexFilter(r"spam"), RegexFilter(r"spam")
+        kept = list(step(docs))
+        batches = BatchedDocumentsPipeline(
+            [DocumentBatch.from_documents(docs[:7]), DocumentBatch.from_documents(docs[7:])]
+        )
+        result = batch_step(batches)
+        self.assertIsInstance(result, BatchedDocumentsPipeline)
+        self.assertEqual(list(result.to_documents()), kept)
+        for stat in ("total", "forwarded", "dropped", "doc_len"):
+            self.assertEqual(batch_step.stats[stat].total, step.stats[stat].total)
+            self.assertEqual(batch_step.stats[stat].n, step.stats[stat].n)
+
+    def test_unsupported_step_receives_documents(self):
+        step = LambdaFilter(lambda doc: doc.metadata["index"] % 2 == 0)
+        self.assertFalse(step.supports_batches)
+        result = list(step(BatchedDocumentsPipeline([DocumentBatch.from_documents(get_data(4))])))
+        self.assertEqual([doc.id for doc in result], ["0", "2"])
+
+
+@require_pyarrow
+class TestBatchedParquet(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        os.makedirs(f"{self.tmp_dir}/input")
+        pa_table = pa.table(
+            {
+                "text": [f"text {i}" if i != 3 else "" for i in range(10)],
+                "score": list(range(10)),
+                "metadata": [{"lang": "en", "tags": ["a", str(i)]} for i in range(10)],
+            }
+        )
+        pq.write_table(pa_table, f"{self.tmp_dir}/input/data.parquet")
+
+    def test_reader_matches_documents(self):
+        for kwargs in ({}, {"limit": 4}, {"skip": 2, "limit": 5}):
+            with self.subTest(**kwargs):
+                reader = ParquetReader(f"{self.tmp_dir}/input", batch_size=4, default_metadata={"src": "x"}, **kwargs)
+                batch_reader = ParquetReader(
+                    f"{self.tmp_dir}/input", batch_size=4, default_metadata={"src": "x"}, batched=True, **kwargs
+                )
+                batches = batch_reader()
+                self.assertIsInstance(batches, BatchedDocumentsPipeline)
+                self.assertEqual(list(batches.to_documents()), list(reader()))
+                self.assertEqual(batch_reader.stats["doc_len"].total, reader.stats["doc_len"].total)
+
+    def test_batched_rejects_adapter(self):
+        with self.assertRaises(ValueError):
+            ParquetReader(self.tmp_dir, adapter=lambda self, data, path, id_in_file: data, batched=True)
+
+    def test_writer_write_batch(self):
+        reader = ParquetReader(f"{self.tmp_dir}/input", batch_size=4, batched=True)
+        writer = ParquetWriter(f"{self.tmp_dir}/output", batch_size=4)
+        written = list(writer(reader()).to_documents())
+        self.assertEqual(writer.stats["total"].total, 9)
+        output = list(ParquetReader(f"{self.tmp_dir}/output")())
+        for doc in output:
+            doc.metadata.pop("file_path")
+        for doc in written:
+            doc.metadata.pop("file_path")
+        self.assertEqual(output, written)
+
+    def test_writer_metadata_keys(self):
+        batches = [[{"x": 1, "y": 2}, {"x": 3}], [{"x": 4}], [{"x": 5, "z": 6}]]
+        for expand_metadata in (False, True):
+            output_folder = f"{self.tmp_dir}/output_{expand_metadata}"
+            with ParquetWriter(output_folder, expand_metadata=expand_metadata) as writer:
+                for batch in batches[:2]:
+                    writer.write_batch(
+                        DocumentBatch.from_documents([Document("text", "id", metadata=metadata) for metadata in batch])
+                    )
+                # keys that are not in the file can not be added to it
+                with self.assertRaises(ValueError):
+                    writer.write_batch(DocumentBatch.from_documents([Document("text", "id", metadata=batches[2][0])]))
+            metadata = [doc.metadata for doc in ParquetReader(output_folder)()]
+            for doc_metadata in metadata:
+                doc_metadata.pop("file_path")
+            # missing keys are filled with nulls
+            self.assertEqual(metadata, [{"x": 1, "y": 2}, {"x": 3, "y": None}, {"x": 4, "y": None}])
@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest import mock
+
+from datatrove.data import Document
+from datatrove.pipeline.filters import LambdaFilter
+from datatrove.pipeline.flow import ParallelStep
+from datatrove.pipeline.flow.parallel import _get_available_cpus
+from datatrove.pipeline.writers.jsonl import JsonlWriter
+from datatrove.utils.stats import PipelineStats
+
+
+def get_data(n: int = 25):
+    return [Document(text=f"document number {i}", id=str(i)) for i in range(n)]
+
+
+class TestParallelStep(unittest.TestCase):
+    def check_results(self, step: ParallelStep, docs: list[Document], ordered: bool = True):
+        ids = [doc.id for doc in docs]
+        expected = [str(i) for i in range(25) if i % 3 != 0]
+        self.assertEqual(ids if ordered else sorted(ids, key=int), expected)
+        lambda_stats = step.pipeline[0].stats
+        self.assertEqual(lambda_stats["total"].total, 25)
+        self.assertEqual(lambda_stats["forwarded"].total, len(expected))
+        self.assertEqual(lambda_stats["dropped"].total, 25 - len(expected))
+
+    def test_ordered(self):
+        step = ParallelStep([LambdaFilter(lambda doc: int(doc.id) % 3 != 0)], workers=2, batch_size=4)
+        self.check_results(step, list(step(get_data())))
+        self.assertEqual(step.stats["batches"].total, 7)
+
+    def test_unordered(self):
+        step = ParallelStep([LambdaFilter(lambda doc: int(doc.id) % 3 != 0)], workers=3, batch_size=2, ordered=False)
+        self.check_results(step, list(step(get_data())), ordered=False)
+
+    def test_single_worker(self):
+        step = ParallelStep([LambdaFilter(lambda doc: int(doc.id) % 3 != 0)], workers=1)
+        self.check_results(step, list(step(get_data())))
+
+    def test_all_cpus(self):
+        # resolved when the step runs, on the machine running the task
+        with mock.patch("datatrove.pipeline.flow.parallel._get_available_cpus", return_value=1) as cpus_mock:
+            step = ParallelStep([LambdaFilter(lambda doc: int(doc.id) % 3 != 0)])
+            cpus_mock.assert_not_called()
+            self.check_results(step, list(step(get_data())))
+        cpus_mock.assert_called_once()
+        self.assertEqual(step.workers, -1)
+        with mock.patch.object(os, "sched_getaffinity", create=True, new=None):
+            del os.sched_getaffinity
+            self.assertEqual(_get_available_cpus(), os.cpu_count())
+
+    def test_pipeline_stats(self):
+        inner = LambdaFilter(lambda doc: True)
+        step = ParallelStep([inner], workers=2, batch_size=10)
+        list(step(get_data()))
+        stats = PipelineStats([step])
+        self.assertEqual([s.name for s in stats.stats], [step.stats.name, inner.stats.name])
+
+    def test_rejects_writers(self):
+        with self.assertRaises(ValueError):
+            ParallelStep([JsonlWriter("/tmp/should_not_be_created")])
@@ -71,3 +71,17 @@ class TestParquetReader(unittest.TestCase):
         documents = list(reader.run())
         self.assertEqual(len(documents), 1)
         self.check_same_data(documents, limit=1, skip=1)
+
+    def test_read_prefetch(self):
+        for i in range(1, 4):
+            pq.write_table(
+                pa.table({"text": [f"file {i}"], "id": [i]}), os.path.join(self.tmp_dir, f"data_{i}.parquet")
+            )
+        documents = list(ParquetReader(self.tmp_dir).run())
+        self.assertEqual(len(documents), 6)
+        for batched in (False, True):
+            reader = ParquetReader(self.tmp_dir, prefetch_files=2, prefetch_bytes=1, batched=batched)
+            output = list(reader.run()) if not batched else list(reader.run_batches())
+            if batched:
+                output = [document for batch in output for document in batch.to_documents()]
+            self.assertEqual([(doc.id, doc.text) for doc in output], [(doc.id, doc.text) for doc in documents])
@@ -1,3 +1,4 @@
+import os
 import shutil
 import tempfile
 import unittest
@@ -31,3 +32,22 @@ class TestParquetWriter(unittest.TestCase):
             assert read_doc == original
             c += 1
         assert c == len(data)
+
+    def test_staging(self):
+        data = [Document(text=f"document {i} " * 100, id=str(i)) for i in range(20)]
+        output_dir = f"{self.tmp_dir}/output"
+        with ParquetWriter(
+            output_folder=output_dir, batch_size=2, max_file_size=2000, staging_dir=f"{self.tmp_dir}/staging"
+        ) as w:
+            for doc in data:
+                w.write(doc)
+            # closed files are uploaded while the next ones are written
+            w.uploader.wait()
+            uploaded = sorted(os.listdir(output_dir))
+            self.assertGreater(len(uploaded), 0)
+            self.assertNotIn(uploaded[-1], w.output_mg.get_open_files())
+        self.assertGreater(len(os.listdir(output_dir)), len(uploaded))
+        # staged files are deleted once uploaded
+        self.assertEqual([files for _, _, files in os.walk(f"{self.tmp_dir}/staging") if files], [])
+        self.assertEqual([doc.text for doc in ParquetReader(output_dir)()], [doc.text for doc in data])
+        self.assertGreater(w.output_folder.io_stats.written_bytes, 0)
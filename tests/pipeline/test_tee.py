@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+import unittest
+
+from datatrove.data import Document
+from datatrove.io import get_datafolder
+from datatrove.pipeline.filters import LambdaFilter
+from datatrove.pipeline.flow import Tee
+from datatrove.pipeline.writers.jsonl import JsonlWriter
+from datatrove.utils.stats import PipelineStats
+
+
+def get_data(n: int = 25):
+    return [Document(text=f"document number {i}", id=str(i), metadata={"i": i}) for i in range(n)]
+
+
+def uppercase(data, rank, world_size):
+    for document in data:
+        document.text = document.text.upper()
+        document.metadata["upper"] = True
+        yield document
+
+
+class TestTee(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_branches(self):
+        collected = {"even": [], "upper": []}
+
+        def collect(name):
+            def step(data, rank, world_size):
+                for document in data:
+                    collected[name].append(document)
+                    yield document
+
+            return step
+
+        even_filter = LambdaFilter(lambda doc: doc.metadata["i"] % 2 == 0)
+        tee = Tee(
+            {"even": [even_filter, collect("even")], "upper": [uppercase, collect("upper")]},
+            batch_size=4,
+            max_pending_batches=1,
+        )
+        documents = list(tee(get_data()))
+        # documents are yielded unchanged, in order
+        self.assertEqual([doc.id for doc in documents], [str(i) for i in range(25)])
+        self.assertTrue(all(doc.text.islower() and "upper" not in doc.metadata for doc in documents))
+        self.assertEqual([doc.id for doc in collected["even"]], [str(i) for i in range(0, 25, 2)])
+        self.assertTrue(all(doc.text.isupper() and doc.metadata["upper"] for doc in collected["upper"]))
+        self.assertEqual(len(collected["upper"]), 25)
+        # stats of each branch
+        stats = PipelineStats([tee])
+        self.assertEqual(
+            [s.name for s in stats.stats],
+            [tee.stats.name, "🔀 - FLOW: ↳ even", even_filter.stats.name, "🔀 - FLOW: ↳ upper"],
+        )
+        self.assertEqual(tee.pipeline[0].stats["total"].total, 25)
+        self.assertEqual(even_filter.stats["forwarded"].total, 13)
+        self.assertEqual(tee.stats["batches"].total, 7)
+
+    def test_writers(self):
+        tee = Tee(
+            [
+                [JsonlWriter(f"{self.tmp_dir}/all", compression=None)],
+                [
+                    LambdaFilter(lambda doc: doc.metadata["i"] < 5),
+                    JsonlWriter(f"{self.tmp_dir}/first", compression=None),
+                ],
+            ],
+            batch_size=5,
+        )
+        # the following steps stop early: branches still receive what was read and close their writers
+        for document in tee(get_data(), rank=3):
+            if document.id == "9":
+                break
+        for folder, lines in (("all", 10), ("first", 5)):
+            with get_datafolder(f"{self.tmp_dir}/{folder}").open("00003.jsonl", "rt") as f:
+                self.assertEqual(len(f.readlines()), lines)
+
+    def test_branch_error(self):
+        def fail(data, rank, world_size):
+            for document in data:
+                if document.id == "7":
+                    raise KeyError("broken branch")
+                yield document
+
+        tee = Tee([[fail], [LambdaFilter(lambda doc: True)]], batch_size=2)
+        with self.assertRaises(KeyError):
+            list(tee(get_data()))
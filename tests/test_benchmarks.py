@@ -0,0 +1,44 @@
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import bench_io, bench_processing  # noqa: F401 (registers the benchmarks)
+from benchmarks.corpus import CorpusConfig, SyntheticCorpus
+from benchmarks.harness import BenchmarkContext, compare_results, run_benchmark, select_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_corpus_is_deterministic(self):
+        config = CorpusConfig(n_docs=200, duplicate_rate=0.2, languages={"en": 0.5, "fr": 0.3, "zh": 0.2})
+        documents = list(SyntheticCorpus(config).documents())
+        self.assertEqual(
+            [(doc.id, doc.text) for doc in documents],
+            [(doc.id, doc.text) for doc in SyntheticCorpus(config).documents()],
+        )
+        self.assertEqual(len(documents), 200)
+        self.assertEqual({doc.metadata["language"] for doc in documents}, {"en", "fr", "zh"})
+        n_duplicates = len(documents) - len({doc.text for doc in documents})
+        self.assertTrue(20 <= n_duplicates <= 60, n_duplicates)
+
+    def test_html_documents(self):
+        documents = list(SyntheticCorpus(CorpusConfig(n_docs=20, html_rate=1.0)).documents())
+        self.assertTrue(all(doc.text.lstrip().startswith("<") for doc in documents))
+
+    def test_run_benchmarks(self):
+        context = BenchmarkContext(CorpusConfig(n_docs=50), tmp_dir=self.tmp_dir)
+        for name in select_benchmarks(
+            ["readers/Jsonl", "writers/Parquet", "filters/Lambda", "decompression/jsonl[python]"]
+        ):
+            result = run_benchmark(name, context, repeats=1)
+            self.assertIsNone(result.error)
+            self.assertEqual(result.docs, 50)
+            self.assertGreater(result.mb_per_second, 0)
+
+    def test_compare_results(self):
+        baseline = [{"name": "a", "docs_per_second": 100}, {"name": "b", "docs_per_second": 100}]
+        results = [{"name": "a", "docs_per_second": 95}, {"name": "b", "docs_per_second": 50}, {"name": "c"}]
+        self.assertEqual(compare_results(results, baseline, threshold=0.1), [("b", -0.5)])
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from datatrove.io import get_datafolder
+from datatrove.utils.completions import CompletionStore, bitmap_to_ranks, ranks_to_bitmap
+
+
+class TestCompletionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.folder = get_datafolder(self.tmp_dir)
+
+    def test_bitmap(self):
+        ranks = {0, 7, 8, 100, 99_999}
+        self.assertEqual(bitmap_to_ranks(ranks_to_bitmap(ranks)), ranks)
+        self.assertEqual(len(ranks_to_bitmap(ranks)), 12_500)
+        self.assertEqual(bitmap_to_ranks(ranks_to_bitmap(set())), set())
+
+    def test_segments_and_compaction(self):
+        store = CompletionStore(self.folder, compaction_threshold=3)
+        self.assertEqual(store.completed_ranks(), set())
+        for rank in (1, 5, 9):
+            store.mark_completed(rank)
+        # a single segment, rewritten with each completion
+        self.assertEqual(len(self.folder.list_files("completions/segments")), 1)
+        # other processes have their own segments
+        others = [CompletionStore(self.folder, compaction_threshold=3) for _ in range(3)]
+        for i, other in enumerate(others):
+            other._pid = None
+            other.mark_completed(100 + i)
+        self.assertEqual(len(self.folder.list_files("completions/segments")), 4)
+        # above the threshold, loading the completions compacts them into a bitmap
+        self.assertEqual(store.completed_ranks(), {1, 5, 9, 100, 101, 102})
+        self.assertEqual(self.folder.list_files("completions"), [self.folder.list_files("completions/bitmaps")[0]])
+        self.assertTrue(store.is_completed(101))
+        self.assertFalse(store.is_completed(2))
+        # the process keeps writing its segment after the compaction
+        store.mark_completed(2)
+        self.assertEqual(len(self.folder.list_files("completions/segments")), 1)
+        self.assertEqual(store.completed_ranks(), {1, 2, 5, 9, 100, 101, 102})
+
+    def test_compaction_of_bitmaps(self):
+        # left behind by concurrent compactions
+        for i in range(3):
+            with self.folder.open(f"completions/bitmaps/{i}.bin", "wb") as f:
+                f.write(ranks_to_bitmap({2 * i, 2 * i + 1}))
+        store = CompletionStore(self.folder, compaction_threshold=2)
+        # bitmaps count towards the threshold
+        self.assertEqual(store.completed_ranks(), set(range(6)))
+        self.assertEqual(len(self.folder.list_files("completions/bitmaps")), 1)
+        # only one process compacts at a time
+        for rank in (6, 7):
+            CompletionStore(self.folder).mark_completed(rank)
+        self.assertIsNotNone(self.folder.try_lock("completions/compaction.lock", 60))
+        self.assertEqual(store.completed_ranks(), set(range(8)))
+        self.assertEqual(len(self.folder.list_files("completions/segments")), 2)
+        # filesystems that can not tell when a file was modified are supported
+        with mock.patch.object(type(self.folder), "modified", side_effect=NotImplementedError):
+            self.folder.rm_file("completions/compaction.lock")
+            self.assertEqual(store.completed_ranks(), set(range(8)))
+        self.assertEqual(len(self.folder.list_files("completions/segments")), 0)
+        self.assertFalse(self.folder.exists("completions/compaction.lock"))
+
+    def test_is_completed_reads_new_files_only(self):
+        store = CompletionStore(self.folder)
+        store.mark_completed(0)
+        self.assertTrue(store.is_completed(0))
+        self.assertFalse(store.is_completed(1))
+        CompletionStore(self.folder).mark_completed(1)
+        with mock.patch.object(self.folder, "open", wraps=self.folder.open) as open_mock:
+            self.assertTrue(store.is_completed(1))
+        # only the new segment is read
+        self.assertEqual(open_mock.call_count, 1)
+
+    def test_legacy_completions(self):
+        for rank in (0, 3):
+            self.folder.open(f"completions/{rank:05d}", "w").close()
+        store = CompletionStore(self.folder)
+        store.mark_completed(4)
+        self.assertEqual(store.completed_ranks(), {0, 3, 4})
+        self.assertTrue(os.path.isfile(f"{self.tmp_dir}/completions/00003"))
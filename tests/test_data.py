@@ -0,0 +1,72 @@
+import dataclasses
+import pickle
+import unittest
+
+from datatrove.data import Document, Media, MediaType
+from datatrove.pipeline.readers.base import BaseReader
+
+
+class DummyReader(BaseReader):
+    def run(self, data=None, rank: int = 0, world_size: int = 1):
+        pass
+
+
+class TestDocument(unittest.TestCase):
+    def test_defaults(self):
+        doc = Document(text="hello", id="0")
+        self.assertFalse(hasattr(doc, "__dict__"))
+        self.assertEqual(doc.metadata, {})
+        self.assertEqual(doc, Document(text="hello", id="0", media=[], metadata={}))
+        self.assertEqual(dataclasses.asdict(doc), {"text": "hello", "id": "0", "media": [], "metadata": {}})
+        doc.media.append(Media(MediaType.IMAGE, "https://example.com/image.png"))
+        self.assertEqual(len(doc.media), 1)
+        self.assertEqual(Document(text="other", id="1").media, [])
+
+    def test_metadata_loader(self):
+        calls = []
+
+        def loader(raw):
+            calls.append(raw)
+            return raw | {"loaded": True}
+
+        doc = Document.with_metadata_loader("hello", "0", {"a": 1}, loader)
+        self.assertEqual(calls, [])
+        self.assertEqual(doc.metadata, {"a": 1, "loaded": True})
+        doc.metadata["b"] = 2
+        self.assertEqual(doc.metadata, {"a": 1, "loaded": True, "b": 2})
+        self.assertEqual(len(calls), 1)
+        copy = pickle.loads(pickle.dumps(Document.with_metadata_loader("hello", "0", {"a": 1}, loader)))
+        self.assertEqual(copy.metadata, {"a": 1, "loaded": True})
+        replaced = dataclasses.replace(Document.with_metadata_loader("x", "1", {"a": 1}, loader), text="y")
+        self.assertEqual(replaced, Document(text="y", id="1", metadata={"a": 1, "loaded": True}))
+
+    def test_reader_lazy_metadata(self):
+        reader = DummyReader(default_metadata={"source": "test", "a": 0})
+        doc = reader.get_document_from_dict({"text": "hello", "a": 1, "metadata": {"b": 2}}, "file", 3)
+        self.assertEqual(doc.id, "file/3")
+        self.assertEqual(doc.metadata, {"source": "test", "a": 1, "b": 2})
+        eager_reader = DummyReader(adapter=BaseReader._default_adapter, default_metadata={"source": "test", "a": 0})
+        self.assertEqual(
+            eager_reader.get_document_from_dict({"text": "hello", "a": 1, "metadata": {"b": 2}}, "file", 3), doc
+        )
+
+        class CustomAdapterReader(DummyReader):
+            def _default_adapter(self, data: dict, path: str, id_in_file: int | str):
+                parsed = super()._default_adapter(data, path, id_in_file)
+                return parsed | {"text": parsed["text"].upper()}
+
+        custom_reader = CustomAdapterReader()
+        self.assertFalse(custom_reader.lazy_metadata)
+        self.assertEqual(custom_reader.get_document_from_dict({"text": "hello"}, "file", 3).text, "HELLO")
+
+    def test_copy(self):
+        reader = DummyReader()
+        doc = reader.get_document_from_dict({"text": "hello", "a": 1, "metadata": {"b": 2}}, "file", 3)
+        copy = doc.copy()
+        copy.metadata["c"] = 3
+        self.assertEqual(doc.metadata, {"a": 1, "b": 2})
+        self.assertEqual(copy.metadata, {"a": 1, "b": 2, "c": 3})
+        copy = doc.copy()
+        copy.metadata["d"] = 4
+        self.assertEqual(doc.metadata, {"a": 1, "b": 2})
+        self.assertEqual(doc.copy(), doc)
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import time
+import unittest
+
+
+# modules imported by every task, before it starts running the pipeline
+TASK_MODULES = [
+    "datatrove.io",
+    "datatrove.executor",
+    "datatrove.pipeline.readers",
+    "datatrove.pipeline.filters",
+    "datatrove.pipeline.writers",
+    "datatrove.pipeline.dedup",
+    "datatrove.pipeline.tokens",
+    "datatrove.tools.launch_pickled_pipeline",
+]
+# heavy dependencies that should only be imported by the steps that use them
+LAZY_MODULES = ["numpy", "tqdm", "huggingface_hub.hf_api", "pyarrow", "tokenizers", "nltk"]
+# generous, to not be flaky on slow machines: these imports take ~0.2s
+IMPORT_TIME_BUDGET = 2.0
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+
+class TestImports(unittest.TestCase):
+    def test_heavy_dependencies_are_lazy(self):
+        code = "\n".join(f"import {module}" for module in TASK_MODULES) + (
+            f"\nimport sys\nprint([module for module in {LAZY_MODULES} if module in sys.modules])"
+        )
+        self.assertEqual(run_python(code).strip(), "[]")
+
+    def test_lazy_exports(self):
+        code = (
+            "import sys\nfrom datatrove.pipeline.filters import LambdaFilter, __all__\n"
+            "print('datatrove.pipeline.filters.lambda_filter' in sys.modules, "
+            "'datatrove.pipeline.filters.fasttext_filter' in sys.modules, 'LanguageFilter' in __all__)"
+        )
+        self.assertEqual(run_python(code).split(), ["True", "False", "True"])
+        from datatrove.pipeline.filters import LambdaFilter
+        from datatrove.pipeline.filters.lambda_filter import LambdaFilter as LambdaFilterFromModule
+
+        self.assertIs(LambdaFilter, LambdaFilterFromModule)
+        with self.assertRaises(ImportError):
+            from datatrove.pipeline.filters import NotAFilter  # noqa: F401
+
+    def test_import_time_budget(self):
+        run_python("pass")  # warm up the file system cache
+        start = time.perf_counter()
+        run_python("\n".join(f"import {module}" for module in TASK_MODULES))
+        base = time.perf_counter()
+        run_python("pass")
+        end = time.perf_counter()
+        self.assertLess((base - start) - (end - base), IMPORT_TIME_BUDGET)
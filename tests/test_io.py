@@ -1,15 +1,25 @@
+import gzip
+import hashlib
+import io
+import json
 import multiprocessing
 import os
+import pickle
 import shutil
 import tempfile
 import time
 import unittest
+import zlib
 from functools import partial
+from unittest import mock
 
 import boto3
 import moto
+from moto.moto_server.threaded_moto_server import ThreadedMotoServer
+from s3fs import S3FileSystem
 
-from datatrove.io import get_datafolder, safely_create_file
+from datatrove.io import DataFolder, _coalesce_ranges, assign_files_by_size, get_datafolder, safely_create_file
+from datatrove.utils.compression import ParallelGzipReader
 
 
 EXAMPLE_DIRS = ("/home/testuser/somedir", "file:///home/testuser2/somedir", "s3://test-bucket/somedir")
@@ -18,6 +28,8 @@ FULL_PATHS = (
     "/home/testuser2/somedir/file.txt",
     "s3://test-bucket/somedir/file.txt",
 )
+port = 5556
+endpoint_uri = f"http://127.0.0.1:{port}/"
 
 
 def fake_do_download(cc, ll):
@@ -72,3 +84,238 @@ class TestIO(unittest.TestCase):
                 )
 
                 self.assertEqual(counter.value, expec_calls)
+
+    def test_assign_files_by_size(self):
+        sizes = {"a": 10, "b": 7, "c": 5, "d": 4, "e": 3, "f": 1}
+        shards = assign_files_by_size(sizes, 3)
+        self.assertEqual(shards, [["a"], ["b", "e"], ["c", "d", "f"]])
+        self.assertEqual(shards, assign_files_by_size(dict(reversed(sizes.items())), 3))
+        self.assertEqual(assign_files_by_size({"a": 1}, 2), [["a"], []])
+
+    def test_get_shard_balance_by_size(self):
+        df = get_datafolder(f"{self.tmp_dir}/data")
+        for i, size in enumerate((100, 10, 10, 10, 10, 60)):
+            with df.open(f"file_{i}.txt", "wb") as f:
+                f.write(b"x" * size)
+        self.assertEqual(df.get_shard(0, 2), ["file_0.txt", "file_2.txt", "file_4.txt"])
+        df.listings_folder = get_datafolder(f"{self.tmp_dir}/listings")
+        shards = [df.get_shard(rank, 2, balance_by_size=True) for rank in range(2)]
+        self.assertEqual(
+            shards, [["file_0.txt"], ["file_1.txt", "file_2.txt", "file_3.txt", "file_4.txt", "file_5.txt"]]
+        )
+        # the assignment is persisted
+        self.assertEqual(len(df.listings_folder.list_files("shards")), 1)
+        with mock.patch("datatrove.io.assign_files_by_size") as assign_mock:
+            self.assertEqual(df.get_shard(0, 2, balance_by_size=True), ["file_0.txt"])
+        assign_mock.assert_not_called()
+        # until the files change
+        with df.open("file_6.txt", "wb") as f:
+            f.write(b"x" * 1000)
+        self.assertEqual(df.get_shard(0, 2, balance_by_size=True), ["file_6.txt"])
+        self.assertEqual(len(df.listings_folder.list_files("shards")), 2)
+        # listings locked by another (live) process are waited for
+        with df.open("file_7.txt", "wb") as f:
+            f.write(b"x")
+        df.list_files = mock.Mock(return_value={"file_7.txt": {"size": 1}})
+        assignment_file = df._get_listing_file(
+            "shards",
+            "json",
+            world_size=2,
+            listing=hashlib.sha1(json.dumps({"file_7.txt": 1}).encode()).hexdigest(),
+        )
+        with df.listings_folder.open(f"{assignment_file}.lock", "wt") as f:
+            f.write(f"other {time.time()}")
+
+        def other_process(seconds):
+            df._save_listing(assignment_file, [[], ["file_7.txt"]])
+
+        with mock.patch("datatrove.io.time.sleep", side_effect=other_process) as sleep_mock:
+            self.assertEqual(df.get_shard(1, 2, balance_by_size=True), ["file_7.txt"])
+        sleep_mock.assert_called_once()
+
+    def test_lock(self):
+        df = get_datafolder(f"{self.tmp_dir}/locks")
+        lock_id = df.try_lock("a.lock", timeout=60)
+        self.assertIsNotNone(lock_id)
+        self.assertIsNone(df.try_lock("a.lock", timeout=60))
+        # expired locks are taken over, and can then only be released by their new holder
+        new_lock_id = df.try_lock("a.lock", timeout=0)
+        self.assertIsNotNone(new_lock_id)
+        df.release_lock("a.lock", lock_id)
+        self.assertTrue(df.isfile("a.lock"))
+        df.release_lock("a.lock", new_lock_id)
+        self.assertFalse(df.isfile("a.lock"))
+
+    def test_file_manifest(self):
+        df = get_datafolder(f"{self.tmp_dir}/data")
+        for i in range(3):
+            with df.open(f"sub/file_{i}.txt", "wb") as f:
+                f.write(b"x" * (i + 1))
+        df.listings_folder = get_datafolder(f"{self.tmp_dir}/listings")
+        df.use_manifest = True
+        files = df.list_files(detail=True)
+        self.assertEqual(list(files), ["sub/file_0.txt", "sub/file_1.txt", "sub/file_2.txt"])
+        self.assertEqual([info["size"] for info in files.values()], [1, 2, 3])
+        self.assertEqual(len(df.listings_folder.list_files("manifests")), 1)
+        # later calls load the manifest
+        with df.open("sub/file_3.txt", "wb") as f:
+            f.write(b"x")
+        self.assertEqual(df.list_files(), list(files))
+        self.assertEqual(df.list_files(detail=True), files)
+        folders = df.list_files(include_directories=True, recursive=False)
+        self.assertEqual(len(df.listings_folder.list_files("manifests")), 2)
+        df.use_manifest = False
+        self.assertEqual(folders, df.list_files(include_directories=True, recursive=False))
+
+    def test_prefetch(self):
+        df = get_datafolder(f"{self.tmp_dir}/data")
+        paths = [f"file_{i}.txt.gz" for i in range(4)]
+        for i, path in enumerate(paths):
+            with df.open(path, "wt", compression="gzip") as f:
+                f.write(f"content {i}")
+        with df.prefetch(paths, max_files=2) as prefetcher:
+            with df.open(paths[0], "rt", compression="infer") as f:
+                self.assertEqual(f.read(), "content 0")
+            # the next files are read from memory
+            prefetcher._pending[paths[2]].result()
+            df.rm_file(paths[2])
+            # skipped files are dropped
+            with df.open(paths[2], "rt", compression="infer") as f:
+                self.assertEqual(f.read(), "content 2")
+            self.assertNotIn(paths[1], prefetcher._pending)
+            self.assertEqual(list(prefetcher._pending), [paths[3]])
+            with df.open(paths[3], "rb", compression="infer") as f:
+                self.assertEqual(f.read(), b"content 3")
+        self.assertIsNone(df._prefetcher)
+        # files being downloaded count towards max_bytes, and larger files are not prefetched
+        with df.open(paths[2], "wt", compression="gzip") as f:
+            f.write("content 2")
+        with df.open("large.txt", "wb") as f:
+            f.write(b"x" * 100)
+        sizes = {path: df.size(path) for path in paths}
+        with df.prefetch(
+            ["large.txt"] + paths, max_files=4, max_bytes=sizes[paths[0]] + sizes[paths[1]]
+        ) as prefetcher:
+            self.assertEqual(list(prefetcher._pending), paths[:2])
+            with df.open("large.txt", "rb") as f:
+                self.assertEqual(f.read(), b"x" * 100)
+            with df.open(paths[0], "rt", compression="infer") as f:
+                self.assertEqual(f.read(), "content 0")
+            self.assertEqual(list(prefetcher._pending), paths[1:3])
+
+    def test_coalesce_ranges(self):
+        ranges = [("a", 30, 40), ("a", 0, 10), ("a", 5, 8), ("b", 0, 10), ("a", 12, 20), ("a", 0, 10)]
+        self.assertEqual(
+            _coalesce_ranges(ranges, max_gap=2, max_block=100), [("a", 0, 20), ("a", 30, 40), ("b", 0, 10)]
+        )
+        self.assertEqual(
+            _coalesce_ranges(ranges, max_gap=10, max_block=30), [("a", 0, 20), ("a", 30, 40), ("b", 0, 10)]
+        )
+        self.assertEqual(_coalesce_ranges(ranges, max_gap=10, max_block=40), [("a", 0, 40), ("b", 0, 10)])
+
+    def test_parallel_gzip_reader(self):
+        texts = [os.urandom(i * 37 % 500) + b"text" * i for i in range(60)]
+        members = [gzip.compress(text) for text in texts]
+        files = {
+            "single": gzip.compress(b"".join(texts)),
+            "multi": b"".join(members),
+            # zeros after members, and member start bytes inside compressed data
+            "padded": b"".join(member + b"\x00" * (i % 3) for i, member in enumerate(members)),
+            "magic": gzip.compress(b"\x1f\x8b\x08" * 100 + texts[10]) + members[0],
+            "empty": b"",
+        }
+        for name, data in files.items():
+            for threads, block_size in ((1, 64), (3, 64), (3, 5000), (3, 2**20)):
+                with io.BufferedReader(ParallelGzipReader(io.BytesIO(data), threads, block_size)) as f:
+                    self.assertEqual(f.read(), gzip.decompress(data), (name, threads, block_size))
+        with self.assertRaises(EOFError):
+            io.BufferedReader(ParallelGzipReader(io.BytesIO(files["multi"][:-5]), 3, 1000)).read()
+        with self.assertRaises(zlib.error):
+            io.BufferedReader(ParallelGzipReader(io.BytesIO(files["multi"] + b"garbage"), 3, 1000)).read()
+
+    def test_decompression_backends(self):
+        df = get_datafolder(f"{self.tmp_dir}/data")
+        with df.open("file.txt.gz", "wt", compression="infer") as f:
+            f.write("line\n" * 1000)
+        for backend, threads in (("auto", 1), ("python", 1), ("parallel", 2), ("auto", 2)):
+            df = DataFolder(f"{self.tmp_dir}/data", decompression_backend=backend, decompression_threads=threads)
+            with df.open("file.txt.gz", "rt", compression="infer") as f:
+                self.assertEqual(f.readlines(), ["line\n"] * 1000)
+        self.assertEqual(pickle.loads(pickle.dumps(df)).decompression_threads, 2)
+        with self.assertRaises(ValueError):
+            DataFolder(f"{self.tmp_dir}/data", decompression_backend="zstandard").open(
+                "file.txt.gz", compression="gzip"
+            )
+
+
+class TestRemoteDataFolder(unittest.TestCase):
+    # aiobotocore (used by s3fs) is not supported by moto's in-process mock
+    def setUp(self):
+        self.server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+        self.server.start()
+        os.environ["AWS_SECRET_ACCESS_KEY"] = os.environ["AWS_ACCESS_KEY_ID"] = "foo"
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.addCleanup(self.server.stop)
+
+        s3 = boto3.client("s3", region_name="us-east-1", endpoint_url=endpoint_uri)
+        s3.create_bucket(Bucket="test-bucket")
+        self.s3fs = S3FileSystem(client_kwargs={"endpoint_url": endpoint_uri})
+
+    def test_bulk_operations(self):
+        s3fs = self.s3fs
+        # local files, and files of an async filesystem
+        for path in (f"{self.tmp_dir}/data", ("s3://test-bucket/data", s3fs)):
+            df = get_datafolder(path)
+            paths = [f"sub/file_{i}.txt" for i in range(4)]
+            for i, file in enumerate(paths):
+                with df.open(file, "wt") as f:
+                    f.write(f"content {i}" * 3)
+            self.assertEqual(df.exists_many([*paths, "sub/missing.txt"]), [True] * 4 + [False])
+            self.assertEqual(df.cat_many(paths[::-1]), [f"content {i}".encode() * 3 for i in range(3, -1, -1)])
+            self.assertEqual(df.io_stats.read_bytes, 4 * 27)
+            # ranges of the same file are coalesced, and returned in the same order as requested
+            self.assertEqual(
+                df.cat_ranges([paths[1], paths[0], paths[1], paths[1]], [9, 0, 0, 3], [18, 9, 2, 12]),
+                [b"content 1", b"content 0", b"co", b"tent 1con"],
+            )
+            files = df.open_files(paths, mode="rt", prefetch=True)
+            for file in paths:
+                df.rm_file(file)
+            # read from memory
+            self.assertEqual([file.read() for file in files], [f"content {i}" * 3 for i in range(4)])
+
+    def test_local_cache(self):
+        df = DataFolder(
+            "s3://test-bucket/cached", fs=self.s3fs, local_cache=f"{self.tmp_dir}/cache", local_cache_size=25
+        )
+        for name in "abc":
+            with df.open(f"{name}.txt", "wt") as f:
+                f.write(name * 10)
+
+        def cached_files():
+            return sorted(
+                open(os.path.join(root, name)).read()
+                for root, _, files in os.walk(df.local_cache)
+                for name in files
+                if len(name) == 64
+            )
+
+        with df.open("a.txt", "rt") as f:
+            self.assertEqual(f.read(), "a" * 10)
+        self.assertEqual(cached_files(), ["a" * 10])
+        # modified files are downloaded again
+        with df.open("a.txt", "wt") as f:
+            f.write("A" * 10)
+        self.assertEqual(df.cat_file("a.txt"), b"A" * 10)
+        self.assertEqual(cached_files(), ["A" * 10, "a" * 10])
+        # the least recently used files are evicted
+        self.assertEqual(df.cat_many(["b.txt", "c.txt"]), [b"b" * 10, b"c" * 10])
+        self.assertEqual(cached_files(), ["b" * 10, "c" * 10])
+        # read from the cache
+        self.s3fs.rm_file("test-bucket/cached/b.txt")
+        self.s3fs.invalidate_cache()
+        self.assertEqual(df.cat_ranges(["c.txt"], [2], [5]), [b"ccc"])
+        # the cache folder is kept when pickled
+        self.assertEqual(pickle.loads(pickle.dumps(df)).local_cache, df.local_cache)